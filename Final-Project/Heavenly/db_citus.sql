@@ -20,6 +20,7 @@ DROP TABLE IF EXISTS review_response CASCADE;
 DROP TABLE IF EXISTS review CASCADE;
 DROP TABLE IF EXISTS payment CASCADE;
 DROP TABLE IF EXISTS booking CASCADE;
+DROP TABLE IF EXISTS price_rule CASCADE;
 DROP TABLE IF EXISTS available_date CASCADE;
 DROP TABLE IF EXISTS property_photo CASCADE;
 DROP TABLE IF EXISTS property_amenity CASCADE;
@@ -46,6 +47,8 @@ DROP TYPE IF EXISTS review_status CASCADE;
 -- ============================================================================
 
 CREATE EXTENSION IF NOT EXISTS citus;
+-- Operadores btree en índices GiST (exclusión de reservas solapadas)
+CREATE EXTENSION IF NOT EXISTS btree_gist;
 
 -- ============================================================================
 -- PARTE 3: CONFIGURACIÓN DE WORKERS (Ejecutar solo en el Coordinator)
@@ -224,6 +227,12 @@ CREATE TABLE IF NOT EXISTS property (
     city_id INT NOT NULL,
     user_id BIGINT NOT NULL,
     is_active BOOLEAN DEFAULT TRUE,
+    -- Copia ordenada de property_amenity, mantenida por PropertyService
+    -- (filtro "tiene todas": amenity_ids @> ARRAY[...] con índice GIN)
+    amenity_ids INT[] NOT NULL DEFAULT '{}',
+    -- Coordenadas WGS84 para la búsqueda en mapa (NULL: sin ubicar)
+    latitude DOUBLE PRECISION CHECK (latitude BETWEEN -90 AND 90),
+    longitude DOUBLE PRECISION CHECK (longitude BETWEEN -180 AND 180),
     created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (id, region_id)
@@ -263,6 +272,35 @@ CREATE TABLE IF NOT EXISTS available_date (
     CONSTRAINT chk_dates CHECK (end_date >= start_date)
 );
 
+-- price_rule - Co-localizada con property
+-- Reglas de precio por propiedad (services/pricing.py):
+--   nightly:        precio (amount) o ajuste % sobre price_night (percent) de las
+--                   noches dentro de [start_date, end_date] y de los días de
+--                   weekdays (bit 0 = lunes); gana la de mayor priority
+--   length_of_stay: descuento % (percent) desde min_nights noches
+--   extra_guest:    amount por noche y huésped por encima de guests_included
+--   pet:            amount por noche y mascota
+CREATE TABLE IF NOT EXISTS price_rule (
+    id BIGSERIAL,
+    property_id BIGINT NOT NULL,
+    region_id INT NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    start_date DATE,
+    end_date DATE,
+    weekdays SMALLINT,
+    min_nights INTEGER,
+    guests_included INTEGER,
+    amount DECIMAL(10, 2),
+    percent DECIMAL(5, 2),
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, region_id),
+    CONSTRAINT chk_price_rule_kind CHECK (kind IN ('nightly', 'length_of_stay', 'extra_guest', 'pet')),
+    CONSTRAINT chk_price_rule_dates CHECK (end_date >= start_date),
+    CONSTRAINT chk_price_rule_weekdays CHECK (weekdays BETWEEN 1 AND 127)
+);
+
 -- ============================================================================
 -- PARTE 9: TABLAS DE RESERVAS (Distribuidas por region_id)
 -- ============================================================================
@@ -286,7 +324,14 @@ CREATE TABLE IF NOT EXISTS booking (
     updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (id, region_id),
     CONSTRAINT chk_booking_dates CHECK (check_out > check_in),
-    CONSTRAINT chk_nights CHECK (number_nights > 0)
+    CONSTRAINT chk_nights CHECK (number_nights > 0),
+    -- Dos reservas activas de la misma propiedad no pueden solaparse.
+    -- Incluye region_id (columna de distribución) para que Citus la acepte.
+    CONSTRAINT excl_booking_overlap EXCLUDE USING gist (
+        region_id WITH =,
+        property_id WITH =,
+        daterange(check_in, check_out) WITH &&
+    ) WHERE (status IN ('PENDING', 'CONFIRMED'))
 );
 
 -- payment - Co-localizada con booking
@@ -348,6 +393,7 @@ SELECT create_distributed_table('property', 'region_id');
 SELECT create_distributed_table('property_amenity', 'region_id', colocate_with => 'property');
 SELECT create_distributed_table('property_photo', 'region_id', colocate_with => 'property');
 SELECT create_distributed_table('available_date', 'region_id', colocate_with => 'property');
+SELECT create_distributed_table('price_rule', 'region_id', colocate_with => 'property');
 
 -- Distribuir tablas de reservas por region_id
 SELECT create_distributed_table('booking', 'region_id', colocate_with => 'property');
@@ -364,6 +410,7 @@ SELECT create_distributed_table('review_response', 'region_id', colocate_with =>
 -- Índices para user
 CREATE INDEX idx_user_email ON "user"(email);
 CREATE INDEX idx_user_region ON "user"(region_id);
+-- La paginación por cursor de usuarios recorre la PK (id, region_id)
 
 -- Índices para property
 CREATE INDEX idx_property_city ON property(city_id);
@@ -371,17 +418,30 @@ CREATE INDEX idx_property_type ON property(property_type_id);
 CREATE INDEX idx_property_price ON property(price_night);
 CREATE INDEX idx_property_active ON property(is_active) WHERE is_active = TRUE;
 CREATE INDEX idx_property_user ON property(user_id, region_id);
+CREATE INDEX idx_property_amenity_ids ON property USING gin (amenity_ids);
+-- Búsqueda en mapa sin el índice en memoria: rango de latitud + longitud
+CREATE INDEX idx_property_lat_lon ON property(latitude, longitude) WHERE latitude IS NOT NULL;
+-- Paginación por cursor: mismo orden (clave, id, region_id) que el ORDER BY
+CREATE INDEX idx_property_keyset_created ON property(created_at, id, region_id);
+CREATE INDEX idx_property_keyset_price ON property(price_night, id, region_id);
+CREATE INDEX idx_property_user_keyset ON property(user_id, created_at, id, region_id);
 
 -- Índices para booking
 CREATE INDEX idx_booking_user ON booking(user_id, region_id);
+CREATE INDEX idx_booking_user_keyset ON booking(user_id, created_at, id, region_id);
 CREATE INDEX idx_booking_property ON booking(property_id, region_id);
 CREATE INDEX idx_booking_dates ON booking(check_in, check_out);
 CREATE INDEX idx_booking_status ON booking(status);
+-- Carga incremental del DW: cambios de una región en orden (updated_at, id)
+CREATE INDEX idx_booking_updated ON booking(region_id, updated_at, id);
 
 -- Índices para available_date
 CREATE INDEX idx_available_date_property ON available_date(property_id, region_id);
 CREATE INDEX idx_available_date_range ON available_date(start_date, end_date);
 
+-- Índices para price_rule
+CREATE INDEX idx_price_rule_property ON price_rule(property_id, region_id);
+
 -- Índices para review
 CREATE INDEX idx_review_property ON review(property_id, region_id);
 CREATE INDEX idx_review_user ON review(user_id, region_id);
@@ -390,6 +450,7 @@ CREATE INDEX idx_review_rating ON review(rating);
 -- Índices para payment
 CREATE INDEX idx_payment_booking ON payment(booking_id, region_id);
 CREATE INDEX idx_payment_status ON payment(status);
+CREATE INDEX idx_payment_updated ON payment(region_id, updated_at, id);
 
 -- ============================================================================
 -- PARTE 13: NOTA SOBRE TRIGGERS
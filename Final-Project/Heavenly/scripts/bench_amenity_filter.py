@@ -0,0 +1,87 @@
+"""
+Latencia del filtro de amenities: amenity_ids @> ARRAY[...] (GIN) frente a
+un EXISTS sobre property_amenity por amenity (la forma anterior).
+
+Uso:
+    python scripts/bench_amenity_filter.py --repeat 30
+    python scripts/bench_amenity_filter.py --region-id 2 --max-amenities 10
+
+Para N = 1..--max-amenities toma las N amenities más frecuentes (el peor
+caso para el filtro: muchas propiedades las tienen) y mide p50/p99 de la
+primera página de la búsqueda con cada forma, más las filas devueltas.
+Requiere la migración scripts/property_amenity_ids.sql.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import exists, func, select
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def timed(fn, repeat):
+    samples, rows = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(fn())
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))], rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--region-id", type=int)
+    parser.add_argument("--max-amenities", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    import models  # noqa: F401
+    from models.property import Property
+    from models.property_amenity import PropertyAmenity
+    from repositories.database import SessionLocal
+    from repositories.shard_routing import multi_shard
+
+    def base():
+        query = select(Property.id, Property.region_id).where(Property.is_active == True)
+        if args.region_id is not None:
+            return query.where(Property.region_id == args.region_id)
+        return multi_shard(query)
+
+    def with_array(amenity_ids):
+        return base().where(Property.amenity_ids.contains(sorted(amenity_ids)))\
+            .order_by(Property.created_at.desc(), Property.id.desc()).limit(args.limit)
+
+    def with_exists(amenity_ids):
+        query = base()
+        for amenity_id in amenity_ids:
+            query = query.where(exists().where(
+                PropertyAmenity.c.property_id == Property.id,
+                PropertyAmenity.c.region_id == Property.region_id,
+                PropertyAmenity.c.amenity_id == amenity_id
+            ))
+        return query.order_by(Property.created_at.desc(), Property.id.desc()).limit(args.limit)
+
+    with SessionLocal() as db:
+        popular = db.execute(multi_shard(
+            select(PropertyAmenity.c.amenity_id)
+            .group_by(PropertyAmenity.c.amenity_id)
+            .order_by(func.count().desc())
+            .limit(args.max_amenities)
+        )).scalars().all()
+        print(f"amenities by frequency: {popular}")
+
+        for n in range(1, len(popular) + 1):
+            amenity_ids = popular[:n]
+            for name, build in (("int[] @>", with_array), ("EXISTS x N", with_exists)):
+                statement = build(amenity_ids)
+                p50, p99, rows = timed(lambda: db.execute(statement).all(), args.repeat)
+                print(f"  n={n:<2} {name:<10} p50={p50 * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms rows={rows}")
+
+
+if __name__ == "__main__":
+    main()
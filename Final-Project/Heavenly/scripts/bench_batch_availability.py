@@ -0,0 +1,71 @@
+"""
+Benchmark de AvailabilityService.create_batch_availability.
+
+Uso:
+    python scripts/bench_batch_availability.py --property-id 1 --region-id 1 --user-id 1 \
+        --sizes 1,30,365
+
+Para cada tamaño sube N rangos de una noche consecutivos (más allá de la
+ventana que ya use la propiedad, ver --start-in-days), cuenta las sentencias
+enviadas a la base y el tiempo total, y después borra los rangos creados.
+Las sentencias por lote deben mantenerse constantes (propiedad, conflictos,
+INSERT ... RETURNING y recarga del bitmap) sea cual sea N.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, event
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--property-id", type=int, required=True)
+    parser.add_argument("--region-id", type=int, required=True)
+    parser.add_argument("--user-id", type=int, required=True, help="Dueño de la propiedad")
+    parser.add_argument("--sizes", default="1,30,365")
+    parser.add_argument("--start-in-days", type=int, default=1500)
+    args = parser.parse_args()
+
+    import models  # noqa: F401
+    from models.available_date import AvailableDate
+    from repositories.database import SessionLocal, engine
+    from schemas.available_date import AvailableDateBase, AvailableDateBatchCreate
+    from services.availability_service import AvailabilityService
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **kw: statements.append(1))
+
+    first_day = date.today() + timedelta(days=args.start_in_days)
+    for size in (int(size) for size in args.sizes.split(",")):
+        batch = AvailableDateBatchCreate(
+            property_id=args.property_id,
+            region_id=args.region_id,
+            dates=[
+                AvailableDateBase(start_date=first_day + timedelta(days=i), end_date=first_day + timedelta(days=i))
+                for i in range(size)
+            ]
+        )
+        with SessionLocal() as db:
+            statements.clear()
+            started = time.perf_counter()
+            result = AvailabilityService.create_batch_availability(db, batch, args.user_id)
+            elapsed = time.perf_counter() - started
+            print(f"{size:>4} ranges: created={result.created} skipped={result.skipped} "
+                  f"statements={len(statements)} {elapsed * 1000:.1f}ms")
+
+            created_ids = [r.availability.id for r in result.results if r.availability]
+            if created_ids:
+                db.execute(delete(AvailableDate).where(
+                    AvailableDate.region_id == args.region_id,
+                    AvailableDate.id.in_(created_ids)
+                ))
+                db.commit()
+
+
+if __name__ == "__main__":
+    main()
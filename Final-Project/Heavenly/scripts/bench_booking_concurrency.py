@@ -0,0 +1,157 @@
+"""
+Prueba de concurrencia de creación de reservas sobre una sola propiedad.
+
+Uso:
+    uvicorn main:app --app-dir src --workers 4 &
+    python scripts/bench_booking_concurrency.py --email guest@example.com --password secret \
+        --property-id 1 --region-id 1 --clients 64 --requests 50
+
+N clientes piden en paralelo reservas de 1 a 4 noches dentro de una ventana
+corta (muchas se solapan a propósito). Imprime reservas/s, el reparto de
+respuestas (201 creadas, 400 sin disponibilidad, 409 conflicto) y latencias p50/p99. Al final
+cuenta en la base los pares de reservas activas solapadas de la propiedad,
+que debe ser 0.
+
+También sirve de comprobación automática contra el docker-compose: termina
+con código 1 si hay reservas solapadas, si ninguna petición creó una
+reserva o si alguna respuesta no es 201/400/409 (500, errores de conexión).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlparse
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+OVERLAPS_SQL = text("""
+    SELECT count(*)
+    FROM booking a
+    JOIN booking b
+      ON b.region_id = a.region_id
+     AND b.property_id = a.property_id
+     AND b.id > a.id
+     AND daterange(b.check_in, b.check_out) && daterange(a.check_in, a.check_out)
+    WHERE a.region_id = :region_id AND a.property_id = :property_id
+      AND a.status IN ('PENDING', 'CONFIRMED')
+      AND b.status IN ('PENDING', 'CONFIRMED')
+""")
+
+
+def login(host, port, email, password):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request(
+        "POST", "/auth/", urlencode({"username": email, "password": password}),
+        {"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    if response.status != 200:
+        raise SystemExit(f"Login failed ({response.status}): {body}")
+    return body["access_token"]
+
+
+def client(host, port, token, args, seed, results, latencies, lock):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    first_day = date.today() + timedelta(days=args.start_in_days)
+    local_results, local_latencies = Counter(), []
+    for _ in range(args.requests):
+        check_in = first_day + timedelta(days=rng.randrange(args.window_days))
+        payload = json.dumps({
+            "property_id": args.property_id,
+            "region_id": args.region_id,
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=rng.randint(1, 4))).isoformat(),
+            "guest_adults": 1
+        })
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/bookings/", payload, headers)
+            response = conn.getresponse()
+            response.read()
+            local_results[response.status] += 1
+        except (OSError, http.client.HTTPException):
+            local_results["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        results.update(local_results)
+        latencies.extend(local_latencies)
+
+
+def count_overlaps(property_id, region_id):
+    from repositories.database import engine
+
+    with engine.connect() as conn:
+        return conn.execute(OVERLAPS_SQL, {"property_id": property_id, "region_id": region_id}).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--property-id", type=int, required=True)
+    parser.add_argument("--region-id", type=int, required=True)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=50, help="Reservas por cliente")
+    parser.add_argument("--start-in-days", type=int, default=30)
+    parser.add_argument("--window-days", type=int, default=60)
+    parser.add_argument("--skip-db-check", action="store_true")
+    args = parser.parse_args()
+
+    target = urlparse(args.url)
+    host, port = target.hostname, target.port or 80
+    token = login(host, port, args.email, args.password)
+
+    results, latencies, lock = Counter(), [], threading.Lock()
+    threads = [
+        threading.Thread(target=client, args=(host, port, token, args, seed, results, latencies, lock))
+        for seed in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(results.values())
+    print(f"{total} requests in {elapsed:.1f}s -> {total / elapsed:.1f} req/s (clients={args.clients})")
+    print("  responses: " + ", ".join(f"{status}={count}" for status, count in sorted(results.items(), key=str)))
+    if latencies:
+        ordered = sorted(latencies)
+        print(f"  p50={statistics.median(ordered) * 1000:.1f}ms "
+              f"p99={ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000:.1f}ms")
+
+    failures = []
+    unexpected = sum(count for status, count in results.items() if status not in (201, 400, 409))
+    if unexpected:
+        failures.append(f"{unexpected} responses other than 201/400/409")
+    if not results[201]:
+        failures.append("no booking was created")
+    if not args.skip_db_check:
+        overlaps = count_overlaps(args.property_id, args.region_id)
+        print(f"  overlapping active bookings: {overlaps}")
+        if overlaps:
+            failures.append(f"{overlaps} overlapping active bookings")
+    if failures:
+        raise SystemExit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de requests/segundo para las rutas sync y async (DB_ASYNC).
+
+Uso (mismo hardware, un modo a la vez):
+    DB_ASYNC=false uvicorn main:app --app-dir src --workers 1 &
+    python scripts/bench_db_modes.py --url http://localhost:8000 --label sync
+
+    DB_ASYNC=true uvicorn main:app --app-dir src --workers 1 &
+    python scripts/bench_db_modes.py --url http://localhost:8000 --label async
+
+Golpea los endpoints calientes de lectura (/properties y /properties/{id})
+con N clientes concurrentes durante un tiempo fijo e imprime req/s y
+latencias p50/p99 por endpoint.
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def worker(host, port, paths, deadline, latencies, errors, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local = {path: [] for path in paths}
+    local_errors = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local[path].append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        for path, values in local.items():
+            latencies[path].extend(values)
+        errors[0] += local_errors
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--property-ids", default="1,2,3,4,5")
+    parser.add_argument("--region-id", type=int, default=None)
+    args = parser.parse_args()
+
+    target = urlparse(args.url)
+    search = "/properties/?limit=20"
+    if args.region_id:
+        search += f"&region_id={args.region_id}"
+    paths = [search] + [f"/properties/{pid}" for pid in args.property_ids.split(",")]
+
+    latencies = {path: [] for path in paths}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(target.hostname, target.port or 80, paths, deadline, latencies, errors, lock)
+        )
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"[{args.label}] {total} requests in {elapsed:.1f}s -> {total / elapsed:.1f} req/s "
+          f"(concurrency={args.concurrency}, errors={errors[0]})")
+    for path, values in latencies.items():
+        if not values:
+            continue
+        print(f"  {path:<32} n={len(values):<7} "
+              f"p50={statistics.median(values) * 1000:.1f}ms "
+              f"p99={percentile(values, 99) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
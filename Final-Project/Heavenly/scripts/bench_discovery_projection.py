@@ -0,0 +1,122 @@
+"""
+Página de GET /properties/ con entidades ORM (joinedload de ciudad, país,
+región, fotos y dueño; la forma anterior) frente a la proyección de
+columnas de services/listing_projection.py.
+
+Uso:
+    python scripts/bench_discovery_projection.py --limit 100 --repeat 30
+    python scripts/bench_discovery_projection.py --region-id 2 --cold-hosts
+
+Para cada forma mide listings por segundo (p50 por página) y los bytes
+asignados por página con tracemalloc (pico y netos). Las tablas de
+referencia quedan en memoria tras la primera página; --cold-hosts vacía la
+caché de nombres de anfitrión antes de cada página (peor caso).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def measure(fn, repeat):
+    """(segundos p50, pico de bytes p50, bytes netos p50, listings) por página."""
+    fn()  # calentamiento: caché de sentencias compiladas y tablas de referencia
+    seconds, peaks, nets, rows = [], [], [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(fn())
+        seconds.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak - before)
+        nets.append(current - before)
+    return statistics.median(seconds), statistics.median(peaks), statistics.median(nets), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--region-id", type=int)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--cold-hosts", action="store_true")
+    args = parser.parse_args()
+
+    import models  # noqa: F401
+    from models.city import City
+    from models.property import Property
+    from repositories.database import SessionLocal
+    from repositories.shard_routing import multi_shard
+    from schemas.property import PropertyRes
+    from services.listing_projection import host_names, load_listings
+    from services.property_discovery_service import PropertyDiscoveryService
+
+    keyset = PropertyDiscoveryService._keyset("created_at", "desc")
+
+    def filtered(query):
+        query = query.where(Property.is_active == True)
+        if args.region_id is not None:
+            return query.where(Property.region_id == args.region_id)
+        return multi_shard(query)
+
+    def orm_page(db):
+        query = filtered(select(Property)).options(
+            joinedload(Property.city).joinedload(City.country),
+            joinedload(Property.region),
+            joinedload(Property.photos),
+            joinedload(Property.owner)
+        )
+        rows = db.execute(keyset.apply(query, None, args.limit)).unique().all()
+        properties, _ = keyset.page(rows, args.limit)
+        page = [
+            PropertyRes(
+                id=prop.id,
+                address=prop.address,
+                description=prop.description,
+                property_type_id=prop.property_type_id,
+                price_night=prop.price_night,
+                max_adults=prop.max_adults,
+                max_children=prop.max_children,
+                max_infant=prop.max_infant,
+                max_pets=prop.max_pets,
+                city=prop.city.name if prop.city else "",
+                country=prop.city.country.name if prop.city and prop.city.country else "",
+                region=prop.region.name if prop.region else "",
+                photos=[photo.image_url for photo in prop.photos],
+                host=f"{prop.owner.first_name} {prop.owner.last_name}" if prop.owner else "",
+                host_id=str(prop.user_id)
+            )
+            for prop in properties
+        ]
+        db.expunge_all()
+        return page
+
+    def projection_page(db):
+        if args.cold_hosts:
+            host_names.clear()
+        statement = PropertyDiscoveryService._search_statement(limit=args.limit, region_id=args.region_id)
+        rows, _ = keyset.page_rows(db.execute(statement).all(), args.limit)
+        return load_listings(db, rows)
+
+    with SessionLocal() as db:
+        for name, page in (("ORM + joinedload", orm_page), ("projection", projection_page)):
+            seconds, peak, net, rows = measure(lambda: page(db), args.repeat)
+            rate = rows / seconds if seconds else float("inf")
+            print(
+                f"{name:<17} listings={rows:<4} p50={seconds * 1000:8.2f}ms {rate:10.0f} listings/s "
+                f"peak={peak / 1024:9.1f}KiB net={net / 1024:8.1f}KiB per page"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Almacenamiento de fact_booking: tabla heap única (antes) frente a la tabla
+particionada por mes de check_in_date, toda en heap y con las particiones
+antiguas en columnar (después).
+
+Uso (contra la base del DW, con Citus instalado):
+    python scripts/bench_fact_storage.py --rows 5000000 --years 4
+    python scripts/bench_fact_storage.py --distributed --rounds 10
+
+Genera en el esquema bench_fact el mismo conjunto de hechos sintéticos en
+las tres variantes y muestra su tamaño en disco (con índices) y la mediana
+del tiempo de tres consultas de KPIs: todo el histórico (como
+vm_regional_kpis), el último trimestre de una región (como los rollups) y
+un trimestre antiguo de una región (particiones columnares). Las lecturas
+son con caché caliente: cada consulta se ejecuta una vez antes de medir.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+SCHEMA = "bench_fact"
+
+COLUMNS = """
+    booking_key BIGSERIAL,
+    booking_id BIGINT NOT NULL,
+    dim_date_id INT NOT NULL,
+    dim_host_id BIGINT NOT NULL,
+    dim_guest_id BIGINT NOT NULL,
+    dim_property_id BIGINT NOT NULL,
+    dim_currency_id INT NOT NULL,
+    region_id INT NOT NULL,
+    nights_booked INT NOT NULL,
+    total_revenue NUMERIC(10, 2) NOT NULL,
+    host_commission NUMERIC(10, 2) NOT NULL,
+    platform_commission NUMERIC(10, 2) NOT NULL,
+    guest_adults INT NOT NULL,
+    guest_children INT NOT NULL,
+    booking_status booking_status NOT NULL,
+    payment_status payment_status NOT NULL,
+    check_in_date DATE NOT NULL,
+    source_updated_at TIMESTAMP,
+    PRIMARY KEY (booking_key, region_id, check_in_date),
+    UNIQUE (booking_id, region_id, check_in_date)
+"""
+
+# Hechos sintéticos generados en el servidor: check_in repartido por todo
+# el periodo, 1-14 noches, estados y regiones cíclicos
+FILL_SQL = """
+    INSERT INTO {table} (
+        booking_id, dim_date_id, dim_host_id, dim_guest_id, dim_property_id, dim_currency_id, region_id,
+        nights_booked, total_revenue, host_commission, platform_commission,
+        guest_adults, guest_children, booking_status, payment_status, check_in_date, source_updated_at
+    )
+    SELECT
+        g,
+        to_char(x.day, 'YYYYMMDD')::INT,
+        1 + mod(g, 5000),
+        1 + mod(g * 7, 90000),
+        1 + mod(g * 13, 20000),
+        1 + mod(g, 3),
+        x.region_id,
+        x.nights,
+        x.nights * x.price,
+        x.nights * x.price * 0.85,
+        x.nights * x.price * 0.15,
+        1 + mod(g, 4),
+        mod(g, 3),
+        (ARRAY['PENDING', 'CONFIRMED', 'CANCELED', 'COMPLETED', 'REVIEWED'])[1 + mod(g, 5)]::booking_status,
+        (ARRAY['PENDING', 'SUCCESSFUL', 'FAILED'])[1 + mod(g, 3)]::payment_status,
+        x.day,
+        x.day - 30
+    FROM generate_series(1, %(rows)s) AS g
+    CROSS JOIN LATERAL (
+        SELECT
+            %(start)s::date + mod(hashint4(g::int) & 2147483647, %(days)s) AS day,
+            1 + mod(g, %(regions)s) AS region_id,
+            1 + mod(g, 14) AS nights,
+            50 + mod(g * 31, 300) AS price
+    ) AS x
+"""
+
+QUERIES = {
+    "histórico": """
+        SELECT region_id, dim_date_id, sum(nights_booked), sum(total_revenue)
+        FROM {table}
+        WHERE booking_status IN ('CONFIRMED', 'COMPLETED', 'REVIEWED')
+        GROUP BY region_id, dim_date_id
+    """,
+    "trim. reciente": """
+        SELECT check_in_date, count(*), sum(nights_booked), sum(total_revenue)
+        FROM {table}
+        WHERE region_id = %(region_id)s
+          AND check_in_date BETWEEN %(recent_first)s AND %(recent_last)s
+          AND booking_status IN ('CONFIRMED', 'COMPLETED', 'REVIEWED')
+        GROUP BY check_in_date
+    """,
+    "trim. antiguo": """
+        SELECT check_in_date, count(*), sum(nights_booked), sum(total_revenue)
+        FROM {table}
+        WHERE region_id = %(region_id)s
+          AND check_in_date BETWEEN %(old_first)s AND %(old_last)s
+          AND booking_status IN ('CONFIRMED', 'COMPLETED', 'REVIEWED')
+        GROUP BY check_in_date
+    """,
+}
+
+
+def _size(cursor, table: str, partitioned: bool, distributed: bool) -> int:
+    size = "citus_total_relation_size" if distributed else "pg_total_relation_size"
+    if partitioned:
+        cursor.execute(
+            f"SELECT sum({size}(relid)) FROM pg_partition_tree(%s::regclass) WHERE isleaf",
+            (table,)
+        )
+    else:
+        cursor.execute(f"SELECT {size}(%s)", (table,))
+    return int(cursor.fetchone()[0] or 0)
+
+
+def _create(cursor, name: str, args, start: date, end: date, frozen_before: date) -> str:
+    table = f"{SCHEMA}.{name}"
+    partitioned = name != "heap"
+    cursor.execute(f"CREATE TABLE {table} ({COLUMNS}){' PARTITION BY RANGE (check_in_date)' if partitioned else ''}")
+    if args.distributed:
+        cursor.execute("SELECT create_distributed_table(%s, 'region_id')", (table,))
+    if partitioned:
+        cursor.execute(
+            "SELECT create_time_partitions(%s, INTERVAL '1 month', %s, %s)",
+            (table, end, start)
+        )
+    started = time.perf_counter()
+    cursor.execute(FILL_SQL.format(table=table), {
+        "rows": args.rows,
+        "start": start,
+        "days": (end - start).days,
+        "regions": args.regions
+    })
+    loaded = time.perf_counter() - started
+    if name == "columnar":
+        cursor.execute("CALL alter_old_partitions_set_access_method(%s, %s, 'columnar')", (table, frozen_before))
+    cursor.execute(f"VACUUM ANALYZE {table}")
+    print(f"{name:<12} cargada en {loaded:.1f}s")
+    return table
+
+
+def _time(cursor, sql: str, params: dict, rounds: int) -> float:
+    cursor.execute(sql, params)
+    cursor.fetchall()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Hechos generados")
+    parser.add_argument("--years", type=int, default=4, help="Años de check_in hasta el mes actual")
+    parser.add_argument("--regions", type=int, default=8)
+    parser.add_argument("--columnar-after-months", type=int, default=13)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--distributed", action="store_true", help="Distribuye las tablas por region_id")
+    parser.add_argument("--keep", action="store_true", help="No borra el esquema bench_fact al terminar")
+    args = parser.parse_args()
+
+    from services.bi_service import add_months, get_db_connection
+
+    conn = get_db_connection()
+    if conn is None:
+        sys.exit(1)
+    # CALL alter_old_partitions_set_access_method confirma partición a partición
+    conn.autocommit = True
+
+    today = date.today()
+    start = add_months(today, -12 * args.years)
+    end = add_months(today, 1)
+    frozen_before = add_months(today, -args.columnar_after_months)
+    recent_first = add_months(today, -3)
+    params = {
+        "region_id": 1,
+        "recent_first": recent_first,
+        "recent_last": add_months(today, 0),
+        "old_first": start,
+        "old_last": add_months(start, 3)
+    }
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        try:
+            print(f"{args.rows} hechos de {start} a {end}, {args.regions} regiones; columnar antes de {frozen_before}")
+            variants = [
+                (name, _create(cursor, name, args, start, end, frozen_before))
+                for name in ("heap", "partitioned", "columnar")
+            ]
+
+            print(f"\n{'variante':<12} {'tamaño':>10} " + " ".join(f"{name:>15}" for name in QUERIES))
+            for name, table in variants:
+                size = _size(cursor, table, name != "heap", args.distributed)
+                timings = [
+                    _time(cursor, sql.format(table=table), params, args.rounds) * 1000
+                    for sql in QUERIES.values()
+                ]
+                print(
+                    f"{name:<12} {size / 1024 ** 2:>8.1f}MB "
+                    + " ".join(f"{timing:>13.1f}ms" for timing in timings)
+                )
+        finally:
+            if not args.keep:
+                cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark del índice columnar de búsqueda frente a la ruta SQL.
+
+Uso:
+    python scripts/bench_listing_index.py --sizes 100000,1000000
+    python scripts/bench_listing_index.py --sql   # además mide la ruta SQL
+
+El índice se llena con listings sintéticos (distribución parecida a
+db_test_data.sql, con bitmap de noches) y se miden latencias p50/p99 por
+combinación de filtros, incluidas búsquedas por fechas y fechas flexibles.
+Con --sql las mismas búsquedas se lanzan contra la base configurada en .env
+(que debe tener un volumen de propiedades comparable) usando el mismo
+statement que PropertyDiscoveryService.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.listing_index import NIGHTS_BYTES, ListingIndex  # noqa: E402
+
+
+TODAY = date.today()
+
+QUERIES = {
+    "sin filtros": {},
+    "precio": {"min_price": Decimal("80"), "max_price": Decimal("150")},
+    "región+capacidad": {"region_id": 3, "min_adults": 4, "min_children": 1},
+    "ciudad+tipo": {"city_id": 42, "property_type_id": 2},
+    "2 amenities": {"amenities": [3, 7]},
+    "todo": {
+        "region_id": 2, "min_price": Decimal("50"), "max_price": Decimal("300"),
+        "min_adults": 2, "property_type_id": 1, "amenities": [1, 5, 9]
+    },
+    "fechas (5 noches)": {
+        "check_in": TODAY + timedelta(days=60), "check_out": TODAY + timedelta(days=65)
+    },
+    "flexible 3 en 30d": {
+        "check_in": TODAY + timedelta(days=30), "check_out": TODAY + timedelta(days=60),
+        "flexible_nights": 3
+    },
+}
+
+
+def build_index(size: int, seed: int = 7) -> ListingIndex:
+    rng = np.random.default_rng(seed)
+    index = ListingIndex(capacity=size)
+    base = datetime(2023, 1, 1)
+    prices = rng.integers(2000, 50000, size)
+    regions = rng.integers(1, 6, size)
+    types = rng.integers(1, 6, size)
+    cities = rng.integers(1, 200, size)
+    adults = rng.integers(1, 9, size)
+    children = rng.integers(0, 5, size)
+    hours = rng.integers(0, 24 * 700, size)
+    active = rng.random(size) > 0.05
+    amenity_counts = rng.integers(0, 12, size)
+    latitudes = rng.uniform(36.0, 43.5, size)
+    longitudes = rng.uniform(-9.3, 3.3, size)
+    for i in range(size):
+        row = (
+            i + 1, int(regions[i]), Decimal(int(prices[i])) / 100, int(types[i]), int(cities[i]),
+            int(adults[i]), int(children[i]), 1, 1, base + timedelta(hours=int(hours[i])),
+            bool(active[i]), None, None, float(latitudes[i]), float(longitudes[i])
+        )
+        index._upsert_row(row, rng.choice(30, amenity_counts[i], replace=False) + 1)
+    # ~70% de noches libres, en bloques de una semana
+    weeks = rng.random((size, NIGHTS_BYTES)) < 0.7
+    index.nights[:size] = np.where(weeks, 0xFF, 0).astype(np.uint8)
+    index.nights_origin = TODAY
+    index.ready = True
+    return index
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench_index(sizes, repeat):
+    for size in sizes:
+        started = time.perf_counter()
+        index = build_index(size)
+        print(f"\n[índice] {size:,} listings, build {time.perf_counter() - started:.1f}s, "
+              f"{index.stats()['bytes'] / 1e6:.1f} MB")
+        for name, filters in QUERIES.items():
+            for sort_by in ("created_at", "price"):
+                p50, p99 = timed(lambda: index.search(limit=20, sort_by=sort_by, **filters), repeat)
+                print(f"  {name:<18} sort={sort_by:<10} p50={p50 * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms")
+
+
+def bench_sql(repeat):
+    from repositories.database import SessionLocal
+    from services.property_discovery_service import PropertyDiscoveryService
+
+    print("\n[sql]")
+    with SessionLocal() as db:
+        for name, filters in QUERIES.items():
+            if "flexible_nights" in filters:
+                continue  # Sin equivalente SQL
+            for sort_by in ("created_at", "price"):
+                statement = PropertyDiscoveryService._search_statement(limit=20, sort_by=sort_by, **filters)
+                p50, p99 = timed(lambda: db.execute(statement).unique().all(), repeat)
+                print(f"  {name:<18} sort={sort_by:<10} p50={p50 * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--sql", action="store_true")
+    args = parser.parse_args()
+
+    bench_index([int(size) for size in args.sizes.split(",")], args.repeat)
+    if args.sql:
+        bench_sql(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
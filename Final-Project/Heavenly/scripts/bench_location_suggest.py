@@ -0,0 +1,68 @@
+"""
+Latencia de /locations/suggest medida sobre el índice en memoria (sin HTTP).
+
+Uso:
+    python scripts/bench_location_suggest.py --queries 20000
+    python scripts/bench_location_suggest.py --limit 20 --seed 7
+
+Carga las tablas de referencia y el recuento de propiedades por ciudad una
+vez (como al arrancar la API) y consulta prefijos aleatorios de nombres
+reales de ciudades, regiones y países, de 1 letra al nombre completo, en
+minúsculas y sin acentos la mitad de las veces. Muestra p50/p99/máximo.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    import models  # noqa: F401
+    from repositories.database import SessionLocal
+    from services.location_suggest import fold, listing_counts_statement, location_suggest
+    from services.reference_data import reference_data
+
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        snapshot = reference_data.load(db)
+        counts = dict(db.execute(listing_counts_statement()).all())
+    location_suggest.build(snapshot, counts)
+    print(f"build: {(time.perf_counter() - start) * 1000:.1f}ms {location_suggest.stats()}")
+
+    names = [row.name for table in (snapshot.cities, snapshot.regions, snapshot.countries) for row in table.values()]
+    if not names:
+        print("no reference data")
+        return
+    rng = random.Random(args.seed)
+    queries = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        if rng.random() < 0.5:
+            name = fold(name)
+        queries.append(name[:rng.randint(1, len(name))])
+
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        location_suggest.suggest(query, args.limit)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"queries={len(samples)} p50={statistics.median(samples) * 1e6:.1f}us "
+        f"p99={p99 * 1e6:.1f}us max={samples[-1] * 1e6:.1f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Latencia de GET /properties/ con y sin una ráfaga de logins.
+
+Uso:
+    uvicorn main:app --app-dir src --workers 1 &
+    python scripts/bench_login_load.py --email guest@example.com --password secret \
+        --login-clients 32 --seconds 20
+
+Fase 1: solo lectores de /properties/ (línea base). Fase 2: los mismos
+lectores mientras --login-clients hilos hacen POST /auth/ sin pausa. Con
+bcrypt en su executor acotado los p50/p99 de /properties/ deben quedar
+cerca de la línea base; los logins que no caben en la cola reciben 429.
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlparse
+
+
+def reader(host, port, stop, latencies, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn.request("GET", "/properties/?limit=20")
+            conn.getresponse().read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+
+
+def login_client(host, port, email, password, stop, results, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    body = urlencode({"username": email, "password": password})
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    local = Counter()
+    while not stop.is_set():
+        try:
+            conn.request("POST", "/auth/", body, headers)
+            response = conn.getresponse()
+            response.read()
+            local[response.status] += 1
+        except (OSError, http.client.HTTPException):
+            local["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.close()
+    with lock:
+        results.update(local)
+
+
+def run_phase(host, port, args, with_logins):
+    stop, lock = threading.Event(), threading.Lock()
+    latencies, logins = [], Counter()
+    threads = [
+        threading.Thread(target=reader, args=(host, port, stop, latencies, lock))
+        for _ in range(args.readers)
+    ]
+    if with_logins:
+        threads += [
+            threading.Thread(target=login_client, args=(host, port, args.email, args.password, stop, logins, lock))
+            for _ in range(args.login_clients)
+        ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), logins
+
+
+def report(name, latencies, logins, seconds):
+    if not latencies:
+        print(f"{name}: no /properties/ responses")
+        return
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name}: /properties/ {len(latencies) / seconds:.1f} req/s "
+          f"p50={statistics.median(latencies) * 1000:.1f}ms p99={p99 * 1000:.1f}ms")
+    if logins:
+        print("  logins: " + ", ".join(f"{status}={count}" for status, count in sorted(logins.items(), key=str)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--login-clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    target = urlparse(args.url)
+    host, port = target.hostname, target.port or 80
+
+    report("baseline", *run_phase(host, port, args, with_logins=False), args.seconds)
+    report("login burst", *run_phase(host, port, args, with_logins=True), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Latencia de la búsqueda por mapa del índice en memoria (sin HTTP ni base de datos).
+
+Uso:
+    python scripts/bench_map_search.py --listings 500000 --pans 2000
+    python scripts/bench_map_search.py --span 0.5 --grid 32
+
+Genera alojamientos sintéticos repartidos por varias "ciudades" (la mayoría
+concentrados cerca del centro, como en un catálogo real) y simula
+desplazamientos del mapa: cada paso mueve un área de --span grados y pide
+la primera página por precio (?bbox=) y los clústeres de /properties/map.
+Compara con el mismo índice sin rejilla (recorrido completo de los arrays).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def _listings(count: int, rng: random.Random):
+    centers = [(rng.uniform(-40, 40), rng.uniform(-120, 60)) for _ in range(50)]
+    rows = {}
+    for property_id in range(1, count + 1):
+        lat, lon = rng.choice(centers)
+        rows[property_id] = (
+            property_id, rng.randint(1, 8), Decimal(rng.randint(2000, 60000)) / 100, rng.randint(1, 5),
+            rng.randint(1, 500), rng.randint(1, 8), 0, 0, 0,
+            datetime(2024, 1, 1) + timedelta(minutes=property_id), True, None, [],
+            lat + rng.gauss(0, 0.2), lon + rng.gauss(0, 0.2)
+        )
+    return rows, centers
+
+
+def _report(name: str, samples: list) -> None:
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<14} p50={statistics.median(samples) * 1000:.2f}ms p99={p99 * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=200000)
+    parser.add_argument("--pans", type=int, default=1000)
+    parser.add_argument("--span", type=float, default=0.3, help="Lado del área visible en grados")
+    parser.add_argument("--grid", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from services import listing_index as module
+    from services.geo import BBox, cluster_degrees
+
+    rng = random.Random(args.seed)
+    rows, centers = _listings(args.listings, rng)
+    index = module.ListingIndex()
+    index._load_batch(rows, full=True)
+    index.ready = True
+
+    boxes = []
+    lat, lon = rng.choice(centers)
+    for step in range(args.pans):
+        if step % 50 == 0:
+            lat, lon = rng.choice(centers)
+        lat += rng.uniform(-0.3, 0.3) * args.span
+        lon += rng.uniform(-0.3, 0.3) * args.span
+        boxes.append(BBox(lon - args.span / 2, lat - args.span / 2, lon + args.span / 2, lat + args.span / 2))
+
+    for name, max_rows in (("grid", module._GRID_MAX_ROWS), ("scan", -1)):
+        module._GRID_MAX_ROWS = max_rows
+        pages, clusters = [], []
+        for box in boxes:
+            start = time.perf_counter()
+            index.search(limit=50, sort_by="price", sort_order="asc", bbox=box)
+            pages.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.clusters(cluster_degrees(box, args.grid), bbox=box)
+            clusters.append(time.perf_counter() - start)
+        _report(f"{name} page", pages)
+        _report(f"{name} clusters", clusters)
+    print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Coste de cotizar una página de resultados: una cotización por tarjeta frente
+a una sola cotización por lotes (motor de services/pricing.py, sin base de datos).
+
+Uso:
+    python scripts/bench_price_quotes.py --page 50 --nights 7
+    python scripts/bench_price_quotes.py --rules 8 --rounds 500
+
+Genera propiedades sintéticas con reglas de temporada, fin de semana,
+duración de la estancia y suplementos, y mide p50/p99 de cotizar la misma
+estancia para toda la página de las dos formas.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def _pricings(count: int, rules_per_property: int, rng: random.Random):
+    from services.pricing import Pricing, Rule
+
+    year_start = date(2025, 1, 1).toordinal()
+    pricings = []
+    for property_id in range(1, count + 1):
+        rules = []
+        for _ in range(rules_per_property):
+            kind = rng.choice(("nightly", "nightly", "nightly", "length_of_stay", "extra_guest", "pet"))
+            start = year_start + rng.randint(0, 300)
+            rules.append(Rule(
+                kind=kind,
+                start=start,
+                end=start + rng.randint(7, 90),
+                weekdays=rng.choice((0b1111111, 0b0110000)),
+                min_nights=rng.randint(3, 28),
+                guests_included=rng.randint(1, 4),
+                amount_cents=rng.randint(1000, 40000) if rng.random() < 0.5 or kind != "nightly" else -1,
+                percent=float(rng.randint(5, 40))
+            ))
+        pricings.append(Pricing(property_id, rng.randint(1, 10), rng.randint(3000, 60000), tuple(rules)))
+    return pricings
+
+
+def _report(name: str, samples: list) -> None:
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<10} p50={statistics.median(samples) * 1000:.3f}ms p99={p99 * 1000:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=50, help="Tarjetas por página de resultados")
+    parser.add_argument("--nights", type=int, default=7)
+    parser.add_argument("--rules", type=int, default=4, help="Reglas por propiedad")
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from services.pricing import quote
+
+    rng = random.Random(args.seed)
+    pricings = _pricings(args.page, args.rules, rng)
+    per_card, batched = [], []
+    for _ in range(args.rounds):
+        check_in = date(2025, 1, 1) + timedelta(days=rng.randint(0, 300))
+        check_out = check_in + timedelta(days=args.nights)
+
+        start = time.perf_counter()
+        for pricing in pricings:
+            quote([pricing], check_in, check_out, adults=2, pets=1)
+        per_card.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        quote(pricings, check_in, check_out, adults=2, pets=1)
+        batched.append(time.perf_counter() - start)
+
+    _report("per card", per_card)
+    _report("batch", batched)
+
+
+if __name__ == "__main__":
+    main()
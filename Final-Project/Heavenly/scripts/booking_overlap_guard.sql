@@ -0,0 +1,28 @@
+-- ============================================================================
+-- Migración: restricción de exclusión contra reservas solapadas
+-- ============================================================================
+-- Para clusters creados antes de que db_citus.sql incluyera
+-- excl_booking_overlap. Ejecutar en el coordinator.
+--
+-- Si ya existen reservas activas solapadas el ALTER falla; la consulta de
+-- abajo las lista para resolverlas (cancelar una de cada par) antes.
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+SELECT a.region_id, a.property_id, a.id AS booking_a, b.id AS booking_b
+FROM booking a
+JOIN booking b
+  ON b.region_id = a.region_id
+ AND b.property_id = a.property_id
+ AND b.id > a.id
+ AND daterange(b.check_in, b.check_out) && daterange(a.check_in, a.check_out)
+WHERE a.status IN ('PENDING', 'CONFIRMED')
+  AND b.status IN ('PENDING', 'CONFIRMED');
+
+ALTER TABLE booking
+    ADD CONSTRAINT excl_booking_overlap EXCLUDE USING gist (
+        region_id WITH =,
+        property_id WITH =,
+        daterange(check_in, check_out) WITH &&
+    ) WHERE (status IN ('PENDING', 'CONFIRMED'));
@@ -0,0 +1,43 @@
+"""
+Compacta los calendarios (available_date) fragmentados.
+
+Uso:
+    python scripts/compact_availability.py                 # todas las regiones
+    python scripts/compact_availability.py --region-id 3 --batch-size 200
+
+Une rangos adyacentes con el mismo is_available y resuelve solapes (gana el
+rango bloqueado), una región cada vez y con un commit por lote de
+propiedades. Es lo mismo que hace la tarea periódica de la aplicación
+cuando AVAILABILITY_COMPACTION_INTERVAL_SECONDS > 0.
+"""
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import select
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--region-id", type=int, action="append", help="Región a compactar (repetible)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    import models  # noqa: F401
+    from models.region import Region
+    from repositories.database import SessionLocal
+    from services.availability_intervals import compact_region
+
+    with SessionLocal() as db:
+        region_ids = args.region_id or db.execute(select(Region.id).order_by(Region.id)).scalars().all()
+        for region_id in region_ids:
+            started = time.perf_counter()
+            stats = compact_region(db, region_id, args.batch_size)
+            print(f"region {region_id}: {stats} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
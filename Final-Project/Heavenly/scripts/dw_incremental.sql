@@ -0,0 +1,34 @@
+-- ============================================================================
+-- Migración: carga incremental de fact_booking
+-- ============================================================================
+-- Para DW creados antes de que dw_schema.sql incluyera booking_id y la marca
+-- de agua. Ejecutar en el coordinator.
+--
+-- Las cargas completas anteriores duplicaban hechos y no guardaban la reserva
+-- de origen, así que fact_booking se vacía: la primera ejecución de
+-- run_bi_etl, sin marca de agua, recarga todo el histórico por lotes y las
+-- siguientes solo los cambios.
+-- ============================================================================
+
+TRUNCATE fact_booking;
+
+ALTER TABLE fact_booking ADD COLUMN IF NOT EXISTS booking_id BIGINT NOT NULL;
+ALTER TABLE fact_booking ADD COLUMN IF NOT EXISTS source_updated_at TIMESTAMP;
+ALTER TABLE fact_booking DROP CONSTRAINT IF EXISTS uq_fact_booking_source;
+ALTER TABLE fact_booking ADD CONSTRAINT uq_fact_booking_source UNIQUE (booking_id, region_id);
+
+CREATE TABLE IF NOT EXISTS dw_etl_watermark (
+    source VARCHAR(20) PRIMARY KEY,
+    updated_at TIMESTAMP NOT NULL,
+    last_id BIGINT NOT NULL,
+    last_region_id INT NOT NULL,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+SELECT create_reference_table('dw_etl_watermark')
+WHERE NOT EXISTS (
+    SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'dw_etl_watermark'::regclass
+);
+
+CREATE INDEX IF NOT EXISTS idx_booking_updated ON booking(updated_at, id, region_id);
+CREATE INDEX IF NOT EXISTS idx_payment_updated ON payment(updated_at, id, region_id);
@@ -40,4 +40,6 @@ LEFT JOIN region r ON fm.region_id = r.id
 LEFT JOIN Property_Summary ps ON fm.region_id = ps.region_id
 ORDER BY dd.full_date DESC;
 
+-- Necesario para REFRESH MATERIALIZED VIEW CONCURRENTLY (services/bi_service.py);
+-- sin él el ETL recurre al REFRESH normal, que bloquea las lecturas
 CREATE UNIQUE INDEX idx_vm_revpar_pk ON vm_regional_kpis (region_id, full_date);
\ No newline at end of file
@@ -0,0 +1,37 @@
+-- ============================================================================
+-- Migración: marca de agua por región para la carga paralela de fact_booking
+-- ============================================================================
+-- Para DW que ya tenían la marca de agua global de scripts/dw_incremental.sql.
+-- Ejecutar en el coordinator. Cada región parte de la marca global (con
+-- last_id = 0 se vuelven a cargar las filas de ese mismo instante, lo que es
+-- inocuo porque la carga es un upsert).
+-- ============================================================================
+
+ALTER TABLE dw_etl_watermark RENAME TO dw_etl_watermark_global;
+
+CREATE TABLE dw_etl_watermark (
+    region_id INT NOT NULL,
+    source VARCHAR(20) NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    last_id BIGINT NOT NULL,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMP,
+    status VARCHAR(10) NOT NULL DEFAULT 'ok',
+    last_error TEXT,
+    attempted_at TIMESTAMP,
+    PRIMARY KEY (region_id, source)
+);
+SELECT create_distributed_table('dw_etl_watermark', 'region_id', colocate_with => 'booking');
+
+INSERT INTO dw_etl_watermark (region_id, source, updated_at, last_id, rows_loaded, loaded_at)
+SELECT r.id, g.source, g.updated_at, 0, 0, g.loaded_at
+FROM dw_etl_watermark_global g
+CROSS JOIN region r;
+
+DROP TABLE dw_etl_watermark_global;
+
+-- Las consultas de cambios filtran por región: el índice empieza por region_id
+DROP INDEX IF EXISTS idx_booking_updated;
+DROP INDEX IF EXISTS idx_payment_updated;
+CREATE INDEX idx_booking_updated ON booking(region_id, updated_at, id);
+CREATE INDEX idx_payment_updated ON payment(region_id, updated_at, id);
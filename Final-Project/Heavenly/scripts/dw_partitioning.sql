@@ -0,0 +1,74 @@
+-- ============================================================================
+-- Migración: fact_booking particionada por mes con particiones columnares
+-- ============================================================================
+-- Para DW creados antes de que dw_schema.sql particionara fact_booking.
+-- Ejecutar en el coordinator, sin el ETL en marcha. Copia los hechos a la
+-- tabla particionada (las claves incluyen ahora check_in_date, como exige
+-- Postgres) y pasa a columnar los meses con más de 13 meses de antigüedad
+-- (BI_FACT_COLUMNAR_AFTER_MONTHS); las siguientes ejecuciones del ETL crean
+-- las particiones nuevas y convierten las que van envejeciendo.
+-- ============================================================================
+
+ALTER TABLE fact_booking RENAME TO fact_booking_heap;
+
+CREATE TABLE fact_booking (
+    booking_key BIGSERIAL,
+    booking_id BIGINT NOT NULL,
+    dim_date_id INT NOT NULL,
+    dim_host_id BIGINT NOT NULL,
+    dim_guest_id BIGINT NOT NULL,
+    dim_property_id BIGINT NOT NULL,
+    dim_currency_id INT NOT NULL,
+    region_id INT NOT NULL,
+    nights_booked INT NOT NULL,
+    total_revenue NUMERIC(10, 2) NOT NULL,
+    host_commission NUMERIC(10, 2) NOT NULL,
+    platform_commission NUMERIC(10, 2) NOT NULL,
+    guest_adults INT NOT NULL,
+    guest_children INT NOT NULL,
+    booking_status booking_status NOT NULL,
+    payment_status payment_status NOT NULL,
+    check_in_date DATE NOT NULL,
+    source_updated_at TIMESTAMP,
+    PRIMARY KEY (booking_key, region_id, check_in_date),
+    CONSTRAINT uq_fact_booking_partitioned UNIQUE (booking_id, region_id, check_in_date)
+) PARTITION BY RANGE (check_in_date);
+SELECT create_distributed_table('fact_booking', 'region_id', colocate_with => 'booking');
+
+-- Un mes por partición desde el primer check_in hasta dentro de un año
+DO $$
+DECLARE
+    first_day DATE;
+    last_day DATE;
+BEGIN
+    SELECT min(check_in_date), max(check_in_date) INTO first_day, last_day FROM fact_booking_heap;
+    PERFORM create_time_partitions(
+        'fact_booking',
+        INTERVAL '1 month',
+        date_trunc('month', GREATEST(last_day, CURRENT_DATE)) + INTERVAL '13 months',
+        date_trunc('month', LEAST(first_day, CURRENT_DATE))
+    );
+END $$;
+
+INSERT INTO fact_booking (
+    booking_id, dim_date_id, dim_host_id, dim_guest_id, dim_property_id, dim_currency_id, region_id,
+    nights_booked, total_revenue, host_commission, platform_commission,
+    guest_adults, guest_children, booking_status, payment_status, check_in_date, source_updated_at
+)
+SELECT
+    booking_id, dim_date_id, dim_host_id, dim_guest_id, dim_property_id, dim_currency_id, region_id,
+    nights_booked, total_revenue, host_commission, platform_commission,
+    guest_adults, guest_children, booking_status, payment_status, check_in_date, source_updated_at
+FROM fact_booking_heap;
+
+-- vm_regional_kpis depende de la tabla anterior: se recrea sobre la nueva
+DROP MATERIALIZED VIEW IF EXISTS vm_regional_kpis;
+DROP TABLE fact_booking_heap;
+ALTER TABLE fact_booking RENAME CONSTRAINT uq_fact_booking_partitioned TO uq_fact_booking_source;
+\ir dw_kpis.sql
+
+CALL alter_old_partitions_set_access_method(
+    'fact_booking',
+    date_trunc('month', CURRENT_DATE) - INTERVAL '13 months',
+    'columnar'
+);
@@ -0,0 +1,68 @@
+-- ============================================================================
+-- Migración: ejecuciones del ETL y rollups incrementales de KPIs
+-- ============================================================================
+-- Para DW creados antes de que dw_schema.sql incluyera dw_etl_batch,
+-- dw_kpi_dirty y las tablas kpi_*. Ejecutar en el coordinator. Marca como
+-- pendientes todas las fechas de fact_booking, así que la siguiente
+-- ejecución de services/bi_service.py construye los rollups completos; a
+-- partir de ahí solo recalcula las fechas que toca cada carga.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS dw_etl_batch (
+    id BIGSERIAL PRIMARY KEY,
+    started_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+    finished_at TIMESTAMP,
+    status VARCHAR(10) NOT NULL DEFAULT 'running',
+    facts BIGINT NOT NULL DEFAULT 0,
+    failed_regions INT[] NOT NULL DEFAULT '{}'
+);
+SELECT create_reference_table('dw_etl_batch')
+WHERE NOT EXISTS (SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'dw_etl_batch'::regclass);
+
+CREATE TABLE IF NOT EXISTS dw_kpi_dirty (
+    region_id INT NOT NULL,
+    day DATE NOT NULL,
+    PRIMARY KEY (region_id, day)
+);
+SELECT create_distributed_table('dw_kpi_dirty', 'region_id', colocate_with => 'booking')
+WHERE NOT EXISTS (SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'dw_kpi_dirty'::regclass);
+
+CREATE TABLE IF NOT EXISTS kpi_daily (
+    region_id INT NOT NULL,
+    period_start DATE NOT NULL,
+    days INT NOT NULL,
+    bookings BIGINT NOT NULL,
+    nights_booked BIGINT NOT NULL,
+    total_revenue NUMERIC(14, 2) NOT NULL,
+    active_properties INT NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (region_id, period_start)
+);
+SELECT create_distributed_table('kpi_daily', 'region_id', colocate_with => 'booking')
+WHERE NOT EXISTS (SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'kpi_daily'::regclass);
+
+CREATE TABLE IF NOT EXISTS kpi_monthly (LIKE kpi_daily INCLUDING ALL);
+SELECT create_distributed_table('kpi_monthly', 'region_id', colocate_with => 'booking')
+WHERE NOT EXISTS (SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'kpi_monthly'::regclass);
+
+CREATE TABLE IF NOT EXISTS kpi_quarterly (LIKE kpi_daily INCLUDING ALL);
+SELECT create_distributed_table('kpi_quarterly', 'region_id', colocate_with => 'booking')
+WHERE NOT EXISTS (SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'kpi_quarterly'::regclass);
+
+CREATE TABLE IF NOT EXISTS kpi_rollup_state (
+    region_id INT NOT NULL,
+    granularity VARCHAR(10) NOT NULL,
+    etl_batch_id BIGINT,
+    periods_refreshed INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (region_id, granularity)
+);
+SELECT create_distributed_table('kpi_rollup_state', 'region_id', colocate_with => 'booking')
+WHERE NOT EXISTS (SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'kpi_rollup_state'::regclass);
+
+INSERT INTO dw_kpi_dirty (region_id, day)
+SELECT DISTINCT region_id, check_in_date FROM fact_booking
+ON CONFLICT DO NOTHING;
+
+-- REFRESH ... CONCURRENTLY necesita el índice único de la vista
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vm_revpar_pk ON vm_regional_kpis (region_id, full_date);
@@ -18,9 +18,23 @@ SELECT create_reference_table('dim_date');
 -- ====================================================================
 -- DW: Tabla de Hechos (Fact_Booking)
 -- ====================================================================
+-- Un hecho por reserva de origen: la carga incremental (services/bi_service.py)
+-- hace upsert por (booking_id, region_id, check_in_date).
+--
+-- Particionada por mes de check_in_date (particiones de tiempo de Citus):
+-- las consultas de KPIs filtran por fecha y solo leen los meses que piden.
+-- Las particiones antiguas se pasan a almacenamiento columnar (comprimido y
+-- leyendo solo las columnas de la consulta); columnar no admite UPDATE ni
+-- DELETE, así que el ETL las devuelve a heap antes de escribir en ellas (ver
+-- prepare_partitions en bi_service.py). La clave única incluye la columna de
+-- partición, como exige Postgres: si cambia el check_in de una reserva, el
+-- ETL borra su hecho anterior antes del upsert. Sin clave foránea a
+-- dim_date (no se admite en particiones columnares); el ETL amplía dim_date
+-- antes de cada carga.
 CREATE TABLE IF NOT EXISTS fact_booking (
     booking_key BIGSERIAL,
-    dim_date_id INT NOT NULL REFERENCES dim_date(id),
+    booking_id BIGINT NOT NULL,
+    dim_date_id INT NOT NULL,
     dim_host_id BIGINT NOT NULL,
     dim_guest_id BIGINT NOT NULL,
     dim_property_id BIGINT NOT NULL,
@@ -35,6 +49,98 @@ CREATE TABLE IF NOT EXISTS fact_booking (
     booking_status booking_status NOT NULL,          
     payment_status payment_status NOT NULL,
     check_in_date DATE NOT NULL,
-    PRIMARY KEY (booking_key, region_id)
+    source_updated_at TIMESTAMP,                      -- GREATEST(booking, payment).updated_at
+    PRIMARY KEY (booking_key, region_id, check_in_date),
+    CONSTRAINT uq_fact_booking_source UNIQUE (booking_id, region_id, check_in_date)
+) PARTITION BY RANGE (check_in_date);
+SELECT create_distributed_table('fact_booking', 'region_id', colocate_with => 'booking');
+SELECT create_time_partitions('fact_booking', INTERVAL '1 month', '2027-01-01', '2024-01-01');
+
+-- ====================================================================
+-- DW: Marca de agua de la carga incremental
+-- ====================================================================
+-- Última fila cargada por región y tabla de origen, en el orden
+-- (updated_at, id) en que se recorren los cambios, y estado del último
+-- intento. Cada región se carga por separado (services/bi_service.py) y
+-- avanza su marca en la misma transacción que cada lote de hechos; al estar
+-- co-localizada con booking, esa transacción no sale del shard de la región.
+CREATE TABLE IF NOT EXISTS dw_etl_watermark (
+    region_id INT NOT NULL,
+    source VARCHAR(20) NOT NULL,                      -- 'booking' | 'payment'
+    updated_at TIMESTAMP NOT NULL,
+    last_id BIGINT NOT NULL,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMP,
+    status VARCHAR(10) NOT NULL DEFAULT 'ok',         -- 'ok' | 'failed'
+    last_error TEXT,
+    attempted_at TIMESTAMP,
+    PRIMARY KEY (region_id, source)
+);
+SELECT create_distributed_table('dw_etl_watermark', 'region_id', colocate_with => 'booking');
+
+-- ====================================================================
+-- DW: Ejecuciones del ETL
+-- ====================================================================
+-- Una fila por ejecución de run_bi_etl; los rollups de KPIs guardan el id
+-- de la ejecución que los actualizó por última vez.
+CREATE TABLE IF NOT EXISTS dw_etl_batch (
+    id BIGSERIAL PRIMARY KEY,
+    started_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+    finished_at TIMESTAMP,
+    status VARCHAR(10) NOT NULL DEFAULT 'running',    -- 'running' | 'ok' | 'partial' | 'failed'
+    facts BIGINT NOT NULL DEFAULT 0,
+    failed_regions INT[] NOT NULL DEFAULT '{}'
+);
+SELECT create_reference_table('dw_etl_batch');
+
+-- ====================================================================
+-- DW: Rollups de KPIs por región (diario, mensual y trimestral)
+-- ====================================================================
+-- Agregados de fact_booking por fecha de check_in (reservas CONFIRMED,
+-- COMPLETED y REVIEWED, como vm_regional_kpis). Cada lote de la carga
+-- incremental anota en dw_kpi_dirty los check_in que toca (los de antes y
+-- los de después del upsert) y, al terminar la carga, solo se recalculan
+-- esos días y los meses y trimestres que los contienen. Ocupación, ADR y
+-- RevPAR se derivan al leer:
+--   ocupación = nights_booked / (active_properties * days)
+--   ADR       = total_revenue / nights_booked
+--   RevPAR    = total_revenue / (active_properties * days)
+-- active_properties es el número de propiedades activas de la región al
+-- recalcular el periodo. Todo está co-localizado con booking, así que el
+-- recálculo de una región no sale de su shard.
+CREATE TABLE IF NOT EXISTS dw_kpi_dirty (
+    region_id INT NOT NULL,
+    day DATE NOT NULL,
+    PRIMARY KEY (region_id, day)
+);
+SELECT create_distributed_table('dw_kpi_dirty', 'region_id', colocate_with => 'booking');
+
+CREATE TABLE IF NOT EXISTS kpi_daily (
+    region_id INT NOT NULL,
+    period_start DATE NOT NULL,
+    days INT NOT NULL,
+    bookings BIGINT NOT NULL,
+    nights_booked BIGINT NOT NULL,
+    total_revenue NUMERIC(14, 2) NOT NULL,
+    active_properties INT NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (region_id, period_start)
+);
+SELECT create_distributed_table('kpi_daily', 'region_id', colocate_with => 'booking');
+
+CREATE TABLE IF NOT EXISTS kpi_monthly (LIKE kpi_daily INCLUDING ALL);
+SELECT create_distributed_table('kpi_monthly', 'region_id', colocate_with => 'booking');
+
+CREATE TABLE IF NOT EXISTS kpi_quarterly (LIKE kpi_daily INCLUDING ALL);
+SELECT create_distributed_table('kpi_quarterly', 'region_id', colocate_with => 'booking');
+
+-- Frescura de cada rollup por región: cuándo se recalculó y con qué ejecución
+CREATE TABLE IF NOT EXISTS kpi_rollup_state (
+    region_id INT NOT NULL,
+    granularity VARCHAR(10) NOT NULL,                 -- 'day' | 'month' | 'quarter'
+    etl_batch_id BIGINT,
+    periods_refreshed INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (region_id, granularity)
 );
-SELECT create_distributed_table('fact_booking', 'region_id', colocate_with => 'booking');
\ No newline at end of file
+SELECT create_distributed_table('kpi_rollup_state', 'region_id', colocate_with => 'booking');
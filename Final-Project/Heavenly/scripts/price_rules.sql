@@ -0,0 +1,36 @@
+-- ============================================================================
+-- Migración: tabla price_rule (reglas de precio por propiedad)
+-- ============================================================================
+-- Para clusters creados antes de que db_citus.sql la incluyera. Ejecutar en
+-- el coordinator. Sin reglas, una propiedad cobra price_night cada noche,
+-- igual que antes; los anfitriones las definen con
+-- PUT /properties/{id}/{region_id}/price-rules.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS price_rule (
+    id BIGSERIAL,
+    property_id BIGINT NOT NULL,
+    region_id INT NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    start_date DATE,
+    end_date DATE,
+    weekdays SMALLINT,
+    min_nights INTEGER,
+    guests_included INTEGER,
+    amount DECIMAL(10, 2),
+    percent DECIMAL(5, 2),
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, region_id),
+    CONSTRAINT chk_price_rule_kind CHECK (kind IN ('nightly', 'length_of_stay', 'extra_guest', 'pet')),
+    CONSTRAINT chk_price_rule_dates CHECK (end_date >= start_date),
+    CONSTRAINT chk_price_rule_weekdays CHECK (weekdays BETWEEN 1 AND 127)
+);
+
+SELECT create_distributed_table('price_rule', 'region_id', colocate_with => 'property')
+WHERE NOT EXISTS (
+    SELECT 1 FROM pg_dist_partition WHERE logicalrelid = 'price_rule'::regclass
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_rule_property ON price_rule(property_id, region_id);
@@ -0,0 +1,25 @@
+-- ============================================================================
+-- Migración: columna property.amenity_ids (INT[] + índice GIN)
+-- ============================================================================
+-- Para clusters creados antes de que db_citus.sql la incluyera. Ejecutar en
+-- el coordinator. El backfill une property y property_amenity por
+-- region_id (tablas co-localizadas), así que cada shard se actualiza solo.
+-- Después de esto PropertyService mantiene la columna en cada escritura.
+-- ============================================================================
+
+ALTER TABLE property ADD COLUMN IF NOT EXISTS amenity_ids INT[] NOT NULL DEFAULT '{}';
+
+UPDATE property p
+SET amenity_ids = pa.amenity_ids
+FROM (
+    SELECT property_id, region_id, array_agg(amenity_id ORDER BY amenity_id) AS amenity_ids
+    FROM property_amenity
+    GROUP BY property_id, region_id
+) pa
+WHERE p.id = pa.property_id
+  AND p.region_id = pa.region_id
+  AND p.amenity_ids IS DISTINCT FROM pa.amenity_ids;
+
+CREATE INDEX IF NOT EXISTS idx_property_amenity_ids ON property USING gin (amenity_ids);
+
+ANALYZE property;
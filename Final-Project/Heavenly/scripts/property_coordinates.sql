@@ -0,0 +1,18 @@
+-- ============================================================================
+-- Migración: columnas property.latitude / property.longitude
+-- ============================================================================
+-- Para clusters creados antes de que db_citus.sql las incluyera. Ejecutar en
+-- el coordinator. Las propiedades existentes quedan sin ubicar (NULL) y no
+-- aparecen en la búsqueda en mapa hasta que se les asignen coordenadas
+-- (PUT /properties/{id}/{region_id} con latitude y longitude).
+-- ============================================================================
+
+ALTER TABLE property ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION
+    CHECK (latitude BETWEEN -90 AND 90);
+ALTER TABLE property ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION
+    CHECK (longitude BETWEEN -180 AND 180);
+
+CREATE INDEX IF NOT EXISTS idx_property_lat_lon ON property(latitude, longitude)
+    WHERE latitude IS NOT NULL;
+
+ANALYZE property;
@@ -0,0 +1,41 @@
+-- ============================================================================
+-- NOTIFY reference_data al modificar una tabla de referencia
+-- ============================================================================
+-- Con REFERENCE_DATA_LISTEN=true cada worker de la API escucha el canal
+-- reference_data en el coordinator y recarga su registro en memoria
+-- (services/reference_data.py) al recibir una notificación.
+--
+-- Ejecutar en el coordinator. Los triggers se disparan en la réplica local
+-- de la tabla de referencia, así que el coordinator debe tener una
+-- (coordinator añadido con citus_set_coordinator_host + citus_add_node).
+-- Si no la tiene, quien modifique estas tablas puede
+-- ejecutar NOTIFY reference_data en la misma transacción; en cualquier caso
+-- la recarga periódica (REFERENCE_DATA_REFRESH_SECONDS) acota el retraso.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_reference_data() RETURNS trigger AS $$
+BEGIN
+    -- Una notificación por sentencia; el payload es la tabla modificada
+    PERFORM pg_notify('reference_data', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    reference_table TEXT;
+BEGIN
+    FOREACH reference_table IN ARRAY ARRAY[
+        'country', 'region', 'city', 'role',
+        'property_type', 'amenity', 'payment_method', 'currency'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notify_reference_data ON %I', reference_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notify_reference_data '
+            'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data()',
+            reference_table
+        );
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,356 @@
+"""
+Caché de dos niveles: L1 en memoria del proceso (LRU acotado con TTL) y
+L2 compartido en Redis. Los valores se guardan ya serializados (bytes),
+así que un hit evita tanto la consulta como la construcción del schema.
+
+LRUCache también se usa sola, para objetos de proceso que no pasan por
+Redis (precios, usuarios autenticados...).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Optional, Tuple, TypeVar
+
+import redis
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    LRU acotado por número de entradas, con TTL por entrada y seguro entre hilos.
+    Los valores se comparten entre peticiones (deben ser inmutables) y no
+    pueden ser None, que get() reserva para un fallo.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[V]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: V, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class FakeRedis:
+    """
+    Sustituto en memoria del cliente de Redis (solo los comandos que usa la app).
+    Se usa en tests y en desarrollo sin Redis (CACHE_FAKE_REDIS=true).
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(key)
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+        return True
+
+    def mget(self, keys) -> list:
+        with self._lock:
+            return [self._alive(key) for key in keys]
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            current = int(self._alive(key) or 0) + amount
+            self._data[key] = (None, str(current).encode())
+            return current
+
+    def pipeline(self, transaction: bool = False) -> "_FakePipeline":
+        return _FakePipeline(self)
+
+    def ping(self) -> bool:
+        return True
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
+
+
+class _FakePipeline:
+    """Pipeline de FakeRedis: acumula los SET y los aplica en execute()."""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands = []
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> "_FakePipeline":
+        self._commands.append((key, value, ex))
+        return self
+
+    def execute(self) -> list:
+        return [self._client.set(key, value, ex=ex) for key, value, ex in self._commands]
+
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Cliente de Redis compartido del proceso (o FakeRedis si está configurado).
+    Timeouts cortos: la caché nunca debe ser más lenta que la base de datos.
+    """
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                if settings.cache_fake_redis or settings.is_test:
+                    _redis_client = FakeRedis()
+                else:
+                    _redis_client = redis.Redis.from_url(
+                        settings.redis_url,
+                        socket_connect_timeout=settings.cache_redis_timeout_seconds,
+                        socket_timeout=settings.cache_redis_timeout_seconds
+                    )
+    return _redis_client
+
+
+class TwoTierCache:
+    """
+    L1 (LRU+TTL en proceso) delante de L2 (Redis, compartido entre workers).
+    Si Redis falla, la caché sigue funcionando solo con L1 y reintenta L2
+    pasado `l2_retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        l1_size: int,
+        l1_ttl_seconds: float,
+        l2_ttl_seconds: int,
+        redis_client=None,
+        l2_retry_seconds: float = 5.0
+    ):
+        self.namespace = namespace
+        self.l1: LRUCache[bytes] = LRUCache(l1_size, l1_ttl_seconds)
+        self.l2_ttl_seconds = l2_ttl_seconds
+        self._redis = redis_client
+        self.l2_retry_seconds = l2_retry_seconds
+        self._l2_down_until = 0.0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        CACHES[namespace] = self
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _l2_available(self) -> bool:
+        return settings.cache_redis_enabled and time.monotonic() >= self._l2_down_until
+
+    def _l2_failed(self, error: Exception) -> None:
+        self.l2_errors += 1
+        self._l2_down_until = time.monotonic() + self.l2_retry_seconds
+        logger.warning(f"Redis cache unavailable ({self.namespace}): {error}")
+
+    def _get_l2(self, full_key: str) -> Optional[bytes]:
+        if not self._l2_available():
+            return None
+        try:
+            value = self.redis.get(full_key)
+        except redis.RedisError as e:
+            self._l2_failed(e)
+            return None
+        if value is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        self.l1.set(full_key, value)
+        return value
+
+    def get(self, key) -> Optional[bytes]:
+        full_key = self._key(key)
+        value = self.l1.get(full_key)
+        if value is not None:
+            return value
+        return self._get_l2(full_key)
+
+    async def aget(self, key) -> Optional[bytes]:
+        """Como get(), pero consulta Redis fuera del event loop."""
+        full_key = self._key(key)
+        value = self.l1.get(full_key)
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self._get_l2, full_key)
+
+    def _get_many_l2(self, full_keys: Dict) -> Dict:
+        found = {}
+        if not full_keys or not self._l2_available():
+            return found
+        try:
+            values = self.redis.mget(list(full_keys))
+        except redis.RedisError as e:
+            self._l2_failed(e)
+            return found
+        for (full_key, key), value in zip(full_keys.items(), values):
+            if value is None:
+                self.l2_misses += 1
+                continue
+            self.l2_hits += 1
+            self.l1.set(full_key, value)
+            found[key] = value
+        return found
+
+    def _get_many_l1(self, keys) -> Tuple[Dict, Dict]:
+        found, missing = {}, {}
+        for key in keys:
+            full_key = self._key(key)
+            value = self.l1.get(full_key)
+            if value is None:
+                missing[full_key] = key
+            else:
+                found[key] = value
+        return found, missing
+
+    def get_many(self, keys) -> Dict:
+        """{clave: valor} de las claves presentes; las que faltan en L1 van en un solo MGET."""
+        found, missing = self._get_many_l1(keys)
+        found.update(self._get_many_l2(missing))
+        return found
+
+    async def aget_many(self, keys) -> Dict:
+        found, missing = self._get_many_l1(keys)
+        if missing:
+            found.update(await asyncio.to_thread(self._get_many_l2, missing))
+        return found
+
+    def set(self, key, value: bytes) -> None:
+        full_key = self._key(key)
+        self.l1.set(full_key, value)
+        if not self._l2_available():
+            return
+        try:
+            self.redis.set(full_key, value, ex=self.l2_ttl_seconds)
+        except redis.RedisError as e:
+            self._l2_failed(e)
+
+    async def aset(self, key, value: bytes) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def set_many(self, items: Dict) -> None:
+        """Varias entradas con un solo round trip a Redis (pipeline)."""
+        if not items:
+            return
+        for key, value in items.items():
+            self.l1.set(self._key(key), value)
+        if not self._l2_available():
+            return
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipeline.set(self._key(key), value, ex=self.l2_ttl_seconds)
+            pipeline.execute()
+        except redis.RedisError as e:
+            self._l2_failed(e)
+
+    async def aset_many(self, items: Dict) -> None:
+        await asyncio.to_thread(self.set_many, items)
+
+    def invalidate(self, key) -> None:
+        """
+        Borra la entrada en ambos niveles. Los L1 de otros workers expiran
+        por TTL (por eso el TTL de L1 es corto).
+        """
+        full_key = self._key(key)
+        self.l1.delete(full_key)
+        if not settings.cache_redis_enabled:
+            return
+        try:
+            self.redis.delete(full_key)
+        except redis.RedisError as e:
+            self._l2_failed(e)
+
+    def stats(self) -> dict:
+        return {
+            "l1_size": len(self.l1),
+            "l1_hits": self.l1.hits,
+            "l1_misses": self.l1.misses,
+            "l1_evictions": self.l1.evictions,
+            "l1_expirations": self.l1.expirations,
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_errors": self.l2_errors,
+        }
+
+
+# Registro de cachés del proceso, para exponer sus contadores
+CACHES: Dict[str, TwoTierCache] = {}
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in CACHES.items()}
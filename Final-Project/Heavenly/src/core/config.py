@@ -19,12 +19,99 @@ class Settings(BaseSettings):
     db_name: str = Field(default="heavenly", description="Nombre de la base de datos")
     db_user: str = Field(default="heavenly", description="Usuario de la base de datos")
     db_password: str = Field(default="", description="Contraseña de la base de datos")
+    db_async: bool = Field(
+        default=False,
+        description="Usa el engine asíncrono (asyncpg) en los endpoints de lectura y reserva"
+    )
+    db_pool_size: int = Field(default=10, description="Tamaño del pool de conexiones")
+    db_max_overflow: int = Field(default=20, description="Conexiones adicionales permitidas")
     
     # Redis
     redis_host: str = Field(default="localhost", description="Host de Redis")
     redis_port: int = Field(default=6380, description="Puerto de Redis")
     redis_db: int = Field(default=0, description="Base de datos de Redis")
     
+    # Caché
+    cache_redis_enabled: bool = Field(default=True, description="Usa Redis como segundo nivel de caché")
+    cache_fake_redis: bool = Field(default=False, description="Usa un Redis en memoria (tests/desarrollo)")
+    cache_redis_timeout_seconds: float = Field(default=0.2, description="Timeout de las operaciones de caché en Redis")
+    property_cache_l1_size: int = Field(default=10000, description="Entradas máximas del L1 de propiedades")
+    property_cache_l1_ttl_seconds: float = Field(default=30, description="TTL del L1 de propiedades")
+    property_cache_l2_ttl_seconds: int = Field(default=600, description="TTL en Redis de propiedades")
+    
+    # Caché de resultados de búsqueda
+    search_cache_enabled: bool = Field(default=False, description="Cachea las páginas de GET /properties/ por filtros")
+    search_cache_fresh_seconds: float = Field(default=30, description="Segundos en que una búsqueda cacheada es fresca")
+    search_cache_stale_seconds: float = Field(
+        default=300,
+        description="Segundos adicionales en que se sirve obsoleta mientras se recalcula"
+    )
+    search_cache_l1_size: int = Field(default=2000, description="Búsquedas máximas en el L1")
+    
+    # Tablas de referencia en memoria
+    reference_data_refresh_seconds: float = Field(
+        default=300,
+        description="Cada cuánto se recargan las tablas de referencia (0 = solo al arrancar)"
+    )
+    reference_data_listen: bool = Field(
+        default=False,
+        description="Recarga las tablas de referencia con LISTEN/NOTIFY (scripts/reference_data_notify.sql)"
+    )
+    location_suggest_refresh_seconds: float = Field(
+        default=300,
+        description="Cada cuánto se recuentan las propiedades por ciudad del autocompletado (0 = solo al arrancar)"
+    )
+    
+    # Listados (proyección sin ORM)
+    host_name_cache_size: int = Field(default=50000, description="Nombres de anfitrión cacheados por proceso")
+    host_name_cache_ttl_seconds: float = Field(default=600, description="TTL de los nombres de anfitrión en caché")
+    
+    # Precios (services/pricing.py)
+    pricing_cache_size: int = Field(default=50000, description="Propiedades con precio y reglas cacheados por proceso")
+    pricing_cache_ttl_seconds: float = Field(
+        default=60,
+        description="TTL del precio y las reglas en caché (cambios hechos desde otros workers)"
+    )
+    
+    # Analítica (GET /analytics/kpis, desde los rollups del DW)
+    analytics_cache_l1_size: int = Field(default=2000, description="Respuestas de KPIs máximas en el L1")
+    analytics_cache_ttl_seconds: int = Field(
+        default=3600,
+        description="TTL de las respuestas de KPIs en caché (la clave incluye la ejecución del ETL)"
+    )
+    analytics_batch_check_seconds: float = Field(
+        default=30,
+        description="Cada cuánto se relee la última ejecución del ETL (dw_etl_batch)"
+    )
+    
+    # Índice de búsqueda en memoria
+    listing_index_enabled: bool = Field(
+        default=False,
+        description="Resuelve los filtros de búsqueda con el índice columnar en memoria (NumPy)"
+    )
+    availability_index_enabled: bool = Field(
+        default=False,
+        description="Añade al índice el bitmap de noches libres por propiedad (requiere LISTING_INDEX_ENABLED)"
+    )
+    listing_index_refresh_seconds: float = Field(
+        default=30,
+        description="Cada cuánto se incorporan al índice las escrituras de otros workers"
+    )
+    listing_index_catch_up_lag_seconds: float = Field(
+        default=120,
+        description="Margen de la marca de agua del índice ante transacciones abiertas y desfase de reloj"
+    )
+    
+    # Compactación de calendarios (available_date)
+    availability_compaction_interval_seconds: float = Field(
+        default=0,
+        description="Cada cuánto se compactan los calendarios fragmentados (0 = desactivado)"
+    )
+    availability_compaction_batch_size: int = Field(
+        default=500,
+        description="Propiedades por lote (y por commit) de la compactación"
+    )
+    
     # Aplicación
     app_name: str = Field(default="Heavenly", description="Nombre de la aplicación")
     app_env: str = Field(default="development", description="Entorno de la aplicación")
@@ -36,6 +123,26 @@ class Settings(BaseSettings):
     jwt_algorithm: str = Field(default="HS256", description="Algoritmo JWT")
     jwt_expiration_minutes: int = Field(default=30, description="Minutos de expiración del JWT")
     
+    # Contraseñas (bcrypt)
+    password_bcrypt_rounds: int = Field(default=12, ge=4, le=31, description="Coste de bcrypt (log2 de iteraciones)")
+    password_hash_executor: str = Field(default="thread", description="Executor de bcrypt: thread o process")
+    password_hash_workers: int = Field(default=0, description="Workers de bcrypt (0 = núcleos de CPU)")
+    password_hash_queue_size: int = Field(
+        default=32,
+        description="Hashes en espera admitidos; por encima se responde 429"
+    )
+    principal_cache_size: int = Field(default=50000, description="Usuarios autenticados cacheados por proceso")
+    principal_cache_ttl_seconds: float = Field(
+        default=60,
+        description="TTL máximo del usuario autenticado en caché (nunca supera el exp del token)"
+    )
+    
+    # Citus
+    shard_key_guard: bool = Field(
+        default=False,
+        description="Falla las consultas sobre tablas distribuidas sin region_id (siempre activo en test)"
+    )
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -63,6 +170,11 @@ class Settings(BaseSettings):
         """Verifica si estamos en entorno de desarrollo."""
         return self.app_env.lower() == "development"
     
+    @property
+    def is_test(self) -> bool:
+        """Verifica si estamos en entorno de pruebas."""
+        return self.app_env.lower() == "test"
+    
     @property
     def is_production(self) -> bool:
         """Verifica si estamos en entorno de producción."""
@@ -0,0 +1,133 @@
+"""
+Hash y verificación de contraseñas (bcrypt) fuera de los hilos de las peticiones.
+
+bcrypt cuesta ~250ms de CPU por llamada con el coste por defecto. Las
+llamadas se ejecutan en un executor dedicado y acotado (hilos nativos: la
+librería bcrypt suelta el GIL; o procesos, PASSWORD_HASH_EXECUTOR=process),
+con una cola máxima: si está lleno se lanza PasswordHasherBusy (429) en vez
+de encolar sin límite y dejar sin hilos al resto de endpoints.
+
+Los hashes con un coste distinto del configurado se regeneran al verificar
+una contraseña correcta (verify_password devuelve el hash nuevo).
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+
+from core.config import settings
+
+# bcrypt solo usa los primeros 72 bytes (passlib los truncaba sin avisar)
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordHasherBusy(RuntimeError):
+    """El executor de hashing tiene todos los huecos (workers + cola) ocupados."""
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def _rounds(hashed: str) -> Optional[int]:
+    # $2b$12$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _verify(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    try:
+        valid = bcrypt.checkpw(_secret(password), hashed.encode("ascii"))
+    except ValueError:
+        return False, None
+    if valid and _rounds(hashed) != rounds:
+        return True, _hash(password, rounds)
+    return valid, None
+
+
+class PasswordHasher:
+    """Executor acotado para bcrypt; una instancia por proceso (`password_hasher`)."""
+
+    def __init__(self, workers: int, queue_size: int, kind: str = "thread"):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    pool = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                    self._executor = pool(max_workers=self.workers)
+        return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing is saturated, retry later")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password, settings.password_bcrypt_rounds).result()
+
+    def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(contraseña correcta, hash nuevo si el coste guardado está desactualizado)."""
+        return self._submit(_verify, password, hashed, settings.password_bcrypt_rounds).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password, settings.password_bcrypt_rounds))
+
+    async def verify_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(
+            self._submit(_verify, password, hashed, settings.password_bcrypt_rounds)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "bcrypt_rounds": settings.password_bcrypt_rounds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers or os.cpu_count() or 1,
+    queue_size=settings.password_hash_queue_size,
+    kind=settings.password_hash_executor
+)
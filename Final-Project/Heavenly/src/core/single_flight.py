@@ -0,0 +1,121 @@
+"""
+Coalescencia de peticiones idénticas concurrentes (single-flight).
+
+La primera petición con una clave ejecuta la función (líder); las que
+llegan con la misma clave mientras sigue en curso esperan su resultado en
+vez de repetir las consultas. El resultado (o la excepción) se comparte, así
+que debe tratarse como de solo lectura. No es una caché: al terminar el
+líder la clave se libera. En la ruta asíncrona, si se cancela el líder
+las seguidoras no reciben la cancelación: repiten la llamada.
+
+Las rutas síncronas (threadpool) y asíncronas (event loop) tienen grupos
+separados; las dos usan la misma clave normalizada.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def flight_key(*parts: Any, **params: Any) -> str:
+    """Clave normalizada: partes posicionales + parámetros ordenados, sin los None."""
+    named = [f"{name}={params[name]}" for name in sorted(params) if params[name] is not None]
+    return ":".join([*(str(part) for part in parts), *named])
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, "asyncio.Future"] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        SINGLE_FLIGHTS[name] = self
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        while True:
+            future = self._async_calls.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            # wait no cancela el futuro si la petición seguidora se cancela
+            await asyncio.wait((future,))
+            if not future.cancelled():
+                return future.result()
+            # El líder se canceló (p. ej. su cliente se desconectó): la clave
+            # ya está libre y la seguidora repite la llamada o se une al
+            # nuevo líder
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        self.leaders += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self.errors += 1
+            future.set_exception(e)
+            # Evita "exception was never retrieved" si no hay seguidores
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._calls) + len(self._async_calls),
+        }
+
+
+# Registro de grupos del proceso, para exponer sus contadores
+SINGLE_FLIGHTS: Dict[str, SingleFlight] = {}
+
+
+def single_flight_stats() -> Dict[str, dict]:
+    return {name: flight.stats() for name, flight in SINGLE_FLIGHTS.items()}
@@ -1,11 +1,96 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import threading
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from sqlalchemy import select
 
 from core.config import settings
-from repositories.database import engine
-from routers import users, locations, auth, properties, bookings, payments
+from core.cache import cache_stats
+from core.single_flight import single_flight_stats
+from core.passwords import PasswordHasherBusy, password_hasher
+from models.region import Region
+from repositories.database import SessionLocal, engine
+from services.availability_index import refresh_availability_index
+from services.availability_intervals import compact_region
+from services.location_suggest import listing_counts_statement, location_suggest
+from services.reference_data import listen_for_changes, reference_data
+from services.search_cache import search_cache_stats
+from services.listing_index import listing_index, refresh_listing_index
+from routers import users, locations, auth, properties, bookings, payments, analytics
 import models
 
+logger = logging.getLogger(__name__)
+
+
+def _refresh_listing_index():
+    with SessionLocal() as db:
+        refresh_listing_index(db)
+        if settings.availability_index_enabled:
+            refresh_availability_index(db)
+
+
+async def _keep_listing_index_fresh():
+    """Incorpora periódicamente las escrituras hechas desde otros workers."""
+    while True:
+        await asyncio.sleep(settings.listing_index_refresh_seconds)
+        try:
+            await asyncio.to_thread(_refresh_listing_index)
+        except Exception as e:
+            logger.warning(f"Listing index refresh failed: {e}")
+
+
+def _load_reference_data():
+    with SessionLocal() as db:
+        return reference_data.load(db)
+
+
+async def _keep_reference_data_fresh():
+    """Recarga periódica de las tablas de referencia en memoria."""
+    while True:
+        await asyncio.sleep(settings.reference_data_refresh_seconds)
+        try:
+            await asyncio.to_thread(_load_reference_data)
+        except Exception as e:
+            logger.warning(f"Reference data refresh failed: {e}")
+
+
+def _refresh_location_suggest():
+    with SessionLocal() as db:
+        snapshot = reference_data.ensure(db)
+        counts = dict(db.execute(listing_counts_statement()).all())
+    location_suggest.build(snapshot, counts)
+
+
+async def _keep_location_suggest_fresh():
+    """Recalcula el orden del autocompletado (propiedades por ciudad)."""
+    while True:
+        await asyncio.sleep(settings.location_suggest_refresh_seconds)
+        try:
+            await asyncio.to_thread(_refresh_location_suggest)
+        except Exception as e:
+            logger.warning(f"Location suggest refresh failed: {e}")
+
+
+def _compact_calendars():
+    with SessionLocal() as db:
+        region_ids = db.execute(select(Region.id).order_by(Region.id)).scalars().all()
+        for region_id in region_ids:
+            stats = compact_region(db, region_id, settings.availability_compaction_batch_size)
+            if stats["properties"]:
+                logger.info(f"Region {region_id} compaction: {stats}")
+
+
+async def _keep_calendars_compact():
+    """Desfragmenta los calendarios región por región, en lotes."""
+    while True:
+        await asyncio.sleep(settings.availability_compaction_interval_seconds)
+        try:
+            await asyncio.to_thread(_compact_calendars)
+        except Exception as e:
+            logger.warning(f"Calendar compaction failed: {e}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,7 +102,40 @@ async def lifespan(app: FastAPI):
     print(f"🗄️  Base de datos: {settings.db_host}:{settings.db_port}/{settings.db_name}")
     print(f"📦 Redis: {settings.redis_host}:{settings.redis_port}")
     print("=" * 50)
+    tasks = []
+    try:
+        snapshot = await asyncio.to_thread(_load_reference_data)
+        print(f"📚 Datos de referencia: {len(snapshot.cities)} ciudades, {len(snapshot.amenities)} amenities")
+    except Exception as e:
+        # Sin base al arrancar: se cargan en la primera petición que los necesite
+        logger.warning(f"Reference data not loaded at startup: {e}")
+    if settings.reference_data_refresh_seconds > 0:
+        tasks.append(asyncio.create_task(_keep_reference_data_fresh()))
+    try:
+        await asyncio.to_thread(_refresh_location_suggest)
+    except Exception as e:
+        logger.warning(f"Location suggestions not built at startup: {e}")
+    if settings.location_suggest_refresh_seconds > 0:
+        tasks.append(asyncio.create_task(_keep_location_suggest_fresh()))
+    stop_listening = threading.Event()
+    if settings.reference_data_listen:
+        threading.Thread(
+            target=listen_for_changes,
+            args=(engine, SessionLocal, stop_listening),
+            name="reference-data-listen",
+            daemon=True
+        ).start()
+    if settings.listing_index_enabled:
+        await asyncio.to_thread(_refresh_listing_index)
+        print(f"🔎 Índice de búsqueda: {len(listing_index)} propiedades")
+        tasks.append(asyncio.create_task(_keep_listing_index_fresh()))
+    if settings.availability_compaction_interval_seconds > 0:
+        tasks.append(asyncio.create_task(_keep_calendars_compact()))
     yield
+    for task in tasks:
+        task.cancel()
+    stop_listening.set()
+    password_hasher.shutdown()
     # Shutdown
     print(f"👋 Cerrando {settings.app_name}")
 
@@ -36,6 +154,17 @@ app.include_router(auth.router)
 app.include_router(properties.router)
 app.include_router(bookings.router)
 app.include_router(payments.router)
+app.include_router(analytics.router)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    """Backpressure del executor de bcrypt: el cliente debe reintentar."""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
 
 
 @app.get("/health")
@@ -47,3 +176,39 @@ async def health_check():
         "environment": settings.app_env
     }
 
+
+@app.get("/health/cache")
+async def cache_health():
+    """Contadores de hit/miss/eviction de las cachés del proceso."""
+    return {**cache_stats(), "search": search_cache_stats()}
+
+
+@app.get("/health/reference-data")
+async def reference_data_health():
+    """Versión, antigüedad y filas del snapshot de tablas de referencia."""
+    return reference_data.stats()
+
+
+@app.get("/health/location-suggest")
+async def location_suggest_health():
+    """Estado del índice de autocompletado de ubicaciones."""
+    return location_suggest.stats()
+
+
+@app.get("/health/listing-index")
+async def listing_index_health():
+    """Estado del índice de búsqueda en memoria."""
+    return {"enabled": settings.listing_index_enabled, **listing_index.stats()}
+
+
+@app.get("/health/single-flight")
+async def single_flight_health():
+    """Peticiones coalescidas (coalesced) frente a las que ejecutaron la carga (leaders)."""
+    return single_flight_stats()
+
+
+@app.get("/health/passwords")
+async def password_hasher_health():
+    """Ocupación del executor de bcrypt."""
+    return password_hasher.stats()
+
@@ -16,6 +16,7 @@ from models.property import Property
 from models.property_amenity import PropertyAmenity
 from models.property_photo import PropertyPhoto
 from models.available_date import AvailableDate
+from models.price_rule import PriceRule
 from models.booking import Booking
 from models.payment import Payment
 from models.review import Review
@@ -26,6 +27,6 @@ __all__ = [
     'UserStatus', 'BookingStatus', 'PaymentStatus', 'ReviewStatus',
     'Country', 'City', 'User', 'Role', 'UserRole',
     'PropertyType', 'Amenity', 'Region', 'PaymentMethod', 'Currency',
-    'Property', 'PropertyAmenity', 'PropertyPhoto', 'AvailableDate',
+    'Property', 'PropertyAmenity', 'PropertyPhoto', 'AvailableDate', 'PriceRule',
     'Booking', 'Payment', 'Review', 'ReviewResponse'
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Enum, Integer, BigInteger, Date, Numeric, ForeignKey, DateTime
+from sqlalchemy import Column, Enum, Integer, BigInteger, Date, Numeric, ForeignKey, DateTime, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from models.base import Base
@@ -27,6 +28,18 @@ class Booking(Base):
     created_at = Column(DateTime(timezone=False), server_default=func.now())
     updated_at = Column(DateTime(timezone=False), server_default=func.now(), onupdate=func.now())
     
+    __table_args__ = (
+        # Garantiza en la base que no haya reservas activas solapadas (db_citus.sql)
+        ExcludeConstraint(
+            (region_id, "="),
+            (property_id, "="),
+            (text("daterange(check_in, check_out)"), "&&"),
+            name="excl_booking_overlap",
+            using="gist",
+            where=text("status IN ('PENDING', 'CONFIRMED')")
+        ),
+    )
+    
     user = relationship("User", back_populates="bookings")
     property = relationship("Property", back_populates="bookings")
     payment = relationship("Payment", back_populates="booking", uselist=False, cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Numeric, SmallInteger, DateTime, CheckConstraint
+from sqlalchemy.sql import func
+from models.base import Base
+
+
+class PriceRule(Base):
+    """
+    Modelo de Regla de Precio - Tabla distribuida por region_id en Citus
+    (co-localizada con property). Ver services/pricing.py para el significado
+    de cada tipo de regla.
+    """
+    __tablename__ = "price_rule"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    property_id = Column(BigInteger, nullable=False)
+    region_id = Column(Integer, nullable=False, primary_key=True)  # Columna de distribución
+    kind = Column(String(20), nullable=False)
+    start_date = Column(Date)
+    end_date = Column(Date)
+    weekdays = Column(SmallInteger)  # Bit 0 = lunes ... bit 6 = domingo
+    min_nights = Column(Integer)
+    guests_included = Column(Integer)
+    amount = Column(Numeric(10, 2))
+    percent = Column(Numeric(5, 2))
+    priority = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=False), server_default=func.now())
+    updated_at = Column(DateTime(timezone=False), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        CheckConstraint(
+            "kind IN ('nightly', 'length_of_stay', 'extra_guest', 'pet')", name='chk_price_rule_kind'
+        ),
+        CheckConstraint('end_date >= start_date', name='chk_price_rule_dates'),
+        CheckConstraint('weekdays BETWEEN 1 AND 127', name='chk_price_rule_weekdays'),
+    )
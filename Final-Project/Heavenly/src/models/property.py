@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Numeric, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Numeric, ForeignKey, DateTime, Boolean, Float, Index
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from models.base import Base
@@ -23,9 +24,19 @@ class Property(Base):
     city_id = Column(Integer, ForeignKey("city.id"), nullable=False)
     user_id = Column(BigInteger, nullable=False)
     is_active = Column(Boolean, default=True)
+    # Copia ordenada de property_amenity para filtrar con @> (índice GIN)
+    amenity_ids = Column(ARRAY(Integer), nullable=False, default=list, server_default="{}")
+    # Coordenadas WGS84 (búsqueda en mapa); NULL si la propiedad no está ubicada
+    latitude = Column(Float)
+    longitude = Column(Float)
     created_at = Column(DateTime(timezone=False), server_default=func.now())
     updated_at = Column(DateTime(timezone=False), server_default=func.now(), onupdate=func.now())
     
+    __table_args__ = (
+        Index("idx_property_amenity_ids", amenity_ids, postgresql_using="gin"),
+        Index("idx_property_lat_lon", latitude, longitude, postgresql_where=latitude.isnot(None)),
+    )
+    
     # Relaciones
     property_type = relationship("PropertyType", back_populates="properties")
     city = relationship("City", back_populates="properties")
@@ -0,0 +1,266 @@
+"""
+Acceso a reservas y pagos enrutado por region_id.
+
+booking y payment están co-localizadas con property (db_citus.sql), así que
+toda consulta incluye el region_id de la propiedad y Citus la resuelve en un
+único shard.
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query
+
+from models.booking import Booking
+from models.payment import Payment
+from models.enums import BookingStatus, PaymentStatus
+from repositories.shard_routing import AsyncRegionResolver, RegionResolver, booking_regions
+
+
+ACTIVE_BOOKING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.PENDING)
+
+# SQLSTATE de exclusion_violation (excl_booking_overlap)
+EXCLUSION_VIOLATION = "23P01"
+
+
+class BookingConflictError(ValueError):
+    """
+    La reserva se solapa con otra reserva activa de la misma propiedad.
+    """
+
+
+def is_overlap_violation(error: IntegrityError) -> bool:
+    # psycopg2 y el adaptador asyncpg de SQLAlchemy exponen ambos pgcode
+    return getattr(error.orig, "pgcode", None) == EXCLUSION_VIOLATION
+
+
+def booking_with_payment_statement(booking_values: dict, payment_values: dict) -> Select:
+    """
+    INSERT de la reserva y de su pago en una sola sentencia: CTEs con
+    RETURNING, el pago toma el id de la reserva recién creada. Las dos
+    filas llevan el mismo region_id, así que Citus la ejecuta en un shard.
+    La restricción excl_booking_overlap rechaza los solapamientos.
+    """
+    booking_table, payment_table = Booking.__table__, Payment.__table__
+    new_booking = insert(booking_table)\
+        .values(**booking_values)\
+        .returning(*booking_table.c)\
+        .cte("new_booking")
+    new_payment = insert(payment_table).from_select(
+        [*payment_values, "booking_id"],
+        select(
+            *[literal(value, payment_table.c[name].type) for name, value in payment_values.items()],
+            new_booking.c.id
+        )
+    ).cte("new_payment")
+    return select(Booking).from_statement(select(new_booking).add_cte(new_payment))
+
+
+def overlap_criteria(
+    property_id: int,
+    region_id: int,
+    check_in: date,
+    check_out: date,
+    user_id: Optional[int] = None,
+    exclude_booking_id: Optional[int] = None
+) -> list:
+    """
+    Filtros de reservas activas que se solapan con [check_in, check_out).
+    """
+    criteria = [
+        Booking.property_id == property_id,
+        Booking.region_id == region_id,
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        Booking.check_in < check_out,
+        Booking.check_out > check_in
+    ]
+    if user_id is not None:
+        criteria.append(Booking.user_id == user_id)
+    if exclude_booking_id:
+        criteria.append(Booking.id != exclude_booking_id)
+    return criteria
+
+
+class BookingRepository:
+    def __init__(self, db: Session):
+        self.db = db
+        self.regions = RegionResolver(db)
+
+    def get(
+        self,
+        booking_id: int,
+        region_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Optional[Booking]:
+        region_id = self.regions.for_booking(booking_id, region_id)
+        if region_id is None:
+            return None
+
+        query = self.db.query(Booking).filter(
+            Booking.id == booking_id,
+            Booking.region_id == region_id
+        )
+        if user_id is not None:
+            query = query.filter(Booking.user_id == user_id)
+        return query.first()
+
+    def overlapping(
+        self,
+        property_id: int,
+        region_id: int,
+        check_in: date,
+        check_out: date,
+        user_id: Optional[int] = None,
+        exclude_booking_id: Optional[int] = None
+    ) -> Query:
+        return self.db.query(Booking).filter(*overlap_criteria(
+            property_id, region_id, check_in, check_out, user_id, exclude_booking_id
+        ))
+
+    def count_overlapping(self, *args, **kwargs) -> int:
+        return self.overlapping(*args, **kwargs).count()
+
+    def list_for_property(
+        self,
+        property_id: int,
+        region_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[Booking]:
+        query = self.db.query(Booking).filter(
+            Booking.property_id == property_id,
+            Booking.region_id == region_id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        )
+        if start_date:
+            query = query.filter(Booking.check_out >= start_date)
+        if end_date:
+            query = query.filter(Booking.check_in <= end_date)
+        return query.order_by(Booking.check_in).all()
+
+    def stays_for_property(
+        self,
+        property_id: int,
+        region_id: int,
+        start_date: date,
+        end_date: date
+    ) -> List[Tuple[date, date]]:
+        """(check_in, check_out) de las reservas activas que tocan el rango, sin cargar entidades."""
+        return [tuple(row) for row in self.db.execute(
+            select(Booking.check_in, Booking.check_out).where(
+                Booking.property_id == property_id,
+                Booking.region_id == region_id,
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+                Booking.check_out > start_date,
+                Booking.check_in <= end_date
+            )
+        )]
+
+    def create_with_payment(self, booking_values: dict, payment_values: dict) -> Booking:
+        """
+        Inserta reserva y pago en un round trip. Lanza BookingConflictError
+        si la base rechaza el solapamiento (la transacción queda abortada).
+        """
+        try:
+            booking = self.db.execute(
+                booking_with_payment_statement(booking_values, payment_values)
+            ).scalars().one()
+        except IntegrityError as e:
+            if is_overlap_violation(e):
+                raise BookingConflictError("Property not available for selected dates") from e
+            raise
+        booking_regions.set(booking.id, booking.region_id)
+        return booking
+
+    def set_status(self, booking: Booking, status: BookingStatus) -> None:
+        """
+        Cambia el estado de la reserva (flush). Reactivar una reserva
+        cancelada puede chocar con excl_booking_overlap: lanza
+        BookingConflictError (la transacción queda abortada).
+        """
+        booking.status = status
+        try:
+            self.db.flush()
+        except IntegrityError as e:
+            if is_overlap_violation(e):
+                raise BookingConflictError("Property not available for selected dates") from e
+            raise
+
+
+class AsyncBookingRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.regions = AsyncRegionResolver(db)
+
+    async def get(
+        self,
+        booking_id: int,
+        region_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Optional[Booking]:
+        region_id = await self.regions.for_booking(booking_id, region_id)
+        if region_id is None:
+            return None
+
+        query = select(Booking).where(Booking.id == booking_id, Booking.region_id == region_id)
+        if user_id is not None:
+            query = query.where(Booking.user_id == user_id)
+        return (await self.db.execute(query)).scalars().first()
+
+    async def count_overlapping(
+        self,
+        property_id: int,
+        region_id: int,
+        check_in: date,
+        check_out: date,
+        user_id: Optional[int] = None,
+        exclude_booking_id: Optional[int] = None
+    ) -> int:
+        return await self.db.scalar(
+            select(func.count(Booking.id)).where(*overlap_criteria(
+                property_id, region_id, check_in, check_out, user_id, exclude_booking_id
+            ))
+        )
+
+    async def create_with_payment(self, booking_values: dict, payment_values: dict) -> Booking:
+        try:
+            result = await self.db.execute(
+                booking_with_payment_statement(booking_values, payment_values)
+            )
+        except IntegrityError as e:
+            if is_overlap_violation(e):
+                raise BookingConflictError("Property not available for selected dates") from e
+            raise
+        booking = result.scalars().one()
+        booking_regions.set(booking.id, booking.region_id)
+        return booking
+
+    async def set_status(self, booking: Booking, status: BookingStatus) -> None:
+        """Ver BookingRepository.set_status."""
+        booking.status = status
+        try:
+            await self.db.flush()
+        except IntegrityError as e:
+            if is_overlap_violation(e):
+                raise BookingConflictError("Property not available for selected dates") from e
+            raise
+
+
+class PaymentRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_for_booking(
+        self,
+        booking_id: int,
+        region_id: int,
+        status: Optional[PaymentStatus] = None
+    ) -> Optional[Payment]:
+        query = self.db.query(Payment).filter(
+            Payment.booking_id == booking_id,
+            Payment.region_id == region_id
+        )
+        if status is not None:
+            query = query.filter(Payment.status == status)
+        return query.first()
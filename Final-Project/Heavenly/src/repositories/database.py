@@ -2,24 +2,46 @@
 Configuración de la conexión a la base de datos PostgreSQL (Citus).
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
-from typing import Annotated, Generator
+from typing import Annotated, AsyncGenerator, Generator, Union
 from fastapi import Depends
 
 from core.config import settings
+from repositories.shard_routing import install_shard_key_guard
 
 
 # Crear el engine de SQLAlchemy
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,  # Verifica conexiones antes de usarlas
-    pool_size=10,        # Tamaño del pool de conexiones
-    max_overflow=20,     # Conexiones adicionales permitidas
+    pool_size=settings.db_pool_size,        # Tamaño del pool de conexiones
+    max_overflow=settings.db_max_overflow,  # Conexiones adicionales permitidas
     echo=settings.debug  # Muestra queries SQL en modo debug
 )
 
+# Engine asíncrono (asyncpg): no ocupa un hilo del threadpool mientras espera a Postgres
+async_engine = create_async_engine(
+    settings.database_url_async,
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    echo=settings.debug
+)
+
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False  # Evita lazy loads implícitos tras el commit
+)
+
+# En test (o si se habilita explícitamente) toda consulta sobre una tabla
+# distribuida debe incluir region_id para ser un router query de Citus.
+# Se registra en Session para cubrir también las sesiones asíncronas.
+if settings.shard_key_guard or settings.is_test:
+    install_shard_key_guard()
 
 # Base para los modelos
 Base = declarative_base()
@@ -37,5 +59,19 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency que proporciona una sesión asíncrona de base de datos.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Sesión para los endpoints con ruta sync/async seleccionable (settings.db_async)
+AnySession = Union[Session, AsyncSession]
+get_db_session = get_async_db if settings.db_async else get_db
+
+
 # Type alias para usar en los endpoints
-db_dependency = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+db_dependency = Annotated[Session, Depends(get_db)]
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Paginación keyset (por cursor) para consultas multi-shard.
+
+Con offset().limit() cada shard de Citus ordena y envía offset+limit filas
+al coordinador, así que la página N cuesta N veces la página 1. Con keyset
+cada shard filtra `(clave, id, region_id) < cursor` sobre un índice con el
+mismo orden y devuelve como mucho `limit` filas, sea cual sea la página.
+
+El cursor es opaco para el cliente: JSON en base64 con el orden solicitado
+y los valores de la última fila entregada.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Select, tuple_
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return {"d": str(value)}
+    if isinstance(value, datetime):
+        return {"t": value.isoformat()}
+    if isinstance(value, date):
+        return {"D": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "d" in value:
+            return Decimal(value["d"])
+        if "t" in value:
+            return datetime.fromisoformat(value["t"])
+        if "D" in value:
+            return date.fromisoformat(value["D"])
+    return value
+
+
+def encode_cursor(order: str, values: Tuple) -> str:
+    payload = {"o": order, "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str) -> Tuple:
+    """
+    Decodifica un cursor. Lanza ValueError si está corrupto o si se generó
+    para otro orden (sort_by/sort_order distintos).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = tuple(_decode_value(v) for v in payload["v"])
+        cursor_order = payload["o"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_order != order:
+        raise ValueError("Cursor does not match the requested sort order")
+    return values
+
+
+class Keyset:
+    """
+    Orden total `(clave, id, region_id)` en una única dirección.
+
+    `id` es BIGSERIAL (único entre shards) y `region_id` completa la PK
+    distribuida, así que el orden es estable aunque la clave se repita.
+    """
+
+    def __init__(self, order: str, key, model, descending: bool = True):
+        self.order = order
+        self.descending = descending
+        self.columns = (key, model.id, model.region_id)
+
+    def apply(self, stmt: Select, cursor: Optional[str], limit: int) -> Select:
+        """
+        Aplica filtro, orden y límite. Pide una fila extra para saber si hay
+        página siguiente; la clave se añade como columna para poder generar
+        el cursor aunque sea una expresión (p. ej. un promedio).
+        """
+        if cursor:
+            values = decode_cursor(cursor, self.order)
+            if len(values) != len(self.columns):
+                raise ValueError("Invalid cursor")
+            row = tuple_(*self.columns)
+            stmt = stmt.where(row < tuple_(*values) if self.descending else row > tuple_(*values))
+
+        ordering = [c.desc() if self.descending else c.asc() for c in self.columns]
+        return stmt.add_columns(self.columns[0].label("cursor_key"))\
+            .order_by(*ordering)\
+            .limit(limit + 1)
+
+    def page(self, rows, limit: int) -> Tuple[List[Any], Optional[str]]:
+        """
+        Convierte las filas `(entidad, cursor_key)` en (items, next_cursor).
+        """
+        rows = list(rows)
+        items = [row[0] for row in rows[:limit]]
+        if len(rows) <= limit:
+            return items, None
+        last_entity, last_key = rows[limit - 1][0], rows[limit - 1][1]
+        return items, encode_cursor(self.order, (last_key, last_entity.id, last_entity.region_id))
+
+    def page_rows(self, rows, limit: int) -> Tuple[List[Any], Optional[str]]:
+        """
+        Como `page` para consultas de columnas: cada fila trae `id`,
+        `region_id` y `cursor_key`, y se devuelve tal cual.
+        """
+        rows = list(rows)
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor(self.order, (last.cursor_key, last.id, last.region_id))
@@ -0,0 +1,78 @@
+"""
+Acceso a propiedades enrutado por region_id.
+"""
+from typing import Optional
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.property import Property
+from repositories.shard_routing import AsyncRegionResolver, RegionResolver, property_regions
+
+
+def property_statement(
+    property_id: int,
+    region_id: int,
+    user_id: Optional[int] = None,
+    active_only: bool = False
+) -> Select:
+    stmt = select(Property).where(
+        Property.id == property_id,
+        Property.region_id == region_id
+    )
+    if user_id is not None:
+        stmt = stmt.where(Property.user_id == user_id)
+    if active_only:
+        stmt = stmt.where(Property.is_active == True)
+    return stmt
+
+
+class PropertyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+        self.regions = RegionResolver(db)
+
+    def get(
+        self,
+        property_id: int,
+        region_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        active_only: bool = False
+    ) -> Optional[Property]:
+        """
+        Obtiene una propiedad por (id, region_id). Si no se conoce la región,
+        se resuelve antes con RegionResolver para que la consulta vaya a un
+        solo shard.
+        """
+        region_id = self.regions.for_property(property_id, region_id)
+        if region_id is None:
+            return None
+
+        prop = self.db.scalars(
+            property_statement(property_id, region_id, user_id, active_only)
+        ).first()
+        if prop is not None:
+            property_regions.set(prop.id, prop.region_id)
+        return prop
+
+
+class AsyncPropertyRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.regions = AsyncRegionResolver(db)
+
+    async def get(
+        self,
+        property_id: int,
+        region_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        active_only: bool = False
+    ) -> Optional[Property]:
+        region_id = await self.regions.for_property(property_id, region_id)
+        if region_id is None:
+            return None
+
+        result = await self.db.scalars(
+            property_statement(property_id, region_id, user_id, active_only)
+        )
+        return result.first()
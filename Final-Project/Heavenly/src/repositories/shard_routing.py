@@ -0,0 +1,263 @@
+"""
+Enrutamiento por clave de distribución (region_id) para Citus.
+
+Las tablas distribuidas (ver db_citus.sql) solo generan un *router query*
+cuando el filtro incluye region_id; sin él, el coordinator envía la consulta
+a todos los shards. Este módulo resuelve el region_id de una entidad
+(desde la propiedad, el JWT o un mapa id -> región en memoria) y ofrece un
+guard opcional que detecta consultas sobre tablas distribuidas sin su clave.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, ORMExecuteState, sessionmaker
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.dml import Insert
+from sqlalchemy.sql.elements import BinaryExpression, ColumnClause
+from sqlalchemy.sql.selectable import TableClause
+
+from models.booking import Booking
+from models.property import Property
+from models.user import User
+
+
+# Tablas creadas con create_distributed_table(..., 'region_id')
+DISTRIBUTED_TABLES = frozenset({
+    "user", "user_role",
+    "property", "property_amenity", "property_photo", "available_date", "price_rule",
+    "booking", "payment",
+    "review", "review_response",
+    "kpi_daily", "kpi_monthly", "kpi_quarterly", "kpi_rollup_state",
+})
+
+SHARD_KEY = "region_id"
+
+# Opción de ejecución para marcar consultas multi-shard intencionales
+ALLOW_MULTI_SHARD = "allow_multi_shard"
+
+
+class ShardKeyMissingError(AssertionError):
+    """Consulta sobre una tabla distribuida sin filtro por region_id."""
+
+
+class RegionMap:
+    """
+    Mapa id -> region_id acotado (LRU) y seguro entre hilos.
+    La columna de distribución no puede cambiar en Citus, así que las
+    entradas no expiran; solo se desalojan por tamaño.
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self._data: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, entity_id: int) -> Optional[int]:
+        with self._lock:
+            region_id = self._data.get(entity_id)
+            if region_id is not None:
+                self._data.move_to_end(entity_id)
+            return region_id
+
+    def set(self, entity_id: int, region_id: int) -> None:
+        if entity_id is None or region_id is None:
+            return
+        with self._lock:
+            self._data[entity_id] = region_id
+            self._data.move_to_end(entity_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard(self, entity_id: int) -> None:
+        with self._lock:
+            self._data.pop(entity_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Mapas globales del proceso
+property_regions = RegionMap()
+booking_regions = RegionMap()
+user_regions = RegionMap()
+
+
+def multi_shard(query):
+    """Marca una consulta como multi-shard intencional (no la bloquea el guard)."""
+    return query.execution_options(**{ALLOW_MULTI_SHARD: True})
+
+
+class RegionResolver:
+    """
+    Resuelve el region_id de propiedades, reservas y usuarios.
+    Orden: valor explícito -> claims del JWT -> mapa en memoria -> lookup.
+    El lookup es multi-shard pero solo ocurre una vez por id y proceso.
+    Los mapas solo guardan regiones leídas de una fila: un region_id
+    explícito lo aporta el cliente y, si es erróneo, no debe afectar a las
+    peticiones siguientes.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def for_property(self, property_id: int, region_id: Optional[int] = None) -> Optional[int]:
+        if region_id is not None:
+            return region_id
+
+        region_id = property_regions.get(property_id)
+        if region_id is None:
+            region_id = multi_shard(
+                self.db.query(Property.region_id).filter(Property.id == property_id)
+            ).scalar()
+            property_regions.set(property_id, region_id)
+        return region_id
+
+    def for_booking(self, booking_id: int, region_id: Optional[int] = None) -> Optional[int]:
+        if region_id is not None:
+            return region_id
+
+        region_id = booking_regions.get(booking_id)
+        if region_id is None:
+            region_id = multi_shard(
+                self.db.query(Booking.region_id).filter(Booking.id == booking_id)
+            ).scalar()
+            booking_regions.set(booking_id, region_id)
+        return region_id
+
+    def for_user(
+        self,
+        user_id: int,
+        region_id: Optional[int] = None,
+        claims: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
+        if region_id is None and claims:
+            region_id = claims.get(SHARD_KEY)
+        if region_id is not None:
+            return region_id
+
+        region_id = user_regions.get(user_id)
+        if region_id is None:
+            region_id = multi_shard(
+                self.db.query(User.region_id).filter(User.id == user_id)
+            ).scalar()
+            user_regions.set(user_id, region_id)
+        return region_id
+
+
+class AsyncRegionResolver:
+    """Versión asíncrona de RegionResolver; comparte los mismos mapas."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _lookup(self, model, entity_id: int) -> Optional[int]:
+        return await self.db.scalar(
+            multi_shard(select(model.region_id).where(model.id == entity_id))
+        )
+
+    async def for_property(self, property_id: int, region_id: Optional[int] = None) -> Optional[int]:
+        if region_id is not None:
+            return region_id
+        region_id = property_regions.get(property_id)
+        if region_id is None:
+            region_id = await self._lookup(Property, property_id)
+            property_regions.set(property_id, region_id)
+        return region_id
+
+    async def for_booking(self, booking_id: int, region_id: Optional[int] = None) -> Optional[int]:
+        if region_id is not None:
+            return region_id
+        region_id = booking_regions.get(booking_id)
+        if region_id is None:
+            region_id = await self._lookup(Booking, booking_id)
+            booking_regions.set(booking_id, region_id)
+        return region_id
+
+
+# ----------------------------------------------------------------------------
+# Guard de clave de distribución (modo test)
+# ----------------------------------------------------------------------------
+
+def _shard_key_table(element: Any) -> Optional[str]:
+    """Nombre de la tabla distribuida si el elemento es su columna region_id."""
+    if not isinstance(element, ColumnClause) or element.key != SHARD_KEY:
+        return None
+    table = getattr(element, "table", None)
+    name = getattr(table, "name", None)
+    return name if name in DISTRIBUTED_TABLES else None
+
+
+def unrouted_tables(statement) -> Set[str]:
+    """
+    Devuelve las tablas distribuidas referenciadas por la sentencia que no
+    quedan fijadas a un shard. Una tabla queda fijada si compara region_id
+    contra un valor (= o IN) o si se une por region_id con otra tabla fijada.
+    """
+    present: Set[str] = set()
+    pinned: Set[str] = set()
+    links: list[Tuple[str, str]] = []
+
+    for element in visitors.iterate(statement):
+        if isinstance(element, Insert):
+            # Citus enruta cada fila insertada por el region_id que lleva
+            if element.table.name in DISTRIBUTED_TABLES:
+                pinned.add(element.table.name)
+        elif isinstance(element, TableClause):
+            if element.name in DISTRIBUTED_TABLES:
+                present.add(element.name)
+        elif isinstance(element, BinaryExpression):
+            if element.operator not in (operators.eq, operators.in_op):
+                continue
+            left = _shard_key_table(element.left)
+            right = _shard_key_table(element.right)
+            if left and right:
+                links.append((left, right))
+            elif left and not isinstance(element.right, ColumnClause):
+                pinned.add(left)
+            elif right and not isinstance(element.left, ColumnClause):
+                pinned.add(right)
+
+    changed = True
+    while changed:
+        changed = False
+        for left, right in links:
+            if (left in pinned) != (right in pinned):
+                pinned.update((left, right))
+                changed = True
+
+    return present - pinned
+
+
+def _check_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.execution_options.get(ALLOW_MULTI_SHARD):
+        return
+    # Las cargas perezosas de relaciones dependen de la definición del modelo
+    if orm_execute_state.is_relationship_load or orm_execute_state.is_column_load:
+        return
+    if orm_execute_state.is_insert:
+        return
+
+    missing = unrouted_tables(orm_execute_state.statement)
+    if missing:
+        raise ShardKeyMissingError(
+            f"Query on distributed table(s) {sorted(missing)} without {SHARD_KEY}: "
+            f"{orm_execute_state.statement}"
+        )
+
+
+def install_shard_key_guard(session_factory: Optional[sessionmaker] = None) -> None:
+    """
+    Registra el guard en la fábrica de sesiones dada (o en todas las Session).
+    Pensado para tests y desarrollo: cada consulta ORM que toque una tabla
+    distribuida sin region_id lanza ShardKeyMissingError.
+    """
+    target = session_factory if session_factory is not None else Session
+    if not event.contains(target, "do_orm_execute", _check_orm_execute):
+        event.listen(target, "do_orm_execute", _check_orm_execute)
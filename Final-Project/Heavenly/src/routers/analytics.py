@@ -0,0 +1,53 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from repositories.database import get_db
+from schemas.analytics import Granularity, KpiFreshness, KpiSeries
+from services.analytics_service import AnalyticsService
+from utils.get_current_user import get_current_user
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"]
+)
+
+
+def _respond(etag: str, payload: Optional[bytes]) -> Response:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={int(settings.analytics_batch_check_seconds)}"
+    }
+    if payload is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get("/kpis", response_model=KpiSeries, status_code=status.HTTP_200_OK)
+def get_kpis(
+    start: date,
+    end: date,
+    granularity: Granularity = Query("day"),
+    region_id: Optional[int] = Query(None, gt=0, description="Sin región: todas"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Ocupación, ADR y RevPAR por región y periodo, desde los rollups del DW."""
+    try:
+        return _respond(*AnalyticsService.kpis(db, granularity, start, end, region_id, if_none_match))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/kpis/freshness", response_model=List[KpiFreshness], status_code=status.HTTP_200_OK)
+def get_kpi_freshness(
+    region_id: Optional[int] = Query(None, gt=0),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Cuándo y con qué ejecución del ETL se actualizó cada rollup."""
+    return _respond(*AnalyticsService.freshness(db, region_id, if_none_match))
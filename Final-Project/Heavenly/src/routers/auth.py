@@ -14,8 +14,9 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=Token, status_code=status.HTTP_200_OK)
-def authenticate(
+async def authenticate(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db)  
 ):
-    return AuthService.authenticate(db, form_data)
+    # bcrypt corre en su executor; si está saturado responde 429 (ver main.py)
+    return await AuthService.authenticate_async(db, form_data)
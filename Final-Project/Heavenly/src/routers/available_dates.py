@@ -8,7 +8,7 @@ from repositories.database import get_db
 from services.availability_service import AvailabilityService
 from schemas.available_date import (
     AvailableDateCreate, AvailableDateBatchCreate, 
-    AvailableDateUpdate, AvailableDateRes
+    AvailableDateUpdate, AvailableDateRes, AvailableDateBatchRes
 )
 from utils.get_current_user import get_current_user
 
@@ -34,14 +34,15 @@ def create_availability(
     )
 
 
-@router.post("/batch", response_model=List[AvailableDateRes], status_code=status.HTTP_201_CREATED)
+@router.post("/batch", response_model=AvailableDateBatchRes, status_code=status.HTTP_201_CREATED)
 def create_batch_availability(
     batch_data: AvailableDateBatchCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Create multiple availability date ranges for a property
+    Create multiple availability date ranges for a property; reports per range
+    whether it was created or skipped (and why)
     """
     return AvailabilityService.create_batch_availability(
         db=db,
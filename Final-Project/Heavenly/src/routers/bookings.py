@@ -1,10 +1,12 @@
 from datetime import date
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from repositories.database import get_db
-from services.booking_service import BookingService
+from core.config import settings
+from repositories.database import AnySession, get_db, get_db_session
+from services.booking_service import AsyncBookingService, BookingService
 from schemas.booking import (
     BookingCreate, 
     BookingResponse, 
@@ -12,42 +14,39 @@ from schemas.booking import (
     BookingUpdate,
     AvailabilityRequest,
     AvailabilityResponse,
+    AvailabilityCalendarResponse,
     BookingQuery
 )
 from models.enums import BookingStatus
+from schemas.pagination import CursorPage
 from utils.get_current_user import get_current_user
 from models.user import User
+from repositories.booking_repository import BookingConflictError, PaymentRepository
+from repositories.property_repository import PropertyRepository
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
 
 @router.post("/", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-def create_booking(
+async def create_booking(
     booking_data: BookingCreate,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
    
     try:
-        booking_service = BookingService(db)
-        
-        # Verificar doble reserva específica (FR4.2)
-        if booking_service.check_double_booking(
-            user_id=current_user.id,
-            property_id=booking_data.property_id,
-            check_in=booking_data.check_in,
-            check_out=booking_data.check_out
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="You already have a booking for this property on the selected dates"
-            )
-        
-        booking = booking_service.create_booking(booking_data, current_user.id)
-        return booking
+        # La doble reserva (FR4.2) y el solapamiento en general los rechaza
+        # la base con excl_booking_overlap -> BookingConflictError (409)
+        if settings.db_async:
+            return await AsyncBookingService(db).create_booking(booking_data, current_user.id)
+        return await run_in_threadpool(BookingService(db).create_booking, booking_data, current_user.id)
         
+    except BookingConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -55,11 +54,18 @@ def create_booking(
         )
 
 
-@router.get("/availability", response_model=List[AvailabilityResponse])
+@router.get(
+    "/availability",
+    response_model=Union[List[AvailabilityResponse], AvailabilityCalendarResponse]
+)
 def check_availability(
     property_id: int = Query(..., description="ID de la propiedad"),
     start_date: date = Query(..., description="Fecha inicial"),
     end_date: date = Query(..., description="Fecha final"),
+    region_id: Optional[int] = Query(None, description="Región de la propiedad (evita el lookup)"),
+    format: Literal["days", "ranges", "bits"] = Query(
+        "days", description="days: un objeto por día; ranges: rangos RLE; bits: bitmap base64"
+    ),
     db: Session = Depends(get_db)
 ):
     
@@ -72,10 +78,12 @@ def check_availability(
         
         booking_service = BookingService(db)
         availability = booking_service.get_property_availability(
-            property_id, start_date, end_date
+            property_id, start_date, end_date, region_id, calendar_format=format
         )
         return availability
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -83,17 +91,23 @@ def check_availability(
         )
 
 
-@router.get("/", response_model=List[BookingResponse])
+@router.get("/", response_model=CursorPage[BookingResponse])
 def get_my_bookings(
     status: Optional[BookingStatus] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
   
     try:
         booking_service = BookingService(db)
-        bookings = booking_service.get_user_bookings(current_user.id, status)
-        return bookings
+        bookings, next_cursor = booking_service.get_user_bookings(
+            current_user.id, status, limit=limit, cursor=cursor
+        )
+        return {"items": bookings, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -104,12 +118,13 @@ def get_my_bookings(
 @router.get("/{booking_id}", response_model=BookingDetailResponse)
 def get_booking(
     booking_id: int,
+    region_id: Optional[int] = Query(None, description="Región de la reserva (evita el lookup)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     
     booking_service = BookingService(db)
-    booking = booking_service.get_booking_by_id(booking_id, current_user.id)
+    booking = booking_service.get_booking_by_id(booking_id, current_user.id, region_id)
     
     if not booking:
         raise HTTPException(
@@ -120,16 +135,14 @@ def get_booking(
     # Enriquecer respuesta con información adicional
     response = BookingDetailResponse.from_orm(booking)
     
-    # Obtener información de la propiedad
-    from models.property import Property
-    property = db.query(Property).filter(Property.id == booking.property_id).first()
+    # Obtener información de la propiedad (mismo shard que la reserva)
+    property = PropertyRepository(db).get(booking.property_id, booking.region_id)
     if property:
         response.property_address = property.address
         response.property_price_night = property.price_night
     
     # Obtener información del pago
-    from models.payment import Payment
-    payment = db.query(Payment).filter(Payment.booking_id == booking.id).first()
+    payment = PaymentRepository(db).get_for_booking(booking.id, booking.region_id)
     if payment:
         response.payment_status = payment.status
     
@@ -137,20 +150,27 @@ def get_booking(
 
 
 @router.patch("/{booking_id}/cancel", response_model=BookingResponse)
-def cancel_booking(
+async def cancel_booking(
     booking_id: int,
-    db: Session = Depends(get_db),
+    region_id: Optional[int] = Query(None, description="Región de la reserva (evita el lookup)"),
+    db: AnySession = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
    
     try:
-        booking_service = BookingService(db)
-        booking = booking_service.update_booking_status(
-            booking_id, 
+        if settings.db_async:
+            return await AsyncBookingService(db).update_booking_status(
+                booking_id, BookingStatus.CANCELED, current_user.id, region_id
+            )
+        return await run_in_threadpool(
+            BookingService(db).update_booking_status,
+            booking_id,
             BookingStatus.CANCELED,
-            current_user.id
+            current_user.id,
+            region_id
         )
-        return booking
+    except BookingConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -165,15 +185,12 @@ def get_property_bookings(
     property_id: int,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    region_id: Optional[int] = Query(None, description="Región de la propiedad (evita el lookup)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
   
-    from models.property import Property
-    property = db.query(Property).filter(
-        Property.id == property_id,
-        Property.user_id == current_user.id
-    ).first()
+    property = PropertyRepository(db).get(property_id, region_id, user_id=current_user.id)
     
     if not property:
         raise HTTPException(
@@ -184,7 +201,7 @@ def get_property_bookings(
     try:
         booking_service = BookingService(db)
         bookings = booking_service.get_property_bookings(
-            property_id, start_date, end_date
+            property_id, start_date, end_date, property.region_id
         )
         return bookings
     except Exception as e:
@@ -207,7 +224,8 @@ def validate_booking(
         available = booking_service.is_property_available(
             booking_data.property_id,
             booking_data.check_in,
-            booking_data.check_out
+            booking_data.check_out,
+            region_id=booking_data.region_id
         )
         
         if not available:
@@ -222,7 +240,8 @@ def validate_booking(
             booking_data.guest_adults,
             booking_data.guest_children,
             booking_data.guest_infant,
-            booking_data.guest_pets
+            booking_data.guest_pets,
+            region_id=booking_data.region_id
         )
         
         if not valid_capacity:
@@ -239,7 +258,8 @@ def validate_booking(
             booking_data.guest_adults,
             booking_data.guest_children,
             booking_data.guest_infant,
-            booking_data.guest_pets
+            booking_data.guest_pets,
+            region_id=booking_data.region_id
         )
         
         nights = (booking_data.check_out - booking_data.check_in).days
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 
 from repositories.database import get_db  
 from services.location_service import LocationService
-from schemas.location import City 
+from schemas.location import City, LocationSuggestion
+from services.location_suggest import MAX_SUGGESTIONS, location_suggest
 router = APIRouter(
     prefix="/locations",
     tags=["locations"]
@@ -12,5 +13,17 @@ router = APIRouter(
 
 @router.get("/", response_model=List[City], status_code=status.HTTP_200_OK)
 def list_cities(db: Session = Depends(get_db)):
-    return LocationService.list_cities(db) 
+    return LocationService.list_cities(db)
 
+
+@router.get("/suggest", response_model=List[LocationSuggestion], status_code=status.HTTP_200_OK)
+async def suggest_locations(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefijo (sin distinguir acentos ni mayúsculas)"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS)
+):
+    if not location_suggest.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Location suggestions are not loaded yet"
+        )
+    return LocationService.suggest(q, limit)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from repositories.database import get_db
+from repositories.booking_repository import BookingConflictError
 from services.payment_service import PaymentService
 from schemas.payment import PaymentResponse
 from utils.get_current_user import get_current_user
@@ -12,13 +14,16 @@ router = APIRouter(prefix="/payments", tags=["payments"])
 @router.post("/booking/{booking_id}/pay", response_model=PaymentResponse)
 def pay_booking(
     booking_id: int,
+    region_id: Optional[int] = Query(None, description="Región de la reserva (evita el lookup)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
         payment_service = PaymentService(db)
-        payment = payment_service.process_payment(booking_id, current_user.id)
+        payment = payment_service.process_payment(booking_id, current_user.id, region_id)
         return payment
+    except BookingConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
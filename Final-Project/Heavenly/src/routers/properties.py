@@ -1,12 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 from decimal import Decimal
 
-from repositories.database import get_db
+from core.config import settings
+from repositories.database import AnySession, get_db, get_db_session
 from services.property_discovery_service import PropertyDiscoveryService
-from schemas.property import PropertyCreate, PropertyRes, PropertySimpleRes, PropertyUpdate
+from schemas.pagination import CursorPage
+from schemas.pricing import PriceQuote, PriceRuleCreate, PriceRuleRes, QuoteRequest
+from schemas.property import MapClusterPage, PropertyCreate, PropertyRes, PropertySimpleRes, PropertyUpdate
+from services.geo import MAX_RADIUS_KM, parse_bbox, parse_point
+from services.pricing_service import PricingService
 from services.property_service import PropertyService
 from utils.get_current_user import get_current_user
 
@@ -17,10 +23,21 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[PropertyRes], status_code=status.HTTP_200_OK)
-def list_properties(
-    db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0),
+def _geo_filters(bbox: Optional[str], near: Optional[str], radius: Optional[float]) -> dict:
+    """bbox/near/radius de la query string -> filtros (ValueError si no son válidos)"""
+    if near and radius is None:
+        raise ValueError("near requires radius (km)")
+    return dict(
+        bbox=parse_bbox(bbox) if bbox else None,
+        near=parse_point(near) if near else None,
+        radius=radius if near else None
+    )
+
+
+@router.get("/", response_model=CursorPage[PropertyRes], status_code=status.HTTP_200_OK)
+async def list_properties(
+    db: AnySession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
     limit: int = Query(100, ge=1, le=100),
     min_price: Optional[Decimal] = None,
     max_price: Optional[Decimal] = None,
@@ -34,14 +51,25 @@ def list_properties(
     amenities: Optional[List[int]] = Query(None),
     check_in: Optional[date] = None,
     check_out: Optional[date] = None,
+    flexible_nights: Optional[int] = Query(
+        None, ge=1, description="Busca N noches libres consecutivas dentro de check_in..check_out"
+    ),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    near: Optional[str] = Query(None, description="lat,lon; requiere radius"),
+    radius: Optional[float] = Query(None, gt=0, le=MAX_RADIUS_KM, description="Radio en km alrededor de near"),
     sort_by: str = Query("created_at", regex="^(price|rating|created_at)$"),
     sort_order: str = Query("desc", regex="^(asc|desc)$")
 ):
     
+    if flexible_nights and not (check_in and check_out):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="flexible_nights requires check_in and check_out"
+        )
+
     try:
-        return PropertyDiscoveryService.list_properties(
-            db=db,
-            skip=skip,
+        filters = dict(
+            cursor=cursor,
             limit=limit,
             min_price=min_price,
             max_price=max_price,
@@ -55,11 +83,20 @@ def list_properties(
             amenities=amenities,
             check_in=check_in,
             check_out=check_out,
+            flexible_nights=flexible_nights,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            **_geo_filters(bbox, near, radius)
         )
+        if settings.db_async:
+            items, next_cursor = await PropertyDiscoveryService.list_properties_async(db, **filters)
+        else:
+            items, next_cursor = await run_in_threadpool(PropertyDiscoveryService.list_properties, db, **filters)
+        return CursorPage(items=items, next_cursor=next_cursor)
     except HTTPException as e:
         raise e
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -67,10 +104,93 @@ def list_properties(
         )
 
 
+@router.get("/map", response_model=MapClusterPage, status_code=status.HTTP_200_OK)
+async def map_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat del área visible"),
+    grid: int = Query(32, ge=4, le=64, description="Celdas aproximadas en el lado mayor del área"),
+    db: AnySession = Depends(get_db_session),
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    property_type_id: Optional[int] = None,
+    city_id: Optional[int] = None,
+    region_id: Optional[int] = None,
+    min_adults: Optional[int] = None,
+    min_children: Optional[int] = None,
+    min_infants: Optional[int] = None,
+    min_pets: Optional[int] = None,
+    amenities: Optional[List[int]] = Query(None),
+    check_in: Optional[date] = None,
+    check_out: Optional[date] = None,
+    flexible_nights: Optional[int] = Query(None, ge=1),
+    near: Optional[str] = Query(None, description="lat,lon; requiere radius"),
+    radius: Optional[float] = Query(None, gt=0, le=MAX_RADIUS_KM)
+):
+    """
+    Pines agrupados por celda para vistas de mapa alejadas: una entrada por
+    celda con el número de alojamientos, su posición media y el precio mínimo.
+    """
+    if flexible_nights and not (check_in and check_out):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="flexible_nights requires check_in and check_out"
+        )
+
+    try:
+        filters = dict(
+            min_price=min_price,
+            max_price=max_price,
+            property_type_id=property_type_id,
+            city_id=city_id,
+            region_id=region_id,
+            min_adults=min_adults,
+            min_children=min_children,
+            min_infants=min_infants,
+            min_pets=min_pets,
+            amenities=amenities,
+            check_in=check_in,
+            check_out=check_out,
+            flexible_nights=flexible_nights,
+            **_geo_filters(bbox, near, radius)
+        )
+        if settings.db_async:
+            cell, total, clusters = await PropertyDiscoveryService.map_clusters_async(db, grid=grid, **filters)
+        else:
+            cell, total, clusters = await run_in_threadpool(
+                PropertyDiscoveryService.map_clusters, db, grid=grid, **filters
+            )
+        return MapClusterPage(total=total, cell_degrees=cell, clusters=clusters)
+    except HTTPException as e:
+        raise e
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving map clusters: {str(e)}"
+        )
+
+
+@router.post("/quotes", response_model=List[PriceQuote], status_code=status.HTTP_200_OK)
+async def quote_properties(request: QuoteRequest, db: AnySession = Depends(get_db_session)):
+    """
+    Precio de una misma estancia en varias propiedades (p. ej. todas las
+    tarjetas de una página de resultados) en una sola llamada.
+    """
+    try:
+        if settings.db_async:
+            return await PricingService.quote_async(db, request)
+        return await run_in_threadpool(PricingService.quote, db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("/{property_id}", response_model=PropertyRes, status_code=status.HTTP_200_OK)
-def get_property(property_id: int, db: Session = Depends(get_db)):
+async def get_property(property_id: int, db: AnySession = Depends(get_db_session)):
   
-    property = PropertyDiscoveryService.get_property(db, property_id)
+    if settings.db_async:
+        property = await PropertyDiscoveryService.get_property_async(db, property_id)
+    else:
+        property = await run_in_threadpool(PropertyDiscoveryService.get_property, db, property_id)
     
     if not property:
         raise HTTPException(
@@ -95,21 +215,24 @@ def create_property(
     return property
 
 
-@router.get("/", response_model=List[PropertySimpleRes], status_code=status.HTTP_200_OK)
+@router.get("/", response_model=CursorPage[PropertySimpleRes], status_code=status.HTTP_200_OK)
 def get_my_properties(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
     limit: int = Query(100, ge=1, le=100)
 ):
    
-    properties = PropertyService.get_user_properties(
-        db=db,
-        user_id=current_user["id"],
-        skip=skip,
-        limit=limit
-    )
-    return properties
+    try:
+        properties, next_cursor = PropertyService.get_user_properties(
+            db=db,
+            user_id=current_user["id"],
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": properties, "next_cursor": next_cursor}
 
 
 @router.put("/{property_id}/{region_id}", response_model=PropertySimpleRes)
@@ -140,6 +263,42 @@ def update_property(
     return property
 
 
+@router.get("/{property_id}/{region_id}/price-rules", response_model=List[PriceRuleRes])
+def get_price_rules(
+    property_id: int,
+    region_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Reglas de precio de la propiedad (solo el propietario)
+    """
+    return PricingService.get_rules(db, property_id, region_id, current_user["id"])
+
+
+@router.put("/{property_id}/{region_id}/price-rules", response_model=List[PriceRuleRes])
+def replace_price_rules(
+    property_id: int,
+    region_id: int,
+    rules: List[PriceRuleCreate],
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Sustituye todas las reglas de precio de la propiedad
+    """
+    try:
+        return PricingService.replace_rules(
+            db=db,
+            property_id=property_id,
+            region_id=region_id,
+            user_id=current_user["id"],
+            rules=rules
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.delete("/{property_id}/{region_id}", status_code=status.HTTP_200_OK)
 def delete_property(
     property_id: int,
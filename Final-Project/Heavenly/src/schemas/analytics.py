@@ -0,0 +1,38 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+Granularity = Literal["day", "month", "quarter"]
+
+
+class KpiPoint(BaseModel):
+    region_id: int
+    region_name: str
+    period_start: date
+    days: int
+    bookings: int
+    nights_booked: int
+    total_revenue: Decimal
+    active_properties: int
+    occupancy_rate: Optional[float] = Field(description="Porcentaje de noches disponibles reservadas")
+    adr: Optional[Decimal] = Field(description="Average Daily Rate: ingresos por noche reservada")
+    revpar: Optional[Decimal] = Field(description="Ingresos por noche disponible")
+
+
+class KpiSeries(BaseModel):
+    granularity: Granularity
+    start: date
+    end: date
+    etl_batch_id: Optional[int] = Field(description="Ejecución del ETL de la que salen los datos")
+    etl_finished_at: Optional[datetime]
+    points: List[KpiPoint]
+
+
+class KpiFreshness(BaseModel):
+    region_id: int
+    region_name: str
+    granularity: Granularity
+    etl_batch_id: Optional[int]
+    periods_refreshed: int
+    refreshed_at: datetime
@@ -1,5 +1,5 @@
-from datetime import date
-from typing import List, Optional
+from datetime import date, datetime
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -37,6 +37,24 @@ class AvailableDateRes(AvailableDateBase):
     id: int
     property_id: int
     region_id: int
-    created_at: date
+    created_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AvailableDateBatchItemRes(AvailableDateBase):
+    index: int = Field(..., description="Posición del rango en la petición")
+    status: Literal["created", "skipped"]
+    reason: Optional[Literal[
+        "invalid_range", "overlaps_existing_availability", "overlaps_booking", "overlaps_batch_range"
+    ]] = None
+    conflict_id: Optional[int] = Field(
+        None, description="id del rango o reserva en conflicto (o índice del rango del lote)"
+    )
+    availability: Optional[AvailableDateRes] = None
+
+
+class AvailableDateBatchRes(BaseModel):
+    created: int
+    skipped: int
+    results: List[AvailableDateBatchItemRes]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional, List
+from typing import Literal, Optional, List
 from pydantic import BaseModel, Field
 from models.enums import BookingStatus, PaymentStatus
 
@@ -14,6 +14,7 @@ class BookingBase(BaseModel):
     guest_infant: int = Field(default=0, ge=0)
     guest_pets: int = Field(default=0, ge=0)
     payment_method_id: int = Field(default=1)
+    region_id: Optional[int] = Field(default=None, gt=0)
 
 
 
@@ -75,6 +76,27 @@ class AvailabilityResponse(BaseModel):
     price: Optional[Decimal] = None
 
 
+class AvailabilityRange(BaseModel):
+    start: date
+    end: date
+    available: bool
+
+
+class AvailabilityCalendarResponse(BaseModel):
+    property_id: int
+    start_date: date
+    end_date: date
+    format: Literal["ranges", "bits"]
+    available_days: int
+    ranges: Optional[List[AvailabilityRange]] = Field(
+        default=None, description="Rangos consecutivos con la misma disponibilidad (end inclusive)"
+    )
+    bits: Optional[str] = Field(
+        default=None, description="Bitmap en base64, bit i (LSB primero) = start_date + i días"
+    )
+    prices: Optional[List[Optional[Decimal]]] = Field(default=None, description="Precio por día")
+
+
 class BookingQuery(BaseModel):
     status: Optional[BookingStatus] = None
     start_date: Optional[date] = None
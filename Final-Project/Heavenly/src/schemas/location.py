@@ -1,9 +1,16 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 from pydantic import BaseModel, EmailStr, ConfigDict, Field, validator
 from models.enums import UserStatus
 
 class City(BaseModel):
     id: int
     name: str = Field(..., min_length=1, max_length=50, description="city name")
-    
\ No newline at end of file
+
+
+class LocationSuggestion(BaseModel):
+    type: Literal["city", "region", "country"]
+    id: int
+    name: str
+    label: str = Field(..., description="Texto a mostrar (ciudad con su país)")
+    listings: int = Field(..., description="Propiedades activas en la ubicación")
@@ -0,0 +1,9 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = Field(None, description="Cursor opaco para pedir la página siguiente; null si no hay más")
@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class PriceRuleBase(BaseModel):
+    kind: Literal["nightly", "length_of_stay", "extra_guest", "pet"]
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    weekdays: Optional[int] = Field(
+        default=None, ge=1, le=127, description="Bitmask de días (bit 0 = lunes ... bit 6 = domingo)"
+    )
+    min_nights: Optional[int] = Field(default=None, ge=1)
+    guests_included: Optional[int] = Field(default=None, ge=0)
+    amount: Optional[Decimal] = Field(default=None, ge=0, max_digits=10, decimal_places=2)
+    percent: Optional[Decimal] = Field(default=None, gt=-100, lt=1000, max_digits=5, decimal_places=2)
+    priority: int = 0
+
+    @model_validator(mode="after")
+    def check_kind(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        if self.kind == "nightly":
+            if (self.amount is None) == (self.percent is None):
+                raise ValueError("nightly rules take either amount or percent")
+        elif self.kind == "length_of_stay":
+            if self.min_nights is None or self.percent is None or not 0 < self.percent < 100:
+                raise ValueError("length_of_stay rules take min_nights and a percent between 0 and 100")
+        elif self.amount is None:
+            raise ValueError(f"{self.kind} rules take an amount")
+        return self
+
+
+class PriceRuleCreate(PriceRuleBase):
+    pass
+
+
+class PriceRuleRes(PriceRuleBase):
+    id: int
+    property_id: int
+    region_id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class QuotedProperty(BaseModel):
+    property_id: int
+    region_id: int = Field(gt=0)
+
+
+class QuoteRequest(BaseModel):
+    check_in: date
+    check_out: date
+    guest_adults: int = Field(default=1, ge=1)
+    guest_children: int = Field(default=0, ge=0)
+    guest_pets: int = Field(default=0, ge=0)
+    properties: List[QuotedProperty] = Field(min_length=1, max_length=100)
+
+
+class PriceQuote(BaseModel):
+    property_id: int
+    region_id: int
+    nights: int
+    nightly: List[Decimal] = Field(description="Precio de cada noche desde check_in")
+    subtotal: Decimal
+    discount: Decimal = Field(description="Descuento por duración de la estancia")
+    fees: Decimal = Field(description="Suplementos por huésped adicional y mascotas")
+    total: Decimal
@@ -1,6 +1,6 @@
 from decimal import Decimal
 from typing import List, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 
 class PropertyBase(BaseModel):
@@ -30,8 +30,22 @@ class PropertyRes(PropertyBase):
     photos: List[str]
     host: str
     host_id: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
-class PropertyCreate(BaseModel):
+
+class Coordinates(BaseModel):
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitud WGS84")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitud WGS84")
+
+    @model_validator(mode="after")
+    def both_or_neither(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude must be given together")
+        return self
+
+
+class PropertyCreate(Coordinates):
     address: str = Field(..., max_length=255)
     description: Optional[str] = None
     property_type_id: int = Field(..., gt=0)
@@ -46,7 +60,7 @@ class PropertyCreate(BaseModel):
     photo_urls: Optional[List[str]] = Field(default_factory=list)
 
 
-class PropertyUpdate(BaseModel):
+class PropertyUpdate(Coordinates):
     address: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = None
     property_type_id: Optional[int] = Field(None, gt=0)
@@ -66,5 +80,21 @@ class PropertySimpleRes(PropertyBase):
     id: int
     is_active: bool
     photos: List[str]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class MapCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    min_price: Decimal
+    property_id: Optional[int] = Field(None, description="Id of the listing when the cluster holds a single one")
+    region_id: Optional[int] = None
+
+
+class MapClusterPage(BaseModel):
+    total: int
+    cell_degrees: float
+    clusters: List[MapCluster]
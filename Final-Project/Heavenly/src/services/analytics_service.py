@@ -0,0 +1,230 @@
+"""
+KPIs de negocio (ocupación, ADR y RevPAR) para /analytics/kpis.
+
+Se leen solo de los rollups del DW (kpi_daily, kpi_monthly y
+kpi_quarterly), de kpi_rollup_state y de dw_etl_batch, que
+services/bi_service.py actualiza al final de cada ejecución del ETL; nunca
+de las tablas OLTP, así que la analítica no compite con las reservas. Los
+nombres de región salen del snapshot de tablas de referencia en memoria.
+
+Los rollups solo cambian al terminar una ejecución del ETL: la respuesta
+serializada se cachea (L1 + Redis) con el id de esa ejecución en la clave,
+y su ETag es ese id más un hash de los parámetros. Un If-None-Match vigente
+se responde con 304 sin consultar los rollups. La última ejecución se
+relee como mucho cada `analytics_batch_check_seconds`.
+"""
+import hashlib
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import column, select, table
+from sqlalchemy.orm import Session
+
+from core.cache import TwoTierCache
+from core.config import settings
+from repositories.shard_routing import multi_shard
+from schemas.analytics import KpiFreshness, KpiPoint, KpiSeries
+from services.bi_service import period_start
+from services.reference_data import reference_data
+
+# Puntos máximos por región en una respuesta
+MAX_DAYS = 731
+MAX_PERIOD_DAYS = 3653
+
+_ROLLUP_COLUMNS = (
+    "region_id", "period_start", "days", "bookings", "nights_booked",
+    "total_revenue", "active_properties", "refreshed_at"
+)
+
+KPI_ROLLUPS = {
+    granularity: table(name, *(column(name) for name in _ROLLUP_COLUMNS))
+    for granularity, name in (("day", "kpi_daily"), ("month", "kpi_monthly"), ("quarter", "kpi_quarterly"))
+}
+
+kpi_rollup_state = table(
+    "kpi_rollup_state",
+    column("region_id"), column("granularity"), column("etl_batch_id"),
+    column("periods_refreshed"), column("refreshed_at")
+)
+
+dw_etl_batch = table("dw_etl_batch", column("id"), column("status"), column("finished_at"))
+
+kpi_cache = TwoTierCache(
+    namespace="kpis",
+    l1_size=settings.analytics_cache_l1_size,
+    l1_ttl_seconds=settings.analytics_cache_ttl_seconds,
+    l2_ttl_seconds=settings.analytics_cache_ttl_seconds
+)
+
+_freshness_adapter = TypeAdapter(List[KpiFreshness])
+_CENTS = Decimal("0.01")
+
+
+class EtlBatch(NamedTuple):
+    id: int
+    finished_at: Optional[datetime]
+
+
+_NO_BATCH = EtlBatch(0, None)
+_latest: Tuple[float, EtlBatch] = (0.0, _NO_BATCH)
+_latest_lock = threading.Lock()
+
+
+def latest_batch_statement():
+    """Última ejecución del ETL que actualizó los rollups (las fallidas no los tocan)."""
+    return (
+        select(dw_etl_batch.c.id, dw_etl_batch.c.finished_at)
+        .where(dw_etl_batch.c.finished_at.is_not(None), dw_etl_batch.c.status != "failed")
+        .order_by(dw_etl_batch.c.id.desc())
+        .limit(1)
+    )
+
+
+def latest_batch(db: Session) -> EtlBatch:
+    global _latest
+    checked_at, batch = _latest
+    if time.monotonic() - checked_at < settings.analytics_batch_check_seconds:
+        return batch
+    with _latest_lock:
+        checked_at, batch = _latest
+        if time.monotonic() - checked_at >= settings.analytics_batch_check_seconds:
+            row = db.execute(latest_batch_statement()).first()
+            batch = EtlBatch(row.id, row.finished_at) if row else _NO_BATCH
+            _latest = (time.monotonic(), batch)
+    return batch
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match admite una lista de ETags (fuertes o débiles) o '*'."""
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _ratio(numerator, denominator) -> Optional[Decimal]:
+    if not denominator:
+        return None
+    return (Decimal(numerator) / Decimal(denominator)).quantize(_CENTS)
+
+
+def kpi_point(row) -> KpiPoint:
+    """Fila de un rollup -> KPIs, con las mismas fórmulas que vm_regional_kpis."""
+    available = row.active_properties * row.days
+    revenue = Decimal(row.total_revenue)
+    return KpiPoint(
+        region_id=row.region_id,
+        region_name=reference_data.snapshot.region_name(row.region_id),
+        period_start=row.period_start,
+        days=row.days,
+        bookings=row.bookings,
+        nights_booked=row.nights_booked,
+        total_revenue=revenue,
+        active_properties=row.active_properties,
+        occupancy_rate=round(row.nights_booked * 100.0 / available, 2) if available else None,
+        adr=_ratio(revenue, row.nights_booked),
+        revpar=_ratio(revenue, available)
+    )
+
+
+def kpi_statement(granularity: str, start: date, end: date, region_id: Optional[int] = None):
+    rollup = KPI_ROLLUPS[granularity]
+    statement = (
+        select(*rollup.c)
+        .where(rollup.c.period_start >= period_start(start, granularity), rollup.c.period_start <= end)
+        .order_by(rollup.c.region_id, rollup.c.period_start)
+    )
+    if region_id is not None:
+        return statement.where(rollup.c.region_id == region_id)
+    return multi_shard(statement)
+
+
+def freshness_statement(region_id: Optional[int] = None):
+    statement = select(*kpi_rollup_state.c).order_by(kpi_rollup_state.c.region_id, kpi_rollup_state.c.granularity)
+    if region_id is not None:
+        return statement.where(kpi_rollup_state.c.region_id == region_id)
+    return multi_shard(statement)
+
+
+def _check_range(granularity: str, start: date, end: date) -> None:
+    if end < start:
+        raise ValueError("end must not be before start")
+    limit = MAX_DAYS if granularity == "day" else MAX_PERIOD_DAYS
+    if (end - start).days >= limit:
+        raise ValueError(f"{granularity} KPIs are limited to {limit} days per request")
+
+
+def _key(batch: EtlBatch, *params) -> Tuple[str, str]:
+    """(clave de caché, ETag) de una consulta sobre la ejecución `batch`."""
+    key = ":".join(str(param) for param in (batch.id, *params))
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return key, f'"kpi-{batch.id}-{digest}"'
+
+
+def _cached(key: str, build: Callable[[], bytes]) -> bytes:
+    payload = kpi_cache.get(key)
+    if payload is None:
+        payload = build()
+        kpi_cache.set(key, payload)
+    return payload
+
+
+class AnalyticsService:
+    """
+    Consultas de KPIs sobre los rollups del DW. Cada método devuelve
+    (ETag, cuerpo JSON); el cuerpo es None si `if_none_match` ya tiene el
+    ETag vigente (304).
+    """
+
+    @staticmethod
+    def kpis(
+        db: Session,
+        granularity: str,
+        start: date,
+        end: date,
+        region_id: Optional[int] = None,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[str, Optional[bytes]]:
+        _check_range(granularity, start, end)
+        batch = latest_batch(db)
+        key, etag = _key(batch, "series", granularity, start, end, region_id)
+        if etag_matches(if_none_match, etag):
+            return etag, None
+
+        def build() -> bytes:
+            rows = db.execute(kpi_statement(granularity, start, end, region_id))
+            return KpiSeries(
+                granularity=granularity,
+                start=start,
+                end=end,
+                etl_batch_id=batch.id or None,
+                etl_finished_at=batch.finished_at,
+                points=[kpi_point(row) for row in rows]
+            ).model_dump_json().encode()
+
+        return etag, _cached(key, build)
+
+    @staticmethod
+    def freshness(
+        db: Session,
+        region_id: Optional[int] = None,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[str, Optional[bytes]]:
+        """Frescura de cada rollup por región (kpi_rollup_state)."""
+        batch = latest_batch(db)
+        key, etag = _key(batch, "freshness", region_id)
+        if etag_matches(if_none_match, etag):
+            return etag, None
+
+        def build() -> bytes:
+            snapshot = reference_data.snapshot
+            return _freshness_adapter.dump_json([
+                KpiFreshness(region_name=snapshot.region_name(row.region_id), **row._mapping)
+                for row in db.execute(freshness_statement(region_id))
+            ])
+
+        return etag, _cached(key, build)
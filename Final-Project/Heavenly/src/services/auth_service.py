@@ -5,10 +5,12 @@ from fastapi import Depends, HTTPException
 from starlette import status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
+from core.passwords import password_hasher
 from models.user import User
 from schemas.user import UserCreate
 from schemas.auth import Token
+from repositories.shard_routing import multi_shard, user_regions
 import jwt 
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
@@ -16,28 +18,65 @@ from dotenv import load_dotenv
 
 load_dotenv()
 oauth2_bearer =OAuth2PasswordBearer(tokenUrl='auth/tokens')
+
+# Se resuelven una vez por proceso (firma y verificación usan los mismos)
+SECRET_KEY = os.getenv('SECRET_KEY')
+ALGORITHM = os.getenv('ALGORITHM')
     
 
 class AuthService:
     def __init__(self):
-        self.bycrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.SECRET_KEY = os.getenv('SECRET_KEY')
-        self.ALGORITHM = os.getenv('ALGORITHM')
+        self.SECRET_KEY = SECRET_KEY
+        self.ALGORITHM = ALGORITHM
         
     def hash_passwordse(self, password: str) -> str:
-        return self.bycrypt_context.hash(password)
+        return password_hasher.hash(password)
+
+    @staticmethod
+    def _find_user(db: Session, email: str) -> Optional[User]:
+        # El email no es clave de distribución: el login es multi-shard
+        return multi_shard(db.query(User).filter(User.email == email)).first()
 
+    @staticmethod
+    def _upgrade_hash(db: Session, user: User, new_hash: str) -> None:
+        """Guarda el hash regenerado con el coste actual; un fallo no impide el login."""
+        try:
+            user.hash_password = new_hash
+            db.commit()
+        except Exception:
+            db.rollback()
 
     def authenticate_user(self, email: str, password: str, db):
-        user = db.query(User).filter(User.email == email).first()
+        user = self._find_user(db, email)
+        if not user:
+            return False
+        valid, new_hash = password_hasher.verify(password, user.hash_password)
+        if not valid:
+            return False
+        if new_hash:
+            self._upgrade_hash(db, user, new_hash)
+        return user
+
+    async def authenticate_user_async(self, email: str, password: str, db):
+        """
+        Como authenticate_user, pero la petición espera a bcrypt sin ocupar
+        un hilo del threadpool (solo las consultas pasan por él).
+        """
+        user = await run_in_threadpool(self._find_user, db, email)
         if not user:
             return False
-        if not self.bycrypt_context.verify(password, user.hash_password):
+        valid, new_hash = await password_hasher.verify_async(password, user.hash_password)
+        if not valid:
             return False
+        if new_hash:
+            await run_in_threadpool(self._upgrade_hash, db, user, new_hash)
         return user
         
-    def create_access_token(self, email: str, user_id, expirate_delta: timedelta): 
+    def create_access_token(self, email: str, user_id, expirate_delta: timedelta, region_id: Optional[int] = None): 
         encode = {"sub": email, "id": user_id }
+        if region_id is not None:
+            # Clave de distribución del usuario para enrutar sus consultas
+            encode["region_id"] = region_id
         expires = datetime.now(timezone.utc) + expirate_delta
         encode.update({"exp": expires})
         return jwt.encode(encode, self.SECRET_KEY, algorithm= self.ALGORITHM)
@@ -68,5 +107,20 @@ class AuthService:
                                 detail='Could not validate user. ')
             HTTPException()
 
-        token = auth.create_access_token(user.email, user.id,timedelta(minutes=20))
+        user_regions.set(user.id, user.region_id)
+        token = auth.create_access_token(user.email, user.id,timedelta(minutes=20), user.region_id)
+        return Token(access_token=token, token_type='bearer')
+
+    @staticmethod
+    async def authenticate_async(
+              db: Session,
+              form_data) -> Token:
+        auth = AuthService()
+        user = await auth.authenticate_user_async(form_data.username, form_data.password, db)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                detail='Could not validate user. ')
+
+        user_regions.set(user.id, user.region_id)
+        token = auth.create_access_token(user.email, user.id,timedelta(minutes=20), user.region_id)
         return Token(access_token=token, token_type='bearer')
@@ -0,0 +1,92 @@
+"""
+Day-by-day availability calendar as a bitmap.
+
+Bookings are half-open stays ([check_in, check_out)); each one clears its
+slice of a boolean array covering [start_date, end_date], so building the
+calendar costs O(days + bookings) instead of a scan of every booking per
+day. The array is then encoded in one of the response formats:
+
+- ``days``: one {date, available, price} entry per day (original format)
+- ``ranges``: run-length encoded [start, end] ranges (end inclusive)
+- ``bits``: base64 of the bitmap packed LSB first (bit i = start_date + i)
+"""
+import base64
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+CALENDAR_FORMATS = ("days", "ranges", "bits")
+
+
+def free_days(start_date: date, end_date: date, stays: Iterable[Tuple[date, date]]) -> np.ndarray:
+    """Boolean array, one entry per day of [start_date, end_date]."""
+    days = (end_date - start_date).days + 1
+    free = np.ones(max(days, 0), dtype=bool)
+    for check_in, check_out in stays:
+        first = max((check_in - start_date).days, 0)
+        last = min((check_out - start_date).days, days)
+        if first < last:
+            free[first:last] = False
+    return free
+
+
+def runs(start_date: date, free: np.ndarray) -> List[Dict[str, Any]]:
+    """Run-length encoding of the bitmap as inclusive date ranges."""
+    if not len(free):
+        return []
+    boundaries = np.flatnonzero(free[1:] != free[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(free)])) - 1
+    return [
+        {
+            "start": start_date + timedelta(days=int(start)),
+            "end": start_date + timedelta(days=int(end)),
+            "available": bool(free[start])
+        }
+        for start, end in zip(starts, ends)
+    ]
+
+
+def bits(free: np.ndarray) -> str:
+    return base64.b64encode(np.packbits(free, bitorder="little").tobytes()).decode("ascii")
+
+
+def per_day(start_date: date, free: np.ndarray, prices: Optional[List] = None) -> List[Dict[str, Any]]:
+    return [
+        {
+            "date": start_date + timedelta(days=offset),
+            "available": bool(available),
+            "price": prices[offset] if prices else None
+        }
+        for offset, available in enumerate(free)
+    ]
+
+
+def encode_calendar(
+    property_id: int,
+    start_date: date,
+    end_date: date,
+    free: np.ndarray,
+    calendar_format: str,
+    prices: Optional[List] = None
+) -> Any:
+    """Response body for `calendar_format` (see CALENDAR_FORMATS)."""
+    if calendar_format == "days":
+        return per_day(start_date, free, prices)
+
+    calendar = {
+        "property_id": property_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "format": calendar_format,
+        "available_days": int(free.sum()),
+        "prices": prices
+    }
+    if calendar_format == "ranges":
+        calendar["ranges"] = runs(start_date, free)
+    elif calendar_format == "bits":
+        calendar["bits"] = bits(free)
+    else:
+        raise ValueError(f"Unknown calendar format: {calendar_format}")
+    return calendar
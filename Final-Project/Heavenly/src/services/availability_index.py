@@ -0,0 +1,173 @@
+"""
+Per-property night bitmaps (~2 years ahead) stored in the listing index.
+
+A night is free when an `available_date` range with is_available=TRUE
+covers it, no is_available=FALSE range covers it and no PENDING/CONFIRMED
+booking occupies it. Ranges are inclusive ([start_date, end_date], as in
+AvailabilityService) and bookings are half-open ([check_in, check_out)).
+
+Writes update the bitmap of the affected property only: a new booking
+clears its nights in place, any other change reloads the property's ranges
+with two queries routed to its shard.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.available_date import AvailableDate
+from models.booking import Booking
+from repositories.booking_repository import ACTIVE_BOOKING_STATUSES
+from repositories.shard_routing import multi_shard
+from services.listing_index import NIGHTS_HORIZON_DAYS, listing_index
+
+logger = logging.getLogger(__name__)
+
+_watermark: Optional[datetime] = None
+
+
+def _nights_row(origin: date, ranges: Iterable[Tuple], bookings: Iterable[Tuple]) -> np.ndarray:
+    """
+    Packed bitmap for one property from its (start, end, is_available)
+    ranges and (check_in, check_out) bookings.
+    """
+    free = np.zeros(NIGHTS_HORIZON_DAYS, dtype=bool)
+    ranges = sorted(ranges, key=lambda r: r[2], reverse=True)  # Blocked ranges win
+    for start_date, end_date, is_available in ranges:
+        first = max((start_date - origin).days, 0)
+        last = min((end_date - origin).days + 1, NIGHTS_HORIZON_DAYS)
+        if first < last:
+            free[first:last] = is_available
+    for check_in, check_out in bookings:
+        first = max((check_in - origin).days, 0)
+        last = min((check_out - origin).days, NIGHTS_HORIZON_DAYS)
+        if first < last:
+            free[first:last] = False
+    return np.packbits(free, bitorder="little")
+
+
+def _range_statement(origin: date, property_ids: Optional[List[int]] = None, region_id: Optional[int] = None):
+    horizon_end = origin + timedelta(days=NIGHTS_HORIZON_DAYS)
+    query = select(
+        AvailableDate.property_id, AvailableDate.start_date,
+        AvailableDate.end_date, AvailableDate.is_available
+    ).where(AvailableDate.end_date >= origin, AvailableDate.start_date < horizon_end)
+    if property_ids is not None:
+        query = query.where(AvailableDate.property_id.in_(property_ids))
+    if region_id is not None:
+        return query.where(AvailableDate.region_id == region_id)
+    return multi_shard(query)
+
+
+def _booking_statement(origin: date, property_ids: Optional[List[int]] = None, region_id: Optional[int] = None):
+    horizon_end = origin + timedelta(days=NIGHTS_HORIZON_DAYS)
+    query = select(Booking.property_id, Booking.check_in, Booking.check_out).where(
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        Booking.check_out > origin,
+        Booking.check_in < horizon_end
+    )
+    if property_ids is not None:
+        query = query.where(Booking.property_id.in_(property_ids))
+    if region_id is not None:
+        return query.where(Booking.region_id == region_id)
+    return multi_shard(query)
+
+
+def load_availability(
+    db: Session,
+    property_ids: Optional[List[int]] = None,
+    region_id: Optional[int] = None
+) -> int:
+    """
+    Recompute the bitmaps of `property_ids` (all properties when None,
+    rebasing the origin to today). Returns the number of bitmaps written.
+    """
+    full = property_ids is None
+    origin = date.today() if full else listing_index.nights_origin
+    if origin is None:
+        return 0
+
+    ranges: Dict[int, List[Tuple]] = {property_id: [] for property_id in property_ids or []}
+    for property_id, start_date, end_date, is_available in db.execute(
+        _range_statement(origin, property_ids, region_id).execution_options(yield_per=50000)
+    ):
+        ranges.setdefault(property_id, []).append((start_date, end_date, is_available))
+
+    bookings: Dict[int, List[Tuple]] = {}
+    for property_id, check_in, check_out in db.execute(
+        _booking_statement(origin, property_ids, region_id).execution_options(yield_per=50000)
+    ):
+        bookings.setdefault(property_id, []).append((check_in, check_out))
+
+    rows = {
+        property_id: _nights_row(origin, property_ranges, bookings.get(property_id, ()))
+        for property_id, property_ranges in ranges.items()
+    }
+    listing_index.set_nights(rows, origin, full=full)
+    return len(rows)
+
+
+def catch_up_watermark(db: Session) -> datetime:
+    """
+    Watermark on the DB clock (updated_at is filled with its now()), minus
+    a lag: now() is the transaction start, so a transaction that commits
+    after this read can carry an earlier updated_at. Rows inside the lag
+    are simply reloaded again on the next catch-up.
+    """
+    now = db.execute(select(func.localtimestamp())).scalar()
+    return now - timedelta(seconds=settings.listing_index_catch_up_lag_seconds)
+
+
+def catch_up_availability(db: Session) -> int:
+    """
+    Full load once a day (rebases the horizon and drops deleted ranges);
+    otherwise reload only properties whose ranges or bookings changed since
+    the last watermark, e.g. through another worker.
+    """
+    global _watermark
+    if listing_index.nights_origin != date.today():
+        _watermark = catch_up_watermark(db)
+        return load_availability(db)
+
+    since = _watermark
+    _watermark = catch_up_watermark(db)
+    changed = db.execute(multi_shard(union(
+        select(AvailableDate.property_id).where(AvailableDate.updated_at >= since),
+        select(Booking.property_id).where(Booking.updated_at >= since)
+    ))).scalars().all()
+    if not changed:
+        return 0
+    return load_availability(db, list(changed))
+
+
+def refresh_availability_index(db: Session) -> None:
+    started = time.perf_counter()
+    loaded = catch_up_availability(db)
+    if loaded:
+        logger.info(f"Availability index: {loaded} bitmaps loaded in {time.perf_counter() - started:.2f}s")
+
+
+def _enabled() -> bool:
+    return settings.availability_index_enabled and listing_index.nights_origin is not None
+
+
+def index_availability_write(db: Session, property_id: int, region_id: int) -> None:
+    """
+    Reload one property's bitmap after a committed availability or booking
+    status change (router queries on its shard).
+    """
+    if _enabled():
+        load_availability(db, [property_id], region_id)
+
+
+def index_booking_created(property_id: int, check_in: date, check_out: date) -> None:
+    """
+    A new PENDING booking takes its nights; no query needed.
+    """
+    if _enabled():
+        listing_index.clear_nights(property_id, check_in, check_out)
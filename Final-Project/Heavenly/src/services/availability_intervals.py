@@ -0,0 +1,241 @@
+"""
+Interval engine for `available_date` calendars.
+
+A property's calendar is a set of inclusive [start_date, end_date] ranges
+flagged is_available. Its rows are swept in memory into a canonical
+calendar (no overlaps, adjacent ranges with the same is_available merged,
+blocked ranges win over available ones) and diffed against the stored
+rows, so the database only sees the minimal set of deletes, updates and
+inserts, each as one statement.
+
+`compact_region` applies it to fragmented calendars, one batch of
+properties at a time. Bookings never write ranges: their nights are
+excluded by the booking overlap checks, and hosts cannot open ranges over
+active bookings.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.available_date import AvailableDate
+
+logger = logging.getLogger(__name__)
+
+ONE_DAY = timedelta(days=1)
+
+# (start_date, end_date, is_available), dates inclusive
+Segment = Tuple[date, date, bool]
+# (id, start_date, end_date, is_available)
+StoredRange = Tuple[int, date, date, bool]
+
+
+@dataclass
+class IntervalPlan:
+    inserts: List[Segment] = field(default_factory=list)
+    updates: List[Tuple[int, Segment]] = field(default_factory=list)
+    deletes: List[int] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+    @property
+    def operations(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+def normalize(ranges: Iterable[Segment], paint: Optional[Segment] = None) -> List[Segment]:
+    """
+    Canonical calendar for `ranges`, optionally overwriting the days of
+    `paint` with its is_available value. Uncovered days stay uncovered.
+    """
+    # day -> change in (available, blocked) coverage
+    deltas: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+    for start_date, end_date, is_available in ranges:
+        kind = 0 if is_available else 1
+        deltas[start_date][kind] += 1
+        deltas[end_date + ONE_DAY][kind] -= 1
+    if paint:
+        deltas[paint[0]]
+        deltas[paint[1] + ONE_DAY]
+
+    segments: List[Segment] = []
+    available = blocked = 0
+    days = sorted(deltas)
+    for day, next_day in zip(days, days[1:]):
+        available += deltas[day][0]
+        blocked += deltas[day][1]
+        if paint and paint[0] <= day <= paint[1]:
+            value = paint[2]
+        elif blocked:
+            value = False
+        elif available:
+            value = True
+        else:
+            continue
+        last = segments[-1] if segments else None
+        if last and last[2] == value and last[1] + ONE_DAY == day:
+            segments[-1] = (last[0], next_day - ONE_DAY, value)
+        else:
+            segments.append((day, next_day - ONE_DAY, value))
+    return segments
+
+
+def plan_changes(stored: List[StoredRange], segments: List[Segment]) -> IntervalPlan:
+    """
+    Minimal changes turning the `stored` rows into `segments`: identical
+    rows are kept, the rest are reused through updates (preferring a row
+    that overlaps the segment) and only the remainder is inserted or deleted.
+    """
+    plan = IntervalPlan()
+    unused = {row[0]: row for row in stored}
+    pending: List[Segment] = []
+
+    by_value = {(start, end, value): row_id for row_id, start, end, value in stored}
+    for segment in segments:
+        row_id = by_value.get(segment)
+        if row_id in unused:
+            del unused[row_id]
+        else:
+            pending.append(segment)
+
+    leftover: List[Segment] = []
+    for segment in pending:
+        overlapping = next(
+            (row for row in unused.values() if row[1] <= segment[1] and row[2] >= segment[0]),
+            None
+        )
+        if overlapping:
+            del unused[overlapping[0]]
+            plan.updates.append((overlapping[0], segment))
+        else:
+            leftover.append(segment)
+
+    for segment in leftover:
+        if unused:
+            row_id = next(iter(unused))
+            del unused[row_id]
+            plan.updates.append((row_id, segment))
+        else:
+            plan.inserts.append(segment)
+    plan.deletes.extend(unused)
+    return plan
+
+
+def apply_plans(db: Session, region_id: int, plans: Dict[int, IntervalPlan]) -> None:
+    """
+    Execute the plans of several properties of one region ({property_id: plan})
+    with at most one DELETE, one executemany UPDATE and one INSERT.
+    """
+    deletes = [row_id for plan in plans.values() for row_id in plan.deletes]
+    updates = [change for plan in plans.values() for change in plan.updates]
+    inserts = [
+        {
+            "start_date": start,
+            "end_date": end,
+            "is_available": value,
+            "property_id": property_id,
+            "region_id": region_id
+        }
+        for property_id, plan in plans.items()
+        for start, end, value in plan.inserts
+    ]
+
+    if deletes:
+        db.execute(delete(AvailableDate).where(
+            AvailableDate.region_id == region_id,
+            AvailableDate.id.in_(deletes)
+        ))
+    if updates:
+        table = AvailableDate.__table__
+        db.execute(
+            update(table).where(
+                table.c.region_id == region_id,
+                table.c.id == bindparam("row_id")
+            ).values(
+                start_date=bindparam("new_start"),
+                end_date=bindparam("new_end"),
+                is_available=bindparam("new_available")
+            ),
+            [
+                {"row_id": row_id, "new_start": start, "new_end": end, "new_available": value}
+                for row_id, (start, end, value) in updates
+            ]
+        )
+    if inserts:
+        db.execute(insert(AvailableDate.__table__), inserts)
+
+
+def _fragmented_properties(db: Session, region_id: int, after_id: int, limit: int) -> List[int]:
+    """
+    Next properties (by id) of the region whose calendar has overlapping
+    ranges or adjacent ranges with the same is_available.
+    """
+    previous = select(
+        AvailableDate.property_id,
+        AvailableDate.start_date,
+        AvailableDate.is_available,
+        func.max(AvailableDate.end_date).over(
+            partition_by=AvailableDate.property_id,
+            order_by=AvailableDate.start_date,
+            rows=(None, -1)
+        ).label("previous_end"),
+        func.lag(AvailableDate.is_available).over(
+            partition_by=AvailableDate.property_id,
+            order_by=AvailableDate.start_date
+        ).label("previous_available")
+    ).where(
+        AvailableDate.region_id == region_id,
+        AvailableDate.property_id > after_id
+    ).subquery()
+
+    query = select(previous.c.property_id).where(
+        (previous.c.previous_end >= previous.c.start_date) |
+        and_(
+            previous.c.previous_end == previous.c.start_date - 1,
+            previous.c.previous_available == previous.c.is_available
+        )
+    ).group_by(previous.c.property_id).order_by(previous.c.property_id).limit(limit)
+    return list(db.execute(query).scalars())
+
+
+def compact_region(db: Session, region_id: int, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Defragment every calendar of a region, committing after each batch of
+    `batch_size` properties. Returns counts of properties and operations.
+    """
+    stats = {"properties": 0, "deleted": 0, "updated": 0, "inserted": 0}
+    after_id = 0
+    while True:
+        property_ids = _fragmented_properties(db, region_id, after_id, batch_size)
+        if not property_ids:
+            return stats
+
+        stored: Dict[int, List[StoredRange]] = defaultdict(list)
+        for property_id, *row in db.execute(
+            select(
+                AvailableDate.property_id, AvailableDate.id, AvailableDate.start_date,
+                AvailableDate.end_date, AvailableDate.is_available
+            ).where(
+                AvailableDate.region_id == region_id,
+                AvailableDate.property_id.in_(property_ids)
+            ).with_for_update()
+        ):
+            stored[property_id].append(tuple(row))
+
+        plans = {
+            property_id: plan_changes(rows, normalize(row[1:] for row in rows))
+            for property_id, rows in stored.items()
+        }
+        apply_plans(db, region_id, plans)
+        db.commit()
+
+        stats["properties"] += len(plans)
+        for key, attribute in (("deleted", "deletes"), ("updated", "updates"), ("inserted", "inserts")):
+            stats[key] += sum(len(getattr(plan, attribute)) for plan in plans.values())
+        after_id = property_ids[-1]
+        logger.info(f"Compacted {len(plans)} calendars in region {region_id} (up to property {after_id})")
@@ -1,14 +1,19 @@
 # services/availability_service.py
-from datetime import date, timedelta
-from typing import List, Optional, Dict
+from bisect import bisect_left, insort
+from datetime import date
+from typing import List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import Date, Integer, and_, column, func, insert, literal, or_, select, union_all, values
 from fastapi import HTTPException, status
 
 from models.available_date import AvailableDate
 from models.property import Property
 from models.booking import Booking
-from schemas.available_date import AvailableDateCreate, AvailableDateBatchCreate, AvailableDateUpdate
+from schemas.available_date import (
+    AvailableDateCreate, AvailableDateBatchCreate, AvailableDateUpdate,
+    AvailableDateRes, AvailableDateBatchItemRes, AvailableDateBatchRes
+)
+from services.availability_index import index_availability_write
 
 
 class AvailabilityService:
@@ -57,6 +62,7 @@ class AvailabilityService:
         # Check for booking conflicts
         booking_conflict = db.query(Booking).filter(
             Booking.property_id == availability_data.property_id,
+            Booking.region_id == availability_data.region_id,
             Booking.status.in_(['CONFIRMED', 'PENDING']),
             or_(
                 and_(
@@ -84,17 +90,65 @@ class AvailabilityService:
         db.add(db_availability)
         db.commit()
         db.refresh(db_availability)
+        index_availability_write(db, db_availability.property_id, db_availability.region_id)
         
         return db_availability
     
+    @staticmethod
+    def _batch_conflicts(
+        db: Session,
+        property_id: int,
+        region_id: int,
+        ranges: List[Tuple[int, date, date]]
+    ) -> Dict[int, Tuple[str, int]]:
+        """
+        Existing availability ranges and active bookings overlapping any of the
+        submitted (index, start, end) ranges, in a single query routed to the
+        property's shard. Returns {index: (reason, conflicting id)}.
+        """
+        submitted = values(
+            column("idx", Integer), column("start_date", Date), column("end_date", Date),
+            name="submitted"
+        ).data(ranges)
+
+        availability_conflicts = select(
+            submitted.c.idx, literal("overlaps_existing_availability").label("reason"),
+            func.min(AvailableDate.id).label("conflict_id")
+        ).join(AvailableDate, and_(
+            AvailableDate.property_id == property_id,
+            AvailableDate.region_id == region_id,
+            AvailableDate.start_date <= submitted.c.end_date,
+            AvailableDate.end_date >= submitted.c.start_date
+        )).group_by(submitted.c.idx)
+
+        # Ranges are inclusive, bookings occupy the nights [check_in, check_out)
+        booking_conflicts = select(
+            submitted.c.idx, literal("overlaps_booking").label("reason"),
+            func.min(Booking.id).label("conflict_id")
+        ).join(Booking, and_(
+            Booking.property_id == property_id,
+            Booking.region_id == region_id,
+            Booking.status.in_(['CONFIRMED', 'PENDING']),
+            Booking.check_in <= submitted.c.end_date,
+            Booking.check_out > submitted.c.start_date
+        )).group_by(submitted.c.idx)
+
+        conflicts = {}
+        for idx, reason, conflict_id in db.execute(union_all(availability_conflicts, booking_conflicts)):
+            conflicts.setdefault(idx, (reason, conflict_id))
+        return conflicts
+
     @staticmethod
     def create_batch_availability(
         db: Session,
         batch_data: AvailableDateBatchCreate,
         user_id: int
-    ) -> List[AvailableDate]:
+    ) -> AvailableDateBatchRes:
         """
-        Create multiple availability date ranges for a property
+        Create multiple availability date ranges for a property.
+        One conflict query for the whole batch and one multi-row INSERT ... RETURNING;
+        ranges that overlap existing data or an earlier range of the same batch
+        are skipped and reported with the reason.
         """
         # Verify property ownership
         property = db.query(Property).filter(
@@ -110,51 +164,69 @@ class AvailabilityService:
                 detail="Property not found or you don't have permission"
             )
         
-        created_availabilities = []
+        results = [
+            AvailableDateBatchItemRes(index=idx, **date_range.model_dump(), status="created")
+            for idx, date_range in enumerate(batch_data.dates)
+        ]
+        
+        # Invalid ranges never reach the database
+        for result in results:
+            if result.end_date < result.start_date:
+                result.status, result.reason = "skipped", "invalid_range"
         
+        valid = [(r.index, r.start_date, r.end_date) for r in results if r.status == "created"]
+        conflicts = AvailabilityService._batch_conflicts(
+            db, batch_data.property_id, batch_data.region_id, valid
+        ) if valid else {}
+        
+        # Overlaps inside the batch: the range submitted first wins
+        accepted: List[Tuple[date, date, int]] = []  # sorted, non-overlapping
+        for idx, start_date, end_date in valid:
+            if idx in conflicts:
+                results[idx].status = "skipped"
+                results[idx].reason, results[idx].conflict_id = conflicts[idx]
+                continue
+            pos = bisect_left(accepted, (start_date,))
+            neighbours = accepted[max(pos - 1, 0):pos + 1]
+            clash = next((n for n in neighbours if n[0] <= end_date and n[1] >= start_date), None)
+            if clash:
+                results[idx].status, results[idx].reason = "skipped", "overlaps_batch_range"
+                results[idx].conflict_id = clash[2]
+                continue
+            insort(accepted, (start_date, end_date, idx))
+        
+        to_create = [results[idx] for _, _, idx in sorted(accepted, key=lambda a: a[2])]
         try:
-            for date_range in batch_data.dates:
-                # Check for conflicts
-                conflict = db.query(AvailableDate).filter(
-                    AvailableDate.property_id == batch_data.property_id,
-                    AvailableDate.region_id == batch_data.region_id,
-                    or_(
-                        and_(
-                            AvailableDate.start_date <= date_range.end_date,
-                            AvailableDate.end_date >= date_range.start_date
-                        )
+            if to_create:
+                # RETURNING in parameter order, so rows line up with to_create
+                created = db.scalars(insert(AvailableDate).returning(AvailableDate, sort_by_parameter_order=True), [
+                    dict(
+                        start_date=r.start_date,
+                        end_date=r.end_date,
+                        is_available=r.is_available,
+                        property_id=batch_data.property_id,
+                        region_id=batch_data.region_id
                     )
-                ).first()
-                
-                if conflict:
-                    continue  # Skip conflicting ranges
-                
-                # Create availability
-                db_availability = AvailableDate(
-                    start_date=date_range.start_date,
-                    end_date=date_range.end_date,
-                    is_available=date_range.is_available,
-                    property_id=batch_data.property_id,
-                    region_id=batch_data.region_id
-                )
-                
-                db.add(db_availability)
-                created_availabilities.append(db_availability)
-            
+                    for r in to_create
+                ]).all()
+                for result, availability in zip(to_create, created):
+                    result.availability = AvailableDateRes.model_validate(availability)
             db.commit()
-            
-            # Refresh all created objects
-            for availability in created_availabilities:
-                db.refresh(availability)
-            
-            return created_availabilities
-            
         except Exception as e:
             db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error creating batch availability: {str(e)}"
             )
+        
+        if to_create:
+            index_availability_write(db, batch_data.property_id, batch_data.region_id)
+        
+        return AvailableDateBatchRes(
+            created=len(to_create),
+            skipped=len(results) - len(to_create),
+            results=results
+        )
     
     @staticmethod
     def update_availability(
@@ -214,6 +286,7 @@ class AvailabilityService:
         
         db.commit()
         db.refresh(availability)
+        index_availability_write(db, availability.property_id, availability.region_id)
         
         return availability
     
@@ -243,8 +316,10 @@ class AvailabilityService:
         if not availability:
             return False
         
+        property_id = availability.property_id
         db.delete(availability)
         db.commit()
+        index_availability_write(db, property_id, region_id)
         return True
     
     @staticmethod
@@ -288,79 +363,3 @@ class AvailabilityService:
             query = query.filter(AvailableDate.is_available == is_available)
         
         return query.order_by(AvailableDate.start_date).all()
-    
-    @staticmethod
-    def block_dates_for_booking(
-        db: Session,
-        property_id: int,
-        region_id: int,
-        start_date: date,
-        end_date: date
-    ) -> bool:
-        """
-        Block dates when a booking is made (internal use)
-        """
-        # Find availability ranges that overlap with booking dates
-        overlapping = db.query(AvailableDate).filter(
-            AvailableDate.property_id == property_id,
-            AvailableDate.region_id == region_id,
-            AvailableDate.is_available == True,
-            or_(
-                and_(
-                    AvailableDate.start_date <= end_date,
-                    AvailableDate.end_date >= start_date
-                )
-            )
-        ).all()
-        
-        try:
-            for availability in overlapping:
-                # Case 1: Booking completely within availability range
-                if availability.start_date <= start_date and availability.end_date >= end_date:
-                    # Split into up to 3 ranges
-                    if availability.start_date < start_date:
-                        # Create range before booking
-                        db.add(AvailableDate(
-                            start_date=availability.start_date,
-                            end_date=start_date - timedelta(days=1),
-                            is_available=True,
-                            property_id=property_id,
-                            region_id=region_id
-                        ))
-                    
-                    # Create blocked range for booking
-                    db.add(AvailableDate(
-                        start_date=start_date,
-                        end_date=end_date,
-                        is_available=False,
-                        property_id=property_id,
-                        region_id=region_id
-                    ))
-                    
-                    if availability.end_date > end_date:
-                        # Create range after booking
-                        db.add(AvailableDate(
-                            start_date=end_date + timedelta(days=1),
-                            end_date=availability.end_date,
-                            is_available=True,
-                            property_id=property_id,
-                            region_id=region_id
-                        ))
-                    
-                    # Delete original range
-                    db.delete(availability)
-                
-                # Case 2: Booking overlaps start of range
-                elif availability.start_date < start_date <= availability.end_date:
-                    availability.end_date = start_date - timedelta(days=1)
-                
-                # Case 3: Booking overlaps end of range
-                elif availability.start_date <= end_date < availability.end_date:
-                    availability.start_date = end_date + timedelta(days=1)
-            
-            db.commit()
-            return True
-            
-        except Exception:
-            db.rollback()
-            return False
\ No newline at end of file
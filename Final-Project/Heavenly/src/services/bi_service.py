@@ -1,7 +1,10 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 import psycopg2
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 load_dotenv()
 
@@ -17,6 +20,293 @@ DB_NAME = os.getenv("DB_NAME", "heavenly")
 DB_USER = os.getenv("DB_USER", "heavenly")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "12345")
 
+# Carga incremental de fact_booking
+ETL_BATCH_SIZE = int(os.getenv("BI_ETL_BATCH_SIZE", "5000"))
+# Las filas modificadas hace menos de esto se dejan para la siguiente carga:
+# updated_at se fija al ejecutar la sentencia, no al confirmar, y una
+# transacción aún abierta podría quedar por detrás de la marca de agua
+ETL_WATERMARK_LAG_SECONDS = int(os.getenv("BI_ETL_WATERMARK_LAG_SECONDS", "300"))
+# Regiones cargadas a la vez, cada una con su propia conexión
+ETL_PARALLELISM = int(os.getenv("BI_ETL_PARALLELISM", "4"))
+# fact_booking: particiones mensuales pasadas a columnar tras estos meses
+# (deben superar el plazo en que una reserva aún puede cambiar) y meses
+# futuros con partición ya creada
+FACT_COLUMNAR_AFTER_MONTHS = int(os.getenv("BI_FACT_COLUMNAR_AFTER_MONTHS", "13"))
+FACT_PARTITIONS_AHEAD_MONTHS = int(os.getenv("BI_FACT_PARTITIONS_AHEAD_MONTHS", "12"))
+PLATFORM_COMMISSION_RATE = 0.15
+
+# Marca de agua inicial: antes de cualquier fila
+_WATERMARK_START = (datetime(1970, 1, 1), 0)
+_ALL_DATES = (date.min, date.max)
+
+# Cada región es una unidad independiente: todas sus consultas filtran por
+# region_id y unen por (id, region_id), así que Citus las resuelve en el
+# shard de la región sin repartition joins, y su marca de agua
+# (dw_etl_watermark, co-localizada con booking) se confirma en el mismo shard.
+
+# Cambios de cada tabla de origen en la región, en orden (updated_at, id),
+# con la reserva a la que afectan (idx_booking_updated / idx_payment_updated)
+CHANGES_SQL = {
+    "booking": """
+        SELECT updated_at, id, id AS booking_id
+        FROM booking
+        WHERE region_id = %(region_id)s
+          AND (updated_at, id) > (%(updated_at)s, %(last_id)s)
+          AND updated_at < %(until)s
+        ORDER BY updated_at, id
+        LIMIT %(limit)s
+    """,
+    "payment": """
+        SELECT updated_at, id, booking_id
+        FROM payment
+        WHERE region_id = %(region_id)s
+          AND (updated_at, id) > (%(updated_at)s, %(last_id)s)
+          AND updated_at < %(until)s
+        ORDER BY updated_at, id
+        LIMIT %(limit)s
+    """,
+}
+
+# dim_date y las particiones de fact_booking deben cubrir los check_in de
+# todas las reservas pendientes de cargar (también las afectadas solo por
+# un pago) y los que ya tienen sus hechos, que se borran si el check_in
+# cambió; se preparan una vez antes de repartir las regiones para que sus
+# transacciones no hagan DDL ni escriban en la tabla de referencia
+PENDING_DATES_SQL = """
+    WITH pending AS (
+        SELECT id AS booking_id, check_in FROM booking
+        WHERE region_id = %(region_id)s AND updated_at > %(booking)s
+        UNION
+        SELECT b.id, b.check_in
+        FROM payment py
+        JOIN booking b ON b.id = py.booking_id AND b.region_id = py.region_id
+        WHERE py.region_id = %(region_id)s AND py.updated_at > %(payment)s
+    )
+    SELECT min(day), max(day)
+    FROM (
+        SELECT check_in AS day FROM pending
+        UNION ALL
+        SELECT f.check_in_date
+        FROM fact_booking f
+        JOIN pending p ON p.booking_id = f.booking_id
+        WHERE f.region_id = %(region_id)s
+    ) AS days
+"""
+
+DATES_SQL = """
+    INSERT INTO dim_date
+    SELECT * FROM generate_date_range(%s, %s)
+    ON CONFLICT (id) DO NOTHING
+"""
+
+# Particiones mensuales de fact_booking (vista time_partitions de Citus).
+# Crear las que falten entre start_from y end_at no toca las existentes.
+PARTITIONS_CREATE_SQL = """
+    SELECT create_time_partitions('fact_booking', INTERVAL '1 month', %(end_at)s, %(start_from)s)
+"""
+
+COLUMNAR_PARTITIONS_SQL = """
+    SELECT partition::text FROM time_partitions
+    WHERE parent_table = 'fact_booking'::regclass
+      AND access_method = 'columnar'
+      AND from_value::date <= %(last)s AND to_value::date > %(first)s
+    ORDER BY from_value::date
+"""
+
+PARTITION_TO_HEAP_SQL = "SELECT alter_table_set_access_method(%s, 'heap')"
+
+PARTITIONS_TO_COLUMNAR_SQL = "CALL alter_old_partitions_set_access_method('fact_booking', %s, 'columnar')"
+
+# Las consultas de la carga sobre fact_booking que no conocen el check_in
+# filtran por el rango pendiente (ver PENDING_DATES_SQL): Postgres descarta
+# las particiones de fuera, y las de dentro son todas heap
+
+# Hechos de reservas del lote cuyo check_in cambió: el upsert escribiría la
+# fila en otra partición, así que la anterior se borra antes
+FACTS_MOVED_SQL = """
+    DELETE FROM fact_booking f
+    USING booking b
+    WHERE f.region_id = %(region_id)s
+      AND f.booking_id = ANY(%(booking_ids)s)
+      AND f.check_in_date BETWEEN %(first)s AND %(last)s
+      AND b.region_id = f.region_id
+      AND b.id = f.booking_id
+      AND b.check_in <> f.check_in_date
+"""
+
+# Hechos de las reservas del lote (un solo shard)
+FACTS_UPSERT_SQL = """
+    INSERT INTO fact_booking (
+        booking_id, dim_date_id, dim_host_id, dim_guest_id, dim_property_id, dim_currency_id, region_id,
+        nights_booked, total_revenue, host_commission, platform_commission,
+        guest_adults, guest_children, booking_status, payment_status, check_in_date, source_updated_at
+    )
+    SELECT
+        b.id,
+        (EXTRACT(YEAR FROM b.check_in) * 10000 + EXTRACT(MONTH FROM b.check_in) * 100 + EXTRACT(DAY FROM b.check_in))::INT,
+        p.user_id,
+        b.user_id,
+        b.property_id,
+        py.currency_id,
+        b.region_id,
+        b.number_nights,
+        b.total_price,
+        b.total_price * (1 - %(commission)s),
+        b.total_price * %(commission)s,
+        b.guest_adults,
+        b.guest_children,
+        b.status,
+        py.status,
+        b.check_in,
+        GREATEST(b.updated_at, py.updated_at)
+    FROM booking b
+    JOIN property p ON p.id = b.property_id AND p.region_id = b.region_id
+    -- Una reserva tiene varios pagos (el PENDING de la creación y el
+    -- SUCCESSFUL al pagar): se toma uno solo, el cobrado o el más reciente;
+    -- dos filas para la misma clave abortarían el ON CONFLICT DO UPDATE
+    JOIN LATERAL (
+        SELECT currency_id, status, updated_at
+        FROM payment
+        WHERE booking_id = b.id AND region_id = b.region_id
+        ORDER BY (status = 'SUCCESSFUL') DESC, updated_at DESC, id DESC
+        LIMIT 1
+    ) py ON TRUE
+    WHERE b.region_id = %(region_id)s AND b.id = ANY(%(booking_ids)s)
+    ON CONFLICT (booking_id, region_id, check_in_date) DO UPDATE SET
+        dim_date_id = EXCLUDED.dim_date_id,
+        dim_host_id = EXCLUDED.dim_host_id,
+        dim_currency_id = EXCLUDED.dim_currency_id,
+        nights_booked = EXCLUDED.nights_booked,
+        total_revenue = EXCLUDED.total_revenue,
+        host_commission = EXCLUDED.host_commission,
+        platform_commission = EXCLUDED.platform_commission,
+        guest_adults = EXCLUDED.guest_adults,
+        guest_children = EXCLUDED.guest_children,
+        booking_status = EXCLUDED.booking_status,
+        payment_status = EXCLUDED.payment_status,
+        source_updated_at = EXCLUDED.source_updated_at
+"""
+
+# Días de check_in de las reservas del lote que ya están en fact_booking; se
+# anota antes y después del upsert para recoger también el día que deja una
+# reserva cuyo check_in cambia
+DIRTY_DATES_SQL = """
+    INSERT INTO dw_kpi_dirty (region_id, day)
+    SELECT DISTINCT region_id, check_in_date
+    FROM fact_booking
+    WHERE region_id = %(region_id)s AND booking_id = ANY(%(booking_ids)s)
+      AND check_in_date BETWEEN %(first)s AND %(last)s
+    ON CONFLICT DO NOTHING
+"""
+
+WATERMARK_SELECT_SQL = """
+    SELECT updated_at, last_id FROM dw_etl_watermark WHERE region_id = %s AND source = %s
+"""
+
+WATERMARK_UPSERT_SQL = """
+    INSERT INTO dw_etl_watermark (
+        region_id, source, updated_at, last_id, rows_loaded, loaded_at, status, last_error, attempted_at
+    )
+    VALUES (
+        %(region_id)s, %(source)s, %(updated_at)s, %(last_id)s, %(rows)s,
+        LOCALTIMESTAMP, 'ok', NULL, LOCALTIMESTAMP
+    )
+    ON CONFLICT (region_id, source) DO UPDATE SET
+        updated_at = EXCLUDED.updated_at,
+        last_id = EXCLUDED.last_id,
+        rows_loaded = dw_etl_watermark.rows_loaded + EXCLUDED.rows_loaded,
+        loaded_at = EXCLUDED.loaded_at,
+        status = 'ok',
+        last_error = NULL,
+        attempted_at = EXCLUDED.attempted_at
+"""
+
+# El fallo se registra sin mover la marca de agua
+WATERMARK_FAILED_SQL = """
+    INSERT INTO dw_etl_watermark (region_id, source, updated_at, last_id, status, last_error, attempted_at)
+    VALUES (%(region_id)s, %(source)s, %(start)s, 0, 'failed', %(error)s, LOCALTIMESTAMP)
+    ON CONFLICT (region_id, source) DO UPDATE SET
+        status = 'failed',
+        last_error = EXCLUDED.last_error,
+        attempted_at = EXCLUDED.attempted_at
+"""
+
+BATCH_START_SQL = "INSERT INTO dw_etl_batch DEFAULT VALUES RETURNING id"
+
+BATCH_FINISH_SQL = """
+    UPDATE dw_etl_batch
+    SET finished_at = LOCALTIMESTAMP, status = %(status)s, facts = %(facts)s, failed_regions = %(failed)s
+    WHERE id = %(batch_id)s
+"""
+
+# ---------------------------------------------------------------- KPIs
+
+KPI_VIEW = "vm_regional_kpis"
+# REFRESH ... CONCURRENTLY exige un índice único válido sobre la vista
+KPI_VIEW_UNIQUE_INDEX = "idx_vm_revpar_pk"
+
+KPI_VIEW_INDEX_SQL = """
+    SELECT indisunique AND indisvalid FROM pg_index
+    WHERE indexrelid = to_regclass(%s) AND indrelid = to_regclass(%s)
+"""
+
+KPI_STATUSES = ('CONFIRMED', 'COMPLETED', 'REVIEWED')
+
+# granularidad -> (tabla, unidad de date_trunc, duración del periodo)
+KPI_ROLLUPS = {
+    "day": ("kpi_daily", "day", "1 day"),
+    "month": ("kpi_monthly", "month", "1 month"),
+    "quarter": ("kpi_quarterly", "quarter", "3 months"),
+}
+
+# Se toman los días pendientes de la región; si el recálculo falla, el
+# rollback los devuelve a dw_kpi_dirty para la siguiente ejecución
+DIRTY_CLAIM_SQL = "DELETE FROM dw_kpi_dirty WHERE region_id = %s RETURNING day"
+
+ACTIVE_PROPERTIES_SQL = "SELECT count(*) FROM property WHERE region_id = %s AND is_active = TRUE"
+
+ROLLUP_DELETE_SQL = "DELETE FROM {table} WHERE region_id = %(region_id)s AND period_start = ANY(%(periods)s)"
+
+ROLLUP_DAILY_SQL = """
+    INSERT INTO kpi_daily (
+        region_id, period_start, days, bookings, nights_booked, total_revenue, active_properties, refreshed_at
+    )
+    SELECT region_id, check_in_date, 1, count(*), sum(nights_booked), sum(total_revenue), %(active)s, LOCALTIMESTAMP
+    FROM fact_booking
+    WHERE region_id = %(region_id)s
+      AND check_in_date BETWEEN %(first)s AND %(last)s
+      AND check_in_date = ANY(%(periods)s)
+      AND booking_status IN %(statuses)s
+    GROUP BY region_id, check_in_date
+"""
+
+# Meses y trimestres se agregan desde kpi_daily, no desde los hechos
+ROLLUP_PERIOD_SQL = """
+    INSERT INTO {table} (
+        region_id, period_start, days, bookings, nights_booked, total_revenue, active_properties, refreshed_at
+    )
+    SELECT region_id, period, (period + INTERVAL '{length}')::date - period,
+           bookings, nights_booked, total_revenue, %(active)s, LOCALTIMESTAMP
+    FROM (
+        SELECT region_id, date_trunc('{unit}', period_start)::date AS period,
+               sum(bookings) AS bookings, sum(nights_booked) AS nights_booked, sum(total_revenue) AS total_revenue
+        FROM kpi_daily
+        WHERE region_id = %(region_id)s
+          AND period_start >= %(first)s AND period_start < %(last)s::date + INTERVAL '{length}'
+          AND date_trunc('{unit}', period_start)::date = ANY(%(periods)s)
+        GROUP BY region_id, date_trunc('{unit}', period_start)::date
+    ) AS periods
+"""
+
+ROLLUP_STATE_SQL = """
+    INSERT INTO kpi_rollup_state (region_id, granularity, etl_batch_id, periods_refreshed, refreshed_at)
+    VALUES (%(region_id)s, %(granularity)s, %(batch_id)s, %(count)s, LOCALTIMESTAMP)
+    ON CONFLICT (region_id, granularity) DO UPDATE SET
+        etl_batch_id = EXCLUDED.etl_batch_id,
+        periods_refreshed = EXCLUDED.periods_refreshed,
+        refreshed_at = EXCLUDED.refreshed_at
+"""
+
 
 def get_db_connection() -> Optional[psycopg2.connect]:
     """Establece la conexión a la base de datos Citus Coordinator."""
@@ -40,11 +330,6 @@ def execute_sql_file(conn: psycopg2.connect, file_path: str) -> bool:
         print(f"ERROR: Archivo SQL no encontrado en la ruta: {file_path}")
         return False
     
-    cursor = conn.cursor()
-    cursor.execute("SET citus.enable_repartition_joins TO on;")
-    conn.commit()
-    print("INFO: Citus repartition joins habilitado para la sesión.")
-
     try:
         with open(file_path, 'r') as f:
             sql_script = f.read()
@@ -64,6 +349,372 @@ def execute_sql_file(conn: psycopg2.connect, file_path: str) -> bool:
         if 'cursor' in locals() and cursor:
             cursor.close()
 
+def read_watermark(cursor, region_id: int, source: str) -> Tuple[datetime, int]:
+    cursor.execute(WATERMARK_SELECT_SQL, (region_id, source))
+    row = cursor.fetchone()
+    return tuple(row) if row else _WATERMARK_START
+
+
+def load_batch(
+    conn,
+    region_id: int,
+    source: str,
+    watermark: Tuple[datetime, int],
+    until: datetime,
+    pending: Tuple[date, date] = _ALL_DATES
+) -> Tuple[int, int, Optional[Tuple[datetime, int]]]:
+    """
+    Carga un lote de cambios de `source` en la región posteriores a
+    `watermark`: upsert de los hechos de las reservas afectadas, días de
+    check_in pendientes de rollup y avance de la marca de agua, en una sola
+    transacción. Solo toca particiones de fact_booking del rango de
+    check_in `pending` (ver ensure_dates y prepare_partitions). Devuelve (cambios leídos, hechos escritos,
+    nueva marca); la marca es None si no quedaban cambios.
+    """
+    with conn.cursor() as cursor:
+        updated_at, last_id = watermark
+        cursor.execute(CHANGES_SQL[source], {
+            "region_id": region_id,
+            "updated_at": updated_at,
+            "last_id": last_id,
+            "until": until,
+            "limit": ETL_BATCH_SIZE
+        })
+        changes = cursor.fetchall()
+        if not changes:
+            conn.rollback()
+            return 0, 0, None
+
+        batch = {
+            "region_id": region_id,
+            "booking_ids": sorted({booking_id for _, _, booking_id in changes}),
+            "first": pending[0],
+            "last": pending[1]
+        }
+        cursor.execute(DIRTY_DATES_SQL, batch)
+        cursor.execute(FACTS_MOVED_SQL, batch)
+        cursor.execute(FACTS_UPSERT_SQL, dict(batch, commission=PLATFORM_COMMISSION_RATE))
+        facts = cursor.rowcount
+        cursor.execute(DIRTY_DATES_SQL, batch)
+
+        last = changes[-1][:2]
+        cursor.execute(WATERMARK_UPSERT_SQL, {
+            "region_id": region_id,
+            "source": source,
+            "updated_at": last[0],
+            "last_id": last[1],
+            "rows": facts
+        })
+    conn.commit()
+    return len(changes), facts, last
+
+
+def load_region(region_id: int, until: datetime, pending: Tuple[date, date] = _ALL_DATES) -> Dict[str, object]:
+    """
+    Carga los cambios de booking y payment de una región con su propia
+    conexión. Cada lote se confirma con su marca de agua, así que tras un
+    fallo la siguiente ejecución continúa desde el último lote confirmado;
+    el fallo queda registrado en dw_etl_watermark y no afecta a las demás
+    regiones.
+    """
+    started = time.perf_counter()
+    stats = {"region_id": region_id, "batches": 0, "changes": 0, "facts": 0, "error": None}
+    conn = get_db_connection()
+    if conn is None:
+        stats["error"] = "connection failed"
+        return stats
+
+    source = None
+    try:
+        for source in CHANGES_SQL:
+            with conn.cursor() as cursor:
+                watermark = read_watermark(cursor, region_id, source)
+            conn.rollback()
+            while True:
+                changes, facts, watermark = load_batch(conn, region_id, source, watermark, until, pending)
+                if watermark is None:
+                    break
+                stats["batches"] += 1
+                stats["changes"] += changes
+                stats["facts"] += facts
+                elapsed = time.perf_counter() - started
+                print(
+                    f"INFO: región {region_id} {source}: {changes} cambios, {facts} hechos "
+                    f"({stats['facts'] / max(elapsed, 1e-9):.0f} hechos/s, marca {watermark[0]})"
+                )
+                if changes < ETL_BATCH_SIZE:
+                    break
+    except psycopg2.Error as e:
+        conn.rollback()
+        stats["error"] = f"{source}: {e}".strip()
+        print(f"ERROR: región {region_id} falló en {source}; continuará desde su última marca. Detalle: {e}")
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(WATERMARK_FAILED_SQL, {
+                    "region_id": region_id,
+                    "source": source,
+                    "start": _WATERMARK_START[0],
+                    "error": str(e)[:1000]
+                })
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_second"] = round(stats["facts"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+def add_months(day: date, months: int) -> date:
+    """Primer día del mes que está `months` meses después (o antes) del de `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_dates(conn, regions) -> Optional[Tuple[date, date]]:
+    """
+    Amplía dim_date a los check_in de las reservas modificadas desde la
+    marca de cada región. Devuelve el rango de esos check_in y de los de
+    sus hechos ya cargados (None si no hay cambios pendientes).
+    """
+    with conn.cursor() as cursor:
+        ranges = []
+        for region_id in regions:
+            cursor.execute(PENDING_DATES_SQL, {
+                "region_id": region_id,
+                "booking": read_watermark(cursor, region_id, "booking")[0],
+                "payment": read_watermark(cursor, region_id, "payment")[0]
+            })
+            first, last = cursor.fetchone()
+            if first is not None:
+                ranges.append((first, last))
+        pending = None
+        if ranges:
+            pending = (min(first for first, _ in ranges), max(last for _, last in ranges))
+            cursor.execute(DATES_SQL, pending)
+    conn.commit()
+    return pending
+
+
+def prepare_partitions(conn, pending: Optional[Tuple[date, date]], today: date) -> None:
+    """
+    Deja fact_booking lista para la carga: crea las particiones mensuales
+    que falten para el rango pendiente y los próximos meses, y devuelve a
+    heap las columnares en las que hay que escribir (columnar no admite
+    UPDATE ni DELETE; freeze_partitions las vuelve a convertir al terminar).
+    """
+    first, last = pending or (today, today)
+    conn.rollback()
+    # DDL de Citus: cada sentencia en su propia transacción
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(PARTITIONS_CREATE_SQL, {
+                "start_from": add_months(min(first, today), 0),
+                "end_at": max(add_months(last, 1), add_months(today, FACT_PARTITIONS_AHEAD_MONTHS))
+            })
+            if pending:
+                cursor.execute(COLUMNAR_PARTITIONS_SQL, {"first": first, "last": last})
+                for (partition,) in cursor.fetchall():
+                    print(f"INFO: {partition} vuelve a heap para cargar cambios de reservas antiguas")
+                    cursor.execute(PARTITION_TO_HEAP_SQL, (partition,))
+    finally:
+        conn.autocommit = False
+
+
+def freeze_partitions(conn, today: date) -> None:
+    """Pasa a columnar las particiones de fact_booking anteriores a FACT_COLUMNAR_AFTER_MONTHS meses."""
+    older_than = add_months(today, -FACT_COLUMNAR_AFTER_MONTHS)
+    conn.rollback()
+    # El procedimiento confirma partición a partición: no admite un bloque de transacción
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(PARTITIONS_TO_COLUMNAR_SQL, (older_than,))
+        print(f"SUCCESS: Particiones de fact_booking anteriores a {older_than} en columnar.")
+    except psycopg2.Error as e:
+        print(f"WARNING: No se pudieron pasar a columnar las particiones antiguas. Detalle: {e}")
+    finally:
+        conn.autocommit = False
+
+
+def load_facts(conn, parallelism: int = ETL_PARALLELISM) -> Dict[int, Dict[str, object]]:
+    """
+    Carga incremental de fact_booking: una unidad por región en un pool de
+    `parallelism` hilos (psycopg2 libera el GIL mientras espera a la base).
+    Devuelve las estadísticas de cada región; las que fallan llevan `error`.
+    """
+    # Reloj de la base: updated_at usa su CURRENT_TIMESTAMP
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT LOCALTIMESTAMP - make_interval(secs => %s)", (ETL_WATERMARK_LAG_SECONDS,))
+        until = cursor.fetchone()[0]
+        cursor.execute("SELECT id FROM region ORDER BY id")
+        regions = [row[0] for row in cursor.fetchall()]
+    conn.rollback()
+    pending = ensure_dates(conn, regions)
+    prepare_partitions(conn, pending, until.date())
+    pending = pending or _ALL_DATES
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(regions)))) as pool:
+        results = dict(zip(regions, pool.map(lambda region_id: load_region(region_id, until, pending), regions)))
+    elapsed = time.perf_counter() - started
+
+    facts = sum(result["facts"] for result in results.values())
+    failed = [region_id for region_id, result in results.items() if result["error"]]
+    for region_id, result in results.items():
+        status = f"ERROR {result['error']}" if result["error"] else "ok"
+        print(f"INFO: región {region_id}: {result['facts']} hechos en {result.get('seconds', 0)}s - {status}")
+    print(
+        f"SUCCESS: {facts} hechos de {len(regions) - len(failed)}/{len(regions)} regiones "
+        f"en {elapsed:.2f}s ({facts / elapsed if elapsed > 0 else 0:.0f} filas/s)"
+    )
+    return results
+
+
+def period_start(day: date, granularity: str) -> date:
+    """Primer día del periodo de `granularity` ('day', 'month' o 'quarter') que contiene `day`."""
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    return day
+
+
+def refresh_region_rollups(conn, region_id: int, batch_id: Optional[int]) -> int:
+    """
+    Recalcula los rollups de la región solo para los días pendientes en
+    dw_kpi_dirty y los meses y trimestres que los contienen (borrar y
+    volver a agregar, así desaparecen los periodos que se quedan sin
+    reservas) y sella su frescura, en una sola transacción. Devuelve el
+    número de días recalculados.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(DIRTY_CLAIM_SQL, (region_id,))
+        days = sorted({row[0] for row in cursor.fetchall()})
+        counts = {granularity: 0 for granularity in KPI_ROLLUPS}
+        if days:
+            cursor.execute(ACTIVE_PROPERTIES_SQL, (region_id,))
+            active = cursor.fetchone()[0]
+            for granularity, (table, unit, length) in KPI_ROLLUPS.items():
+                periods = sorted({period_start(day, granularity) for day in days})
+                params = {
+                    "region_id": region_id,
+                    "periods": periods,
+                    "first": periods[0],
+                    "last": periods[-1],
+                    "active": active,
+                    "statuses": KPI_STATUSES
+                }
+                cursor.execute(ROLLUP_DELETE_SQL.format(table=table), params)
+                if granularity == "day":
+                    cursor.execute(ROLLUP_DAILY_SQL, params)
+                else:
+                    cursor.execute(ROLLUP_PERIOD_SQL.format(table=table, unit=unit, length=length), params)
+                counts[granularity] = len(periods)
+        for granularity, count in counts.items():
+            cursor.execute(ROLLUP_STATE_SQL, {
+                "region_id": region_id,
+                "granularity": granularity,
+                "batch_id": batch_id,
+                "count": count
+            })
+    conn.commit()
+    return len(days)
+
+
+def refresh_rollups(conn, regions: List[int], batch_id: Optional[int]) -> List[int]:
+    """
+    Actualiza los rollups de KPIs de cada región con los días que tocó la
+    carga. Una región que falla conserva sus días pendientes para la
+    siguiente ejecución; devuelve las regiones que fallaron.
+    """
+    failed = []
+    for region_id in regions:
+        try:
+            days = refresh_region_rollups(conn, region_id, batch_id)
+            print(f"INFO: rollups de KPIs de la región {region_id}: {days} días recalculados")
+        except psycopg2.Error as e:
+            conn.rollback()
+            failed.append(region_id)
+            print(f"ERROR: rollups de KPIs de la región {region_id}; quedan pendientes. Detalle: {e}")
+    return failed
+
+
+def refresh_kpi_view(conn) -> bool:
+    """
+    Refresca vm_regional_kpis con CONCURRENTLY, que no bloquea las lecturas
+    del dashboard. Si falta el índice único idx_vm_revpar_pk (o no es
+    válido), o el refresco concurrente falla, se hace el REFRESH normal,
+    que sí las bloquea mientras dura. Devuelve True si la vista se refrescó.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(KPI_VIEW_INDEX_SQL, (KPI_VIEW_UNIQUE_INDEX, KPI_VIEW))
+        row = cursor.fetchone()
+    conn.rollback()
+
+    if row and row[0]:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {KPI_VIEW}")
+            conn.commit()
+            print(f"SUCCESS: Vista materializada {KPI_VIEW} actualizada (CONCURRENTLY).")
+            return True
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"WARNING: Falló el refresco concurrente de {KPI_VIEW}; se usa REFRESH normal. Detalle: {e}")
+    else:
+        print(
+            f"WARNING: {KPI_VIEW} no tiene el índice único {KPI_VIEW_UNIQUE_INDEX}; "
+            "REFRESH normal (bloquea las lecturas mientras dura)."
+        )
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"REFRESH MATERIALIZED VIEW {KPI_VIEW}")
+        conn.commit()
+        print(f"SUCCESS: Vista materializada {KPI_VIEW} actualizada.")
+        return True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"ERROR al refrescar la vista {KPI_VIEW}. Detalle: {e}")
+        return False
+
+
+def start_batch(conn) -> Optional[int]:
+    """Registra la ejecución en dw_etl_batch y devuelve su id (None si no se pudo)."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(BATCH_START_SQL)
+            batch_id = cursor.fetchone()[0]
+        conn.commit()
+        return batch_id
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"WARNING: No se pudo registrar la ejecución en dw_etl_batch. Detalle: {e}")
+        return None
+
+
+def finish_batch(conn, batch_id: Optional[int], status: str, facts: int, failed) -> None:
+    if batch_id is None:
+        return
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(BATCH_FINISH_SQL, {
+                "batch_id": batch_id,
+                "status": status,
+                "facts": facts,
+                "failed": sorted(failed)
+            })
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"WARNING: No se pudo cerrar la ejecución {batch_id} en dw_etl_batch. Detalle: {e}")
+
+
 def run_bi_etl():
     """Ejecuta el proceso completo de Extracción, Carga y Transformación (ELT)."""
     print("\n--- INICIANDO PROCESO BI/ELT PARA HEAVENLY ---")
@@ -72,30 +723,45 @@ def run_bi_etl():
     if conn is None:
         return
 
-    # 1. Ejecutar la lógica de Carga Incremental (ELT)
-    # Esto incluye la carga de fact_booking y la población de dim_date.
+    batch_id = start_batch(conn)
+    results = {}
+
+    # 1. dim_date y carga incremental de fact_booking por región (ver load_facts)
     if execute_sql_file(conn, POPULATE_SQL):
-        
-        # 2. Refrescar la Vista Materializada (KPIs)
-        # Se ejecuta el REFRESH solo si la carga de datos fue exitosa.
-        REFRESH_KPI_SQL = "REFRESH MATERIALIZED VIEW vm_regional_kpis"
         try:
-            cursor = conn.cursor()
-            print("\n--- REFRESCANDO VISTA MATERIALIZADA (KPIs) ---")
-            
-            # Usamos CONCURRENTLY para permitir consultas mientras se actualiza la vista,
-            # pero requiere un índice único (que ya creamos).
-            cursor.execute(REFRESH_KPI_SQL) # + " CONCURRENTLY"
-            conn.commit()
-            print("SUCCESS: Vistas Materializadas actualizadas (vm_regional_kpis).")
+            results = load_facts(conn)
         except psycopg2.Error as e:
             conn.rollback()
-            print(f"ERROR al refrescar la vista. Verifique que el índice único exista. Detalle: {e}")
-        finally:
-            cursor.close()
-            
+            print(f"ERROR en la carga incremental; la próxima ejecución continúa desde la última marca. Detalle: {e}")
+
+    facts = sum(result["facts"] for result in results.values())
+    failed = {region_id for region_id, result in results.items() if result["error"]}
+    loaded = len(failed) < len(results)
+
+    # Las regiones que fallan conservan sus hechos anteriores; los KPIs se
+    # actualizan con las demás y con los lotes que sí se confirmaron
+    if loaded:
+        # 2. Rollups incrementales: solo los días que tocó la carga
+        print("\n--- ACTUALIZANDO ROLLUPS DE KPIs ---")
+        failed.update(refresh_rollups(conn, list(results), batch_id))
+
+        # 3. Refrescar la Vista Materializada (KPIs) sin bloquear lecturas
+        print("\n--- REFRESCANDO VISTA MATERIALIZADA (KPIs) ---")
+        refresh_kpi_view(conn)
+
+    # 4. Particiones antiguas de fact_booking a columnar (también las que
+    # la carga devolvió a heap)
+    if results:
+        freeze_partitions(conn, date.today())
+
+    if not loaded:
+        status = "failed"
+    else:
+        status = "partial" if failed else "ok"
+    finish_batch(conn, batch_id, status, facts, failed)
+
     conn.close()
-    print("--- PROCESO BI/ELT FINALIZADO ---")
+    print(f"--- PROCESO BI/ELT FINALIZADO ({status}) ---")
 
 # Si ejecutas este script directamente:
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
-from datetime import date, datetime, timedelta
+from datetime import date
 from decimal import Decimal
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, select
 import logging
 
 from models.booking import Booking, BookingStatus
@@ -11,70 +12,155 @@ from models.payment import Payment, PaymentStatus
 from models.user import User
 from models.enums import BookingStatus as BookingStatusEnum
 from schemas.booking import BookingCreate, BookingUpdate, BookingQuery
+from repositories.booking_repository import (
+    AsyncBookingRepository, BookingConflictError, BookingRepository, PaymentRepository
+)
+from repositories.property_repository import AsyncPropertyRepository, PropertyRepository
+from repositories.pagination import Keyset
+from repositories.shard_routing import multi_shard
+from core.single_flight import SingleFlight, flight_key
+from services.availability_calendar import CALENDAR_FORMATS, encode_calendar, free_days
+from services.availability_index import index_availability_write, index_booking_created
+from services.pricing import Pricing, calendar_prices, load_pricing, load_pricing_async, quote, with_base
 
 logger = logging.getLogger(__name__)
 
+availability_flights = SingleFlight("availability")
+
+DOUBLE_BOOKING_MESSAGE = "You already have a booking for this property on the selected dates"
+
+
+def _fits_capacity(property: Property, adults: int, children: int, infants: int, pets: int) -> bool:
+    """
+    Comprueba la capacidad de una propiedad ya cargada.
+    """
+    if adults > property.max_adults:
+        logger.warning(f"Exceeded maximum adults: {adults} > {property.max_adults}")
+        return False
+    
+    if children > property.max_children:
+        logger.warning(f"Exceeded maximum children: {children} > {property.max_children}")
+        return False
+        
+    if infants > property.max_infant:
+        logger.warning(f"Exceeded maximum infants: {infants} > {property.max_infant}")
+        return False
+        
+    if pets > property.max_pets:
+        logger.warning(f"Exceeded maximum pets: {pets} > {property.max_pets}")
+        return False
+
+    return True
+
+
+def _validate_dates(check_in: date, check_out: date) -> bool:
+    if check_in >= check_out:
+        logger.warning("Check-in date must be before check-out date")
+        return False
+
+    if check_in < date.today():
+        logger.warning("Check-in date cannot be in the past")
+        return False
+
+    return True
+
+
+def _new_booking_values(
+    booking_data: BookingCreate,
+    property: Optional[Property],
+    pricing: Optional[Pricing],
+    user_id: int
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Valida la reserva contra la propiedad ya cargada y devuelve las columnas
+    de la reserva y de su pago. La disponibilidad la garantiza la base; el
+    total sale de las reglas de precio de la propiedad (services/pricing.py).
+    """
+    if not property:
+        raise ValueError(f"Property {booking_data.property_id} not found")
+
+    if not _validate_dates(booking_data.check_in, booking_data.check_out):
+        raise ValueError("Property not available for selected dates")
+
+    if not _fits_capacity(
+        property,
+        booking_data.guest_adults,
+        booking_data.guest_children,
+        booking_data.guest_infant,
+        booking_data.guest_pets
+    ):
+        raise ValueError("Exceeds property guest capacity")
+
+    nights = (booking_data.check_out - booking_data.check_in).days
+    total_price = quote(
+        [with_base(property, pricing)],
+        booking_data.check_in,
+        booking_data.check_out,
+        adults=booking_data.guest_adults,
+        children=booking_data.guest_children,
+        pets=booking_data.guest_pets
+    )[0]["total"]
+
+    booking_values = dict(
+        check_in=booking_data.check_in,
+        check_out=booking_data.check_out,
+        guest_adults=booking_data.guest_adults,
+        guest_children=booking_data.guest_children,
+        guest_infant=booking_data.guest_infant,
+        guest_pets=booking_data.guest_pets,
+        number_nights=nights,
+        total_price=total_price,
+        status=BookingStatusEnum.PENDING,
+        user_id=user_id,
+        property_id=property.id,
+        region_id=property.region_id
+    )
+    payment_values = dict(
+        total=total_price,
+        status=PaymentStatus.PENDING,
+        currency_id=1,
+        payment_method_id=booking_data.payment_method_id,
+        region_id=property.region_id
+    )
+    return booking_values, payment_values
+
 
 class BookingService:
     def __init__(self, db: Session):
         self.db = db
+        self.bookings = BookingRepository(db)
+        self.payments = PaymentRepository(db)
+        self.properties = PropertyRepository(db)
 
     def is_property_available(
         self, 
         property_id: int, 
         check_in: date, 
         check_out: date,
-        exclude_booking_id: Optional[int] = None
+        exclude_booking_id: Optional[int] = None,
+        region_id: Optional[int] = None
     ) -> bool:
         """
         Verifica si una propiedad está disponible para las fechas solicitadas.
         """
         try:
-            property = self.db.query(Property).filter(
-                Property.id == property_id,
-                Property.is_active == True
-            ).first()
+            property = self.properties.get(property_id, region_id, active_only=True)
             
             if not property:
                 logger.warning(f"Property {property_id} not found or inactive")
                 return False
 
-            if check_in >= check_out:
-                logger.warning("Check-in date must be before check-out date")
-                return False
-
-            if check_in < date.today():
-                logger.warning("Check-in date cannot be in the past")
+            if not _validate_dates(check_in, check_out):
                 return False
 
-            query = self.db.query(Booking).filter(
-                Booking.property_id == property_id,
-                Booking.status.in_([BookingStatusEnum.CONFIRMED, BookingStatusEnum.PENDING]),
-                or_(
-                    and_(
-                        Booking.check_in <= check_in,
-                        Booking.check_out > check_in
-                    ),
-                    and_(
-                        Booking.check_in < check_out,
-                        Booking.check_out >= check_out
-                    ),
-                    and_(
-                        Booking.check_in >= check_in,
-                        Booking.check_out <= check_out
-                    ),
-                    and_(
-                        Booking.check_in <= check_in,
-                        Booking.check_out >= check_out
-                    )
-                )
+            overlapping_bookings = self.bookings.count_overlapping(
+                property_id,
+                property.region_id,
+                check_in,
+                check_out,
+                exclude_booking_id=exclude_booking_id
             )
 
-            if exclude_booking_id:
-                query = query.filter(Booking.id != exclude_booking_id)
-
-            overlapping_bookings = query.count()
-
             if overlapping_bookings > 0:
                 logger.info(f"Property {property_id} has {overlapping_bookings} overlapping bookings")
                 return False
@@ -91,33 +177,18 @@ class BookingService:
         adults: int, 
         children: int, 
         infants: int, 
-        pets: int
+        pets: int,
+        region_id: Optional[int] = None
     ) -> bool:
         """
         Valida que el número de huéspedes no exceda la capacidad de la propiedad.
         """
-        property = self.db.query(Property).filter(Property.id == property_id).first()
+        property = self.properties.get(property_id, region_id)
         
         if not property:
             return False
 
-        if adults > property.max_adults:
-            logger.warning(f"Exceeded maximum adults: {adults} > {property.max_adults}")
-            return False
-        
-        if children > property.max_children:
-            logger.warning(f"Exceeded maximum children: {children} > {property.max_children}")
-            return False
-            
-        if infants > property.max_infant:
-            logger.warning(f"Exceeded maximum infants: {infants} > {property.max_infant}")
-            return False
-            
-        if pets > property.max_pets:
-            logger.warning(f"Exceeded maximum pets: {pets} > {property.max_pets}")
-            return False
-
-        return True
+        return _fits_capacity(property, adults, children, infants, pets)
 
     def calculate_total_price(
         self, 
@@ -127,12 +198,13 @@ class BookingService:
         adults: int = 1,
         children: int = 0,
         infants: int = 0,
-        pets: int = 0
+        pets: int = 0,
+        region_id: Optional[int] = None
     ) -> Decimal:
         """
         Calcula el precio total de la reserva.
         """
-        property = self.db.query(Property).filter(Property.id == property_id).first()
+        property = self.properties.get(property_id, region_id)
         
         if not property:
             raise ValueError(f"Property {property_id} not found")
@@ -141,102 +213,63 @@ class BookingService:
         if nights <= 0:
             raise ValueError("Check-out date must be after check-in date")
 
-        base_price = property.price_night * nights
-
-        
+        return quote(
+            [self._pricing(property)], check_in, check_out, adults=adults, children=children, pets=pets
+        )[0]["total"]
 
-        return base_price
+    def _pricing(self, property: Optional[Property]) -> Optional[Pricing]:
+        if property is None:
+            return None
+        return with_base(property, load_pricing(self.db, [(property.id, property.region_id)]).get(property.id))
 
     def create_booking(self, booking_data: BookingCreate, user_id: int) -> Booking:
         """
-        Crea una nueva reserva.
+        Crea una nueva reserva: una lectura de la propiedad y un único INSERT
+        (reserva + pago). La restricción excl_booking_overlap impide la doble
+        reserva aunque lleguen peticiones concurrentes.
         """
-        try:
-            if not self.is_property_available(
-                booking_data.property_id, 
-                booking_data.check_in, 
-                booking_data.check_out
-            ):
-                raise ValueError("Property not available for selected dates")
-
-            if not self.validate_guest_capacity(
-                booking_data.property_id,
-                booking_data.guest_adults,
-                booking_data.guest_children,
-                booking_data.guest_infant,
-                booking_data.guest_pets
-            ):
-                raise ValueError("Exceeds property guest capacity")
-
-            total_price = self.calculate_total_price(
-                booking_data.property_id,
-                booking_data.check_in,
-                booking_data.check_out,
-                booking_data.guest_adults,
-                booking_data.guest_children,
-                booking_data.guest_infant,
-                booking_data.guest_pets
-            )
-
-            property = self.db.query(Property).filter(Property.id == booking_data.property_id).first()
-            if not property:
-                raise ValueError(f"Property {booking_data.property_id} not found")
-
-            nights = (booking_data.check_out - booking_data.check_in).days
-            
-            booking = Booking(
-                check_in=booking_data.check_in,
-                check_out=booking_data.check_out,
-                guest_adults=booking_data.guest_adults,
-                guest_children=booking_data.guest_children,
-                guest_infant=booking_data.guest_infant,
-                guest_pets=booking_data.guest_pets,
-                number_nights=nights,
-                total_price=total_price,
-                status=BookingStatusEnum.PENDING,
-                user_id=user_id,
-                property_id=booking_data.property_id,
-                region_id=property.region_id  
-            )
-
-            self.db.add(booking)
-            self.db.flush() 
-            payment = Payment(
-                total=total_price,
-                status=PaymentStatus.PENDING,
-                booking_id=booking.id,
-                currency_id=1,  
-                payment_method_id=booking_data.payment_method_id,
-                region_id=property.region_id
-            )
+        property = self.properties.get(
+            booking_data.property_id, booking_data.region_id, active_only=True
+        )
+        booking_values, payment_values = _new_booking_values(
+            booking_data, property, self._pricing(property), user_id
+        )
 
-            self.db.add(payment)
+        try:
+            booking = self.bookings.create_with_payment(booking_values, payment_values)
+            # RETURNING ya trajo todas las columnas: se desvincula para que el
+            # commit no la expire y no haga falta un refresh
+            self.db.expunge(booking)
             self.db.commit()
-            self.db.refresh(booking)
-
-            logger.info(f"Booking {booking.id} created successfully for user {user_id}")
-            return booking
-
+        except BookingConflictError:
+            self.db.rollback()
+            if self.check_double_booking(
+                user_id, property.id, booking_data.check_in, booking_data.check_out,
+                region_id=property.region_id
+            ):
+                raise BookingConflictError(DOUBLE_BOOKING_MESSAGE)
+            raise
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error creating booking: {str(e)}")
             raise
 
+        index_booking_created(booking.property_id, booking.check_in, booking.check_out)
+        logger.info(f"Booking {booking.id} created successfully for user {user_id}")
+        return booking
+
     def update_booking_status(
         self, 
         booking_id: int, 
         status: BookingStatusEnum,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        region_id: Optional[int] = None
     ) -> Booking:
         """
-        Actualiza el estado de una reserva.
+        Actualiza el estado de una reserva. Si al reactivar una reserva
+        cancelada se solapa con otra activa, lanza BookingConflictError (409).
         """
-        query = self.db.query(Booking).filter(Booking.id == booking_id)
-        
-        if user_id:
-            query = query.filter(Booking.user_id == user_id)
-        
-        booking = query.first()
+        booking = self.bookings.get(booking_id, region_id, user_id)
         
         if not booking:
             raise ValueError(f"Booking {booking_id} not found")
@@ -245,11 +278,14 @@ class BookingService:
             if booking.check_in <= date.today():
                 raise ValueError("Cannot cancel booking that has already started")
         
-        booking.status = status
-        booking.updated_at = datetime.now()
-        
-        self.db.commit()
+        try:
+            self.bookings.set_status(booking, status)
+            self.db.commit()
+        except BookingConflictError:
+            self.db.rollback()
+            raise
         self.db.refresh(booking)
+        index_availability_write(self.db, booking.property_id, booking.region_id)
         
         return booking
 
@@ -258,83 +294,96 @@ class BookingService:
         user_id: int,
         status: Optional[BookingStatusEnum] = None,
         limit: int = 100,
-        offset: int = 0
-    ) -> List[Booking]:
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Booking], Optional[str]]:
         """
-        Obtiene todas las reservas de un usuario.
+        Obtiene las reservas de un usuario, paginadas por cursor.
+        Las reservas se distribuyen por la región de la propiedad, por lo que
+        esta consulta es multi-shard por diseño.
         """
-        query = self.db.query(Booking).filter(Booking.user_id == user_id)
+        query = multi_shard(select(Booking).where(Booking.user_id == user_id))
         
         if status:
-            query = query.filter(Booking.status == status)
+            query = query.where(Booking.status == status)
         
-        query = query.order_by(Booking.created_at.desc())
-        query = query.offset(offset).limit(limit)
+        keyset = Keyset("created_at:desc", Booking.created_at, Booking)
+        rows = self.db.execute(keyset.apply(query, cursor, limit)).all()
         
-        return query.all()
+        return keyset.page(rows, limit)
 
     def get_property_bookings(
         self, 
         property_id: int,
         start_date: Optional[date] = None,
-        end_date: Optional[date] = None
+        end_date: Optional[date] = None,
+        region_id: Optional[int] = None
     ) -> List[Booking]:
         """
         Obtiene todas las reservas de una propiedad en un rango de fechas.
         """
-        query = self.db.query(Booking).filter(
-            Booking.property_id == property_id,
-            Booking.status.in_([BookingStatusEnum.CONFIRMED, BookingStatusEnum.PENDING])
-        )
-        
-        if start_date:
-            query = query.filter(Booking.check_out >= start_date)
-        
-        if end_date:
-            query = query.filter(Booking.check_in <= end_date)
-        
-        return query.order_by(Booking.check_in).all()
+        region_id = self.properties.regions.for_property(property_id, region_id)
+        if region_id is None:
+            return []
+
+        return self.bookings.list_for_property(property_id, region_id, start_date, end_date)
 
-    def get_booking_by_id(self, booking_id: int, user_id: Optional[int] = None) -> Optional[Booking]:
+    def get_booking_by_id(
+        self,
+        booking_id: int,
+        user_id: Optional[int] = None,
+        region_id: Optional[int] = None
+    ) -> Optional[Booking]:
         """
         Obtiene una reserva por ID, con opción de verificar propiedad.
         """
-        query = self.db.query(Booking).filter(Booking.id == booking_id)
-        
-        if user_id:
-            query = query.filter(Booking.user_id == user_id)
-        
-        return query.first()
+        return self.bookings.get(booking_id, region_id, user_id)
 
     def get_property_availability(
         self, 
         property_id: int,
         start_date: date,
-        end_date: date
-    ) -> List[Dict[str, Any]]:
-        
-        bookings = self.get_property_bookings(property_id, start_date, end_date)
-        
-        availability = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            is_available = True
-            
-            for booking in bookings:
-                if booking.check_in <= current_date < booking.check_out:
-                    is_available = False
-                    break
-            
-            availability.append({
-                "date": current_date,
-                "available": is_available,
-                "price": None  
-            })
-            
-            current_date += timedelta(days=1)
-        
-        return availability
+        end_date: date,
+        region_id: Optional[int] = None,
+        calendar_format: str = "days"
+    ) -> Any:
+        """
+        Calendario de disponibilidad de [start_date, end_date] en el formato
+        pedido (ver services.availability_calendar): por día, por rangos o
+        bitmap, con el precio de cada noche libre.
+        """
+        if calendar_format not in CALENDAR_FORMATS:
+            raise ValueError(f"Unknown calendar format: {calendar_format}")
+
+        # Peticiones concurrentes sobre el mismo rango comparten la consulta;
+        # cada una codifica después el bitmap en su formato
+        free = availability_flights.do(
+            flight_key(property_id, start_date, end_date, region_id=region_id),
+            self._free_days, property_id, start_date, end_date, region_id
+        )
+        return encode_calendar(
+            property_id, start_date, end_date, free, calendar_format,
+            self._calendar_prices(property_id, region_id, start_date, free)
+        )
+
+    def _calendar_prices(self, property_id: int, region_id: Optional[int], start_date: date, free):
+        region_id = self.properties.regions.for_property(property_id, region_id)
+        if region_id is None:
+            return None
+        pricing = load_pricing(self.db, [(property_id, region_id)]).get(property_id)
+        return calendar_prices(pricing, start_date, free) if pricing else None
+
+    def _free_days(
+        self,
+        property_id: int,
+        start_date: date,
+        end_date: date,
+        region_id: Optional[int]
+    ):
+        region_id = self.properties.regions.for_property(property_id, region_id)
+        stays = [] if region_id is None else self.bookings.stays_for_property(
+            property_id, region_id, start_date, end_date
+        )
+        return free_days(start_date, end_date, stays)
 
     def check_double_booking(
         self,
@@ -342,26 +391,150 @@ class BookingService:
         property_id: int,
         check_in: date,
         check_out: date,
-        exclude_booking_id: Optional[int] = None
+        exclude_booking_id: Optional[int] = None,
+        region_id: Optional[int] = None
     ) -> bool:
        
-        query = self.db.query(Booking).filter(
-            Booking.user_id == user_id,
-            Booking.property_id == property_id,
-            Booking.status.in_([BookingStatusEnum.CONFIRMED, BookingStatusEnum.PENDING]),
-            or_(
-                and_(
-                    Booking.check_in <= check_in,
-                    Booking.check_out > check_in
-                ),
-                and_(
-                    Booking.check_in < check_out,
-                    Booking.check_out >= check_out
-                )
-            )
+        region_id = self.properties.regions.for_property(property_id, region_id)
+        if region_id is None:
+            return False
+
+        return self.bookings.count_overlapping(
+            property_id,
+            region_id,
+            check_in,
+            check_out,
+            user_id=user_id,
+            exclude_booking_id=exclude_booking_id
+        ) > 0
+
+
+class AsyncBookingService:
+    """
+    Ruta asíncrona (asyncpg) de la creación de reservas.
+    Misma lógica que BookingService, pero sin ocupar un hilo mientras espera a Postgres.
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.bookings = AsyncBookingRepository(db)
+        self.properties = AsyncPropertyRepository(db)
+
+    async def is_property_available(
+        self,
+        property_id: int,
+        check_in: date,
+        check_out: date,
+        exclude_booking_id: Optional[int] = None,
+        region_id: Optional[int] = None
+    ) -> bool:
+        """
+        Verifica si una propiedad está disponible para las fechas solicitadas.
+        """
+        property = await self.properties.get(property_id, region_id, active_only=True)
+
+        if not property:
+            logger.warning(f"Property {property_id} not found or inactive")
+            return False
+
+        if not _validate_dates(check_in, check_out):
+            return False
+
+        overlapping_bookings = await self.bookings.count_overlapping(
+            property_id,
+            property.region_id,
+            check_in,
+            check_out,
+            exclude_booking_id=exclude_booking_id
         )
-        
-        if exclude_booking_id:
-            query = query.filter(Booking.id != exclude_booking_id)
-        
-        return query.count() > 0
\ No newline at end of file
+
+        if overlapping_bookings > 0:
+            logger.info(f"Property {property_id} has {overlapping_bookings} overlapping bookings")
+            return False
+
+        return True
+
+    async def check_double_booking(
+        self,
+        user_id: int,
+        property_id: int,
+        check_in: date,
+        check_out: date,
+        exclude_booking_id: Optional[int] = None,
+        region_id: Optional[int] = None
+    ) -> bool:
+        region_id = await self.properties.regions.for_property(property_id, region_id)
+        if region_id is None:
+            return False
+
+        return await self.bookings.count_overlapping(
+            property_id,
+            region_id,
+            check_in,
+            check_out,
+            user_id=user_id,
+            exclude_booking_id=exclude_booking_id
+        ) > 0
+
+    async def create_booking(self, booking_data: BookingCreate, user_id: int) -> Booking:
+        """
+        Crea una nueva reserva (ver BookingService.create_booking).
+        """
+        property = await self.properties.get(
+            booking_data.property_id, booking_data.region_id, active_only=True
+        )
+        pricing = None
+        if property is not None:
+            found = await load_pricing_async(self.db, [(property.id, property.region_id)])
+            pricing = with_base(property, found.get(property.id))
+        booking_values, payment_values = _new_booking_values(booking_data, property, pricing, user_id)
+
+        try:
+            booking = await self.bookings.create_with_payment(booking_values, payment_values)
+            await self.db.commit()
+        except BookingConflictError:
+            await self.db.rollback()
+            if await self.check_double_booking(
+                user_id, property.id, booking_data.check_in, booking_data.check_out,
+                region_id=property.region_id
+            ):
+                raise BookingConflictError(DOUBLE_BOOKING_MESSAGE)
+            raise
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error creating booking: {str(e)}")
+            raise
+
+        index_booking_created(booking.property_id, booking.check_in, booking.check_out)
+        logger.info(f"Booking {booking.id} created successfully for user {user_id}")
+        return booking
+
+    async def update_booking_status(
+        self,
+        booking_id: int,
+        status: BookingStatusEnum,
+        user_id: Optional[int] = None,
+        region_id: Optional[int] = None
+    ) -> Booking:
+        """
+        Actualiza el estado de una reserva (ver BookingService.update_booking_status).
+        """
+        booking = await self.bookings.get(booking_id, region_id, user_id)
+
+        if not booking:
+            raise ValueError(f"Booking {booking_id} not found")
+
+        if status == BookingStatusEnum.CANCELED:
+            if booking.check_in <= date.today():
+                raise ValueError("Cannot cancel booking that has already started")
+
+        try:
+            await self.bookings.set_status(booking, status)
+            await self.db.commit()
+        except BookingConflictError:
+            await self.db.rollback()
+            raise
+
+        await self.db.refresh(booking)
+        await self.db.run_sync(index_availability_write, booking.property_id, booking.region_id)
+
+        return booking
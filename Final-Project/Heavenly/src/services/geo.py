@@ -0,0 +1,102 @@
+"""
+Geometry helpers for map search: query parsing, great-circle distance and
+the fixed lat/lon grid used to bucket listings and to cluster map pins.
+
+Boxes are (min_lon, min_lat, max_lon, max_lat), the GeoJSON order; points
+are (lat, lon) as in `near=lat,lon`. Boxes crossing the antimeridian are
+not supported (every region we serve is far from it).
+"""
+import math
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_RADIUS_KM = 500.0
+
+
+class BBox(NamedTuple):
+    min_lon: float
+    min_lat: float
+    max_lon: float
+    max_lat: float
+
+
+def _floats(text: str, count: int, name: str) -> Tuple[float, ...]:
+    try:
+        values = tuple(float(part) for part in text.split(","))
+    except ValueError:
+        raise ValueError(f"{name} must be {count} comma-separated numbers")
+    if len(values) != count or not all(math.isfinite(value) for value in values):
+        raise ValueError(f"{name} must be {count} comma-separated numbers")
+    return values
+
+
+def parse_bbox(text: str) -> BBox:
+    """`min_lon,min_lat,max_lon,max_lat` -> BBox (ValueError if malformed)."""
+    box = BBox(*_floats(text, 4, "bbox"))
+    if not (-180 <= box.min_lon <= box.max_lon <= 180 and -90 <= box.min_lat <= box.max_lat <= 90):
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat within WGS84 bounds")
+    return box
+
+
+def parse_point(text: str) -> Tuple[float, float]:
+    """`lat,lon` -> (lat, lon)."""
+    lat, lon = _floats(text, 2, "near")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("near must be lat,lon within WGS84 bounds")
+    return lat, lon
+
+
+def circle_bbox(lat: float, lon: float, radius_km: float) -> BBox:
+    """Smallest box containing the circle (clamped at the poles and the antimeridian)."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return BBox(max(lon - dlon, -180.0), max(lat - dlat, -90.0), min(lon + dlon, 180.0), min(lat + dlat, 90.0))
+
+
+def search_area(
+    bbox: Optional[BBox] = None,
+    near: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None
+) -> Optional[BBox]:
+    """Box every result must fall in (intersection of bbox and the near circle's box)."""
+    box = bbox
+    if near is not None:
+        circle = circle_bbox(near[0], near[1], radius_km)
+        if box is None:
+            return circle
+        box = BBox(
+            max(box.min_lon, circle.min_lon), max(box.min_lat, circle.min_lat),
+            min(box.max_lon, circle.max_lon), min(box.max_lat, circle.max_lat)
+        )
+    return box
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from (lat, lon) to each of lats/lons (scalars or arrays)."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def cluster_degrees(box: BBox, grid: int) -> float:
+    """
+    Cell size giving about `grid` cells along the box's longer side, snapped
+    to 360 / 2^k so that nearby zoom levels and pans share the same cells.
+    """
+    span = max(box.max_lon - box.min_lon, box.max_lat - box.min_lat, 1e-6)
+    level = min(max(math.floor(math.log2(360 * grid / span)), 0), 30)
+    return 360 / 2 ** level
+
+
+def sql_distance_km(latitude_column, longitude_column, lat: float, lon: float):
+    """Haversine distance as a SQL expression (same formula as haversine_km)."""
+    half_dlat = func.radians(latitude_column - lat) / 2
+    half_dlon = func.radians(longitude_column - lon) / 2
+    a = func.power(func.sin(half_dlat), 2) \
+        + math.cos(math.radians(lat)) * func.cos(func.radians(latitude_column)) * func.power(func.sin(half_dlon), 2)
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0)))
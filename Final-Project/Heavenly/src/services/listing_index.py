@@ -0,0 +1,564 @@
+"""
+In-process columnar index of active properties for the discovery filter path.
+
+Price, capacity, type, city and region filters, amenity bitsets and the
+per-night availability bitmap (see services/availability_index.py) are
+evaluated with NumPy over the whole catalogue; the matching page of
+(id, region_id) pairs is then hydrated with a single batched query.
+Ordering and cursors match the SQL keyset path, so a client can page
+through results while requests switch between the two paths.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.property import Property
+from repositories.pagination import decode_cursor, encode_cursor
+from repositories.shard_routing import multi_shard
+from services.geo import BBox, haversine_km, search_area
+
+logger = logging.getLogger(__name__)
+
+# Columns loaded for every listing (in this order)
+_COLUMNS = (
+    Property.id, Property.region_id, Property.price_night, Property.property_type_id,
+    Property.city_id, Property.max_adults, Property.max_children, Property.max_infant,
+    Property.max_pets, Property.created_at, Property.is_active, Property.updated_at,
+    Property.amenity_ids, Property.latitude, Property.longitude
+)
+_ARRAYS = (
+    "ids", "region_ids", "price_cents", "property_type_ids", "city_ids", "max_adults",
+    "max_children", "max_infant", "max_pets", "created_at", "active", "amenity_bits", "nights",
+    "latitude", "longitude"
+)
+_EPOCH = datetime(1970, 1, 1)
+_NO_CREATED_AT = np.iinfo(np.int64).min
+
+# One bit per night (bit i = night of origin + i days), ~2 years ahead
+NIGHTS_HORIZON_DAYS = 736
+NIGHTS_BYTES = NIGHTS_HORIZON_DAYS // 8
+# Rows unpacked at a time by the flexible-dates search
+_FLEXIBLE_CHUNK = 65536
+
+# Map search buckets: fixed 0.05 degree cells (~5.5 km of latitude), numbered row-major
+GRID_DEGREES = 0.05
+_GRID_COLUMNS = int(round(360 / GRID_DEGREES))
+# Boxes spanning more grid rows than this are answered with a plain scan
+_GRID_MAX_ROWS = 400
+
+
+def _cents(price) -> int:
+    return int((Decimal(price) * 100).to_integral_value())
+
+
+def _grid_row(lat):
+    return np.floor((np.asarray(lat) + 90) / GRID_DEGREES).astype(np.int64)
+
+
+def _grid_column(lon):
+    return np.minimum(np.floor((np.asarray(lon) + 180) / GRID_DEGREES).astype(np.int64), _GRID_COLUMNS - 1)
+
+
+def _ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(lo[i], hi[i]) without a Python loop."""
+    lengths = hi - lo
+    keep = lengths > 0
+    lo, lengths = lo[keep], lengths[keep]
+    if not len(lo):
+        return np.empty(0, dtype=np.int64)
+    shifts = lo - np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.repeat(shifts, lengths) + np.arange(lengths.sum())
+
+
+def _micros(moment: Optional[datetime]) -> int:
+    if moment is None:
+        return _NO_CREATED_AT
+    delta = moment.replace(tzinfo=None) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class ListingIndex:
+    """
+    Struct-of-arrays over one slot per property. Deleted (inactive)
+    properties keep their slot with `active=False`; slots are reused only
+    on a full rebuild.
+
+    Map searches first narrow the slots with a grid: located slots sorted by
+    cell, so each row of cells a box covers is one searchsorted range.
+    Writes do not re-sort it; written slots are kept aside in `_geo_pending`
+    and checked on every map search until enough pile up for a rebuild.
+    Candidates are always re-checked against the exact coordinates.
+    """
+
+    SORT_KEYS = ("price", "created_at")
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._slots: Dict[int, int] = {}
+        self._size = 0
+        self._amenity_words = 1
+        self._allocate(capacity)
+        self.ready = False
+        self.watermark: Optional[datetime] = None
+        self.built_at: Optional[float] = None
+        self.nights_origin: Optional[date] = None
+        self._grid_cells: Optional[np.ndarray] = None
+        self._grid_slots: Optional[np.ndarray] = None
+        self._geo_pending: set = set()
+
+    def _allocate(self, capacity: int) -> None:
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.region_ids = np.zeros(capacity, dtype=np.int32)
+        self.price_cents = np.zeros(capacity, dtype=np.int64)
+        self.property_type_ids = np.zeros(capacity, dtype=np.int32)
+        self.city_ids = np.zeros(capacity, dtype=np.int32)
+        self.max_adults = np.zeros(capacity, dtype=np.int32)
+        self.max_children = np.zeros(capacity, dtype=np.int32)
+        self.max_infant = np.zeros(capacity, dtype=np.int32)
+        self.max_pets = np.zeros(capacity, dtype=np.int32)
+        self.created_at = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.amenity_bits = np.zeros((capacity, self._amenity_words), dtype=np.uint64)
+        self.nights = np.zeros((capacity, NIGHTS_BYTES), dtype=np.uint8)
+        self.latitude = np.full(capacity, np.nan)
+        self.longitude = np.full(capacity, np.nan)
+
+    def _grow(self, capacity: int) -> None:
+        old = {name: getattr(self, name) for name in _ARRAYS}
+        self._allocate(capacity)
+        for name, values in old.items():
+            getattr(self, name)[:len(values)] = values
+
+    def _ensure_amenity_words(self, amenity_id: int) -> None:
+        words = amenity_id // 64 + 1
+        if words > self._amenity_words:
+            bits = np.zeros((len(self.ids), words), dtype=np.uint64)
+            bits[:, :self._amenity_words] = self.amenity_bits
+            self.amenity_bits = bits
+            self._amenity_words = words
+
+    def __len__(self) -> int:
+        return int(self.active[:self._size].sum())
+
+    # ------------------------------------------------------------------ writes
+
+    def _upsert_row(self, row, amenity_ids: Optional[Iterable[int]]) -> None:
+        (property_id, region_id, price, type_id, city_id, adults, children,
+         infants, pets, created_at, is_active) = row[:11]
+        slot = self._slots.get(property_id)
+        if slot is None:
+            if self._size == len(self.ids):
+                self._grow(len(self.ids) * 2)
+            slot = self._size
+            self._size += 1
+            self._slots[property_id] = slot
+        self.ids[slot] = property_id
+        self.region_ids[slot] = region_id
+        self.price_cents[slot] = _cents(price)
+        self.property_type_ids[slot] = type_id
+        self.city_ids[slot] = city_id
+        self.max_adults[slot] = adults
+        self.max_children[slot] = children
+        self.max_infant[slot] = infants
+        self.max_pets[slot] = pets
+        self.created_at[slot] = _micros(created_at)
+        self.active[slot] = bool(is_active)
+        latitude, longitude = row[13], row[14]
+        self.latitude[slot] = np.nan if latitude is None else latitude
+        self.longitude[slot] = np.nan if longitude is None else longitude
+        self._geo_pending.add(slot)
+        if amenity_ids is not None:
+            self.amenity_bits[slot] = 0
+            for amenity_id in amenity_ids:
+                self._set_amenity(slot, amenity_id)
+
+    def _set_amenity(self, slot: int, amenity_id: int) -> None:
+        self._ensure_amenity_words(amenity_id)
+        self.amenity_bits[slot, amenity_id // 64] |= np.uint64(1 << (amenity_id % 64))
+
+    def upsert(self, prop: Property, amenity_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Insert or refresh one property. `amenity_ids=None` takes them from
+        the property's amenity_ids column.
+        """
+        row = tuple(getattr(prop, column.key) for column in _COLUMNS)
+        with self._lock:
+            self._upsert_row(row, amenity_ids if amenity_ids is not None else row[12])
+
+    def remove(self, property_id: int) -> None:
+        with self._lock:
+            slot = self._slots.get(property_id)
+            if slot is not None:
+                self.active[slot] = False
+
+    def set_nights(self, rows: Dict[int, np.ndarray], origin: date, full: bool = False) -> None:
+        """
+        Replace the availability bitmap of the given properties. With `full`
+        every other property becomes unavailable and `origin` is rebased.
+        """
+        with self._lock:
+            if full:
+                self.nights = np.zeros((len(self.ids), NIGHTS_BYTES), dtype=np.uint8)
+                self.nights_origin = origin
+            elif origin != self.nights_origin:
+                return  # Computed against an older origin; the next full load covers it
+            for property_id, row in rows.items():
+                slot = self._slots.get(property_id)
+                if slot is not None:
+                    self.nights[slot] = row
+
+    def clear_nights(self, property_id: int, start: date, end: date) -> None:
+        """
+        Mark nights [start, end) as taken (a new booking).
+        """
+        with self._lock:
+            slot = self._slots.get(property_id)
+            span = self._night_span(start, end)
+            if slot is None or span is None:
+                return
+            lo, hi, mask = span
+            self.nights[slot, lo:hi] &= ~mask
+
+    # ------------------------------------------------------------------- loads
+
+    def load(self, db: Session, since: Optional[datetime] = None, batch_size: int = 10000) -> int:
+        """
+        Load every property (or those updated since `since`) with its amenity_ids.
+        Used for the startup build and for the periodic catch-up of writes made
+        by other workers. Returns the number of properties loaded.
+
+        updated_at is the start time of the writing transaction, so one that
+        commits after a catch-up can carry a timestamp below the watermark:
+        the catch-up also reloads the last `listing_index_catch_up_lag_seconds`.
+        """
+        query = multi_shard(select(*_COLUMNS))
+        if since is not None:
+            lag = timedelta(seconds=settings.listing_index_catch_up_lag_seconds)
+            query = query.where(Property.updated_at >= since - lag)
+
+        loaded = 0
+        watermark = self.watermark
+        rows_by_id = {}
+        for row in db.execute(query.execution_options(yield_per=batch_size)):
+            rows_by_id[row[0]] = row
+            if row[11] is not None and (watermark is None or row[11] > watermark):
+                watermark = row[11]
+            if len(rows_by_id) >= batch_size:
+                loaded += self._load_batch(rows_by_id, full=since is None)
+                rows_by_id = {}
+        if rows_by_id:
+            loaded += self._load_batch(rows_by_id, full=since is None)
+
+        self.watermark = watermark
+        self.ready = True
+        return loaded
+
+    def _load_batch(self, rows_by_id: dict, full: bool) -> int:
+        with self._lock:
+            if full and self._size + len(rows_by_id) > len(self.ids):
+                self._grow(max(len(self.ids) * 2, self._size + len(rows_by_id)))
+            for row in rows_by_id.values():
+                self._upsert_row(row, row[12])
+        return len(rows_by_id)
+
+    def rebuild(self, db: Session) -> int:
+        fresh = ListingIndex()
+        loaded = fresh.load(db)
+        with self._lock:
+            self.__dict__.update({k: v for k, v in fresh.__dict__.items() if k != "_lock"})
+            self.built_at = time.time()
+        return loaded
+
+    # ------------------------------------------------------------------ search
+
+    def _night_span(self, start: date, end: date) -> Optional[Tuple[int, int, np.ndarray]]:
+        """
+        Byte range and mask covering nights [start, end), or None if outside the horizon.
+        """
+        if self.nights_origin is None:
+            return None
+        first = (start - self.nights_origin).days
+        last = (end - self.nights_origin).days
+        if first < 0 or last > NIGHTS_HORIZON_DAYS or first >= last:
+            return None
+        lo, hi = first // 8, (last + 7) // 8
+        wanted = np.zeros((hi - lo) * 8, dtype=bool)
+        wanted[first - lo * 8:last - lo * 8] = True
+        return lo, hi, np.packbits(wanted, bitorder="little")
+
+    def can_serve(self, sort_by: str, check_in=None, check_out=None, **_) -> bool:
+        """
+        Rating order, and date windows outside the bitmap horizon, still need the database.
+        """
+        if not self.ready or sort_by not in self.SORT_KEYS:
+            return False
+        if check_in and check_out:
+            return self._night_span(check_in, check_out) is not None
+        return True
+
+    def _free_runs(
+        self,
+        sel,
+        mask: np.ndarray,
+        check_in: date,
+        check_out: date,
+        nights: int
+    ) -> np.ndarray:
+        """
+        Candidates with at least `nights` consecutive free nights inside [check_in, check_out)
+        """
+        result = np.zeros_like(mask)
+        lo, hi, _ = self._night_span(check_in, check_out)
+        first = (check_in - self.nights_origin).days - lo * 8
+        last = (check_out - self.nights_origin).days - lo * 8
+        if last - first < nights:
+            return result
+        candidates = np.flatnonzero(mask)
+        for start in range(0, len(candidates), _FLEXIBLE_CHUNK):
+            positions = candidates[start:start + _FLEXIBLE_CHUNK]
+            rows = _slots(sel, positions)
+            free = np.unpackbits(self.nights[rows, lo:hi], axis=1, bitorder="little")[:, first:last]
+            # busy[i] = taken nights before i; a window is free when its difference is 0
+            busy = np.zeros((len(rows), free.shape[1] + 1), dtype=np.int16)
+            np.cumsum(1 - free, axis=1, out=busy[:, 1:])
+            result[positions[((busy[:, nights:] - busy[:, :-nights]) == 0).any(axis=1)]] = True
+        return result
+
+    def _build_grid(self, n: int) -> None:
+        located = np.flatnonzero(self.active[:n] & ~np.isnan(self.latitude[:n]))
+        cells = _grid_row(self.latitude[located]) * _GRID_COLUMNS + _grid_column(self.longitude[located])
+        order = np.argsort(cells, kind="stable")
+        self._grid_cells, self._grid_slots = cells[order], located[order]
+        self._geo_pending = set()
+
+    def _area_slots(self, n: int, box: BBox):
+        """
+        Slots that may lie inside `box` (a superset), in slot order; or a
+        slice over every slot when the box is too large for the grid to help.
+        """
+        first_row, last_row = int(_grid_row(box.min_lat)), int(_grid_row(box.max_lat))
+        if last_row - first_row >= _GRID_MAX_ROWS:
+            return slice(0, n)
+        if self._grid_cells is None or len(self._geo_pending) > max(1024, n // 64):
+            self._build_grid(n)
+        rows = np.arange(first_row, last_row + 1, dtype=np.int64) * _GRID_COLUMNS
+        lo = np.searchsorted(self._grid_cells, rows + int(_grid_column(box.min_lon)), side="left")
+        hi = np.searchsorted(self._grid_cells, rows + int(_grid_column(box.max_lon)), side="right")
+        found = self._grid_slots[_ranges(lo, hi)]
+        if self._geo_pending:
+            pending = np.fromiter(self._geo_pending, dtype=np.int64, count=len(self._geo_pending))
+            return np.union1d(found, pending[pending < n])
+        return np.sort(found)
+
+    def _selection(self, n: int, bbox=None, near=None, radius=None, **_):
+        """Slots a search has to look at: all of them, or the grid's pick for a map area."""
+        box = search_area(bbox, near, radius)
+        return slice(0, n) if box is None else self._area_slots(n, box)
+
+    def _mask(
+        self,
+        sel,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        property_type_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        region_id: Optional[int] = None,
+        min_adults: Optional[int] = None,
+        min_children: Optional[int] = None,
+        min_infants: Optional[int] = None,
+        min_pets: Optional[int] = None,
+        amenities: Optional[List[int]] = None,
+        check_in: Optional[date] = None,
+        check_out: Optional[date] = None,
+        flexible_nights: Optional[int] = None,
+        bbox: Optional[BBox] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius: Optional[float] = None,
+        **_
+    ) -> np.ndarray:
+        """Filter mask over `sel` (a slice of slots or an array of slot numbers)."""
+        mask = self.active[sel].copy()
+        if min_price is not None:
+            mask &= self.price_cents[sel] >= _cents(min_price)
+        if max_price is not None:
+            mask &= self.price_cents[sel] <= _cents(max_price)
+        if property_type_id is not None:
+            mask &= self.property_type_ids[sel] == property_type_id
+        if city_id is not None:
+            mask &= self.city_ids[sel] == city_id
+        if region_id is not None:
+            mask &= self.region_ids[sel] == region_id
+        if min_adults is not None:
+            mask &= self.max_adults[sel] >= min_adults
+        if min_children is not None:
+            mask &= self.max_children[sel] >= min_children
+        if min_infants is not None:
+            mask &= self.max_infant[sel] >= min_infants
+        if min_pets is not None:
+            mask &= self.max_pets[sel] >= min_pets
+        if amenities:
+            wanted = np.zeros(self._amenity_words, dtype=np.uint64)
+            for amenity_id in amenities:
+                if amenity_id // 64 >= self._amenity_words:
+                    return np.zeros(len(mask), dtype=bool)  # No listing has that amenity
+                wanted[amenity_id // 64] |= np.uint64(1 << (amenity_id % 64))
+            bits = self.amenity_bits[sel]
+            for word in np.flatnonzero(wanted):
+                mask &= (bits[:, word] & wanted[word]) == wanted[word]
+        # Unlocated listings have NaN coordinates and fail every comparison
+        box = search_area(bbox, near, radius)
+        if box is not None:
+            latitude, longitude = self.latitude[sel], self.longitude[sel]
+            mask &= (latitude >= box.min_lat) & (latitude <= box.max_lat) \
+                & (longitude >= box.min_lon) & (longitude <= box.max_lon)
+            if near is not None:
+                mask &= haversine_km(near[0], near[1], latitude, longitude) <= radius
+        if check_in and check_out:
+            if flexible_nights:
+                mask &= self._free_runs(sel, mask, check_in, check_out, flexible_nights)
+            else:
+                lo, hi, wanted_nights = self._night_span(check_in, check_out)
+                mask &= ((self.nights[sel, lo:hi] & wanted_nights) == wanted_nights).all(axis=1)
+        return mask
+
+    def search(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        **filters
+    ) -> Tuple[List[Tuple[int, int]], Optional[str]]:
+        """
+        Returns the page as ordered (id, region_id) pairs and the next cursor.
+        """
+        descending = sort_order.lower() == "desc"
+        order = f"{sort_by}:{sort_order.lower()}"
+        with self._lock:
+            sel = self._selection(self._size, **filters)
+            mask = self._mask(sel, **filters)
+            keys = (self.price_cents if sort_by == "price" else self.created_at)[sel]
+            ids = self.ids[sel]
+            if cursor:
+                after_key, after_id, _ = decode_cursor(cursor, order)
+                after_key = _cents(after_key) if sort_by == "price" else _micros(after_key)
+                if descending:
+                    mask &= (keys < after_key) | ((keys == after_key) & (ids < after_id))
+                else:
+                    mask &= (keys > after_key) | ((keys == after_key) & (ids > after_id))
+
+            candidates = np.flatnonzero(mask)
+            # ids are unique across shards, so (key, id) is already a total order
+            signed_keys = -keys[candidates] if descending else keys[candidates]
+            signed_ids = -ids[candidates] if descending else ids[candidates]
+            wanted = limit + 1
+            if len(candidates) > wanted:
+                kth = np.partition(signed_keys, wanted - 1)[wanted - 1]
+                keep = signed_keys <= kth
+                candidates, signed_keys, signed_ids = candidates[keep], signed_keys[keep], signed_ids[keep]
+            ordered = candidates[np.lexsort((signed_ids, signed_keys))][:wanted]
+            slots = _slots(sel, ordered)
+
+            page = [(int(self.ids[slot]), int(self.region_ids[slot])) for slot in slots[:limit]]
+            next_cursor = None
+            if len(ordered) > limit:
+                last = slots[limit - 1]
+                key = keys[ordered[limit - 1]]
+                if sort_by == "price":
+                    key = Decimal(int(key)) / 100
+                else:
+                    key = _EPOCH + timedelta(microseconds=int(key))
+                next_cursor = encode_cursor(order, (key, int(self.ids[last]), int(self.region_ids[last])))
+        return page, next_cursor
+
+    def clusters(self, cell_degrees: float, **filters) -> Tuple[int, List[dict]]:
+        """
+        Matching listings grouped by cells of `cell_degrees` (anchored at
+        0,0 so panning keeps clusters stable). Returns the total and one
+        entry per cell; a single-listing cell carries the listing's id.
+        """
+        with self._lock:
+            sel = self._selection(self._size, **filters)
+            slots = _slots(sel, np.flatnonzero(self._mask(sel, **filters)))
+            latitude, longitude = self.latitude[slots], self.longitude[slots]
+            price_cents, ids, region_ids = self.price_cents[slots], self.ids[slots], self.region_ids[slots]
+        if not len(slots):
+            return 0, []
+
+        columns = int(360 / cell_degrees) + 1
+        cells = np.floor((latitude + 90) / cell_degrees).astype(np.int64) * columns \
+            + np.floor((longitude + 180) / cell_degrees).astype(np.int64)
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        starts = np.flatnonzero(np.concatenate(([True], cells[1:] != cells[:-1])))
+        counts = np.diff(np.concatenate((starts, [len(cells)])))
+        center_lat = np.add.reduceat(latitude[order], starts) / counts
+        center_lon = np.add.reduceat(longitude[order], starts) / counts
+        min_prices = np.minimum.reduceat(price_cents[order], starts)
+        firsts = order[starts]
+        return len(slots), [
+            {
+                "latitude": float(center_lat[i]),
+                "longitude": float(center_lon[i]),
+                "count": int(counts[i]),
+                "min_price": Decimal(int(min_prices[i])) / 100,
+                "property_id": int(ids[firsts[i]]) if counts[i] == 1 else None,
+                "region_id": int(region_ids[firsts[i]]) if counts[i] == 1 else None,
+            }
+            for i in range(len(starts))
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "listings": len(self),
+            "slots": self._size,
+            "amenity_words": self._amenity_words,
+            "located": int(np.count_nonzero(~np.isnan(self.latitude[:self._size]))),
+            "grid_pending": len(self._geo_pending),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "nights_origin": self.nights_origin.isoformat() if self.nights_origin else None,
+            "bytes": sum(getattr(self, name).nbytes for name in _ARRAYS)
+        }
+
+
+listing_index = ListingIndex()
+
+
+def _slots(sel, positions: np.ndarray) -> np.ndarray:
+    """Slot numbers of positions within a selection from `_selection`."""
+    return positions if isinstance(sel, slice) else sel[positions]
+
+
+def refresh_listing_index(db: Session) -> None:
+    """
+    Full build on the first call, then catch up with rows updated since the
+    last watermark (writes made through other workers).
+    """
+    started = time.perf_counter()
+    if not listing_index.ready:
+        loaded = listing_index.rebuild(db)
+    else:
+        loaded = listing_index.load(db, since=listing_index.watermark)
+    if loaded:
+        logger.info(f"Listing index: {loaded} properties loaded in {time.perf_counter() - started:.2f}s")
+
+
+def index_property_write(prop: Property, amenity_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Apply a committed create/update/delete to the local index.
+    """
+    if not settings.listing_index_enabled or not listing_index.ready:
+        return
+    if prop.is_active:
+        listing_index.upsert(prop, amenity_ids)
+    else:
+        listing_index.remove(prop.id)
@@ -0,0 +1,175 @@
+"""
+Listing pages built from plain column rows, without ORM entities.
+
+The search and hydration queries project only the property columns that
+`PropertyRes` needs; the page's photos come from one batched query over
+(id, region_id), host names from a per-process cache backed by one batched
+user query, and city/country/region names from the in-memory reference
+tables (services/reference_data.py). Nothing goes through the identity map
+or joined eager loading, so a page costs one row per listing instead of one
+row per (listing x photo) plus an object graph per listing.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import settings
+from models.property import Property
+from models.property_photo import PropertyPhoto
+from models.user import User
+from repositories.shard_routing import multi_shard, user_regions
+from schemas.property import PropertyRes
+from services.reference_data import ReferenceSnapshot, reference_data
+
+# Columns behind every PropertyRes (plus the keys used to route follow-up queries)
+LISTING_COLUMNS = (
+    Property.id, Property.region_id, Property.city_id, Property.user_id,
+    Property.address, Property.description, Property.property_type_id, Property.price_night,
+    Property.max_adults, Property.max_children, Property.max_infant, Property.max_pets,
+    Property.latitude, Property.longitude
+)
+
+# user_id -> "first last"; the owner of a listing rarely renames
+host_names: LRUCache[str] = LRUCache(settings.host_name_cache_size, settings.host_name_cache_ttl_seconds)
+
+
+def invalidate_host_name(user_id: int) -> None:
+    host_names.delete(str(user_id))
+
+
+def listing_select() -> Select:
+    return select(*LISTING_COLUMNS)
+
+
+def _by_pairs(statement: Select, model, pairs: Sequence[Tuple[int, int]], id_column) -> Select:
+    regions = {region_id for _, region_id in pairs}
+    statement = statement.where(model.region_id.in_(regions), tuple_(id_column, model.region_id).in_(pairs))
+    return statement if len(regions) == 1 else multi_shard(statement)
+
+
+def rows_statement(pairs: Sequence[Tuple[int, int]]) -> Select:
+    """Listing rows for the given (id, region_id) pairs, in one query."""
+    return _by_pairs(listing_select(), Property, pairs, Property.id)
+
+
+def photos_statement(pairs: Sequence[Tuple[int, int]]) -> Select:
+    """Photo URLs of a whole page, primary photo first."""
+    return _by_pairs(
+        select(PropertyPhoto.property_id, PropertyPhoto.image_url),
+        PropertyPhoto, pairs, PropertyPhoto.property_id
+    ).order_by(PropertyPhoto.property_id, PropertyPhoto.is_primary.desc(), PropertyPhoto.id)
+
+
+def hosts_statement(user_ids: Sequence[int]) -> Select:
+    """
+    Names of the given users. The owner's region is not stored on the
+    property, so the query is routed only when every region is known.
+    """
+    statement = select(User.id, User.first_name, User.last_name)
+    regions = [user_regions.get(user_id) for user_id in user_ids]
+    if None in regions:
+        return multi_shard(statement.where(User.id.in_(user_ids)))
+    return _by_pairs(statement, User, list(zip(user_ids, regions)), User.id)
+
+
+def _missing_hosts(rows) -> Tuple[Dict[int, str], List[int]]:
+    found, missing = {}, []
+    for user_id in {row.user_id for row in rows}:
+        name = host_names.get(str(user_id))
+        if name is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = name
+    return found, missing
+
+
+def _store_hosts(found: Dict[int, str], host_rows) -> None:
+    for user_id, first_name, last_name in host_rows:
+        found[user_id] = name = f"{first_name} {last_name}"
+        host_names.set(str(user_id), name)
+
+
+def _photos_by_property(photo_rows) -> Dict[int, List[str]]:
+    photos: Dict[int, List[str]] = {}
+    for property_id, image_url in photo_rows:
+        photos.setdefault(property_id, []).append(image_url)
+    return photos
+
+
+def _pairs(rows) -> List[Tuple[int, int]]:
+    return [(row.id, row.region_id) for row in rows]
+
+
+def assemble(
+    rows: Iterable,
+    photos: Dict[int, List[str]],
+    hosts: Dict[int, str],
+    names: ReferenceSnapshot
+) -> List[PropertyRes]:
+    """PropertyRes per row; values come typed from the driver, so no validation pass."""
+    listings = []
+    for row in rows:
+        city, country = names.city_names(row.city_id)
+        listings.append(PropertyRes.model_construct(
+            id=row.id,
+            address=row.address,
+            description=row.description,
+            property_type_id=row.property_type_id,
+            price_night=row.price_night,
+            max_adults=row.max_adults,
+            max_children=row.max_children,
+            max_infant=row.max_infant,
+            max_pets=row.max_pets,
+            latitude=row.latitude,
+            longitude=row.longitude,
+            city=city,
+            country=country,
+            region=names.region_name(row.region_id),
+            photos=photos.get(row.id, []),
+            host=hosts.get(row.user_id, ""),
+            host_id=str(row.user_id)
+        ))
+    return listings
+
+
+def load_listings(db: Session, rows: Sequence) -> List[PropertyRes]:
+    """PropertyRes for already fetched listing rows (at most two extra queries)."""
+    if not rows:
+        return []
+    names = reference_data.ensure(
+        db, cities={row.city_id for row in rows}, regions={row.region_id for row in rows}
+    )
+    photos = _photos_by_property(db.execute(photos_statement(_pairs(rows))))
+    hosts, missing = _missing_hosts(rows)
+    if missing:
+        _store_hosts(hosts, db.execute(hosts_statement(missing)))
+    return assemble(rows, photos, hosts, names)
+
+
+async def load_listings_async(db: AsyncSession, rows: Sequence) -> List[PropertyRes]:
+    if not rows:
+        return []
+    names = await reference_data.ensure_async(
+        db, cities={row.city_id for row in rows}, regions={row.region_id for row in rows}
+    )
+    photos = _photos_by_property(await db.execute(photos_statement(_pairs(rows))))
+    hosts, missing = _missing_hosts(rows)
+    if missing:
+        _store_hosts(hosts, await db.execute(hosts_statement(missing)))
+    return assemble(rows, photos, hosts, names)
+
+
+def fetch_listings(db: Session, pairs: Sequence[Tuple[int, int]]) -> List[PropertyRes]:
+    """Listings for (id, region_id) pairs, in no particular order."""
+    if not pairs:
+        return []
+    return load_listings(db, db.execute(rows_statement(pairs)).all())
+
+
+async def fetch_listings_async(db: AsyncSession, pairs: Sequence[Tuple[int, int]]) -> List[PropertyRes]:
+    if not pairs:
+        return []
+    return await load_listings_async(db, (await db.execute(rows_statement(pairs))).all())
@@ -1,9 +1,16 @@
 from typing import List
 from sqlalchemy.orm import Session
-from models.city import City
-from models.country import Country
+from services.location_suggest import Suggestion, location_suggest
+from services.reference_data import CityRef, reference_data
 
 class LocationService:
     @staticmethod
-    def list_cities(db: Session, skip: int = 0, limit: int = 100) -> List[City]:
-        return db.query(City).offset(skip).limit(limit).all()
\ No newline at end of file
+    def list_cities(db: Session, skip: int = 0, limit: int = 100) -> List[CityRef]:
+        # Served from the in-memory reference tables; db is only used if they were never loaded
+        cities = reference_data.ensure(db).cities
+        return list(cities.values())[skip:skip + limit]
+
+    @staticmethod
+    def suggest(q: str, limit: int = 10) -> List[Suggestion]:
+        # In-memory prefix index only; never queries the database
+        return location_suggest.suggest(q, limit)
@@ -0,0 +1,171 @@
+"""
+In-memory autocomplete over city, region and country names.
+
+Names are folded (accents stripped, casefolded, punctuation collapsed) so
+"sao" matches "São Paulo" and "BOGOTA" matches "Bogotá". Every word start
+of a name is a key ("paulo" also finds "São Paulo"); the keys live in one
+sorted array, so a prefix is a bisect range. Matches are ranked by active
+listing count. The top results of every one- and two-letter prefix are
+precomputed, since those ranges cover most of the catalogue; longer
+prefixes only scan a handful of keys.
+
+The index is rebuilt from the reference-data snapshot and a per-city
+listing count (refreshed periodically, see main.py) and swapped in whole,
+so `suggest` never touches the database or sees a half-built index.
+"""
+import heapq
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Select, func, select
+
+from models.property import Property
+from repositories.shard_routing import multi_shard
+from services.reference_data import ReferenceSnapshot, reference_data
+
+MAX_SUGGESTIONS = 20
+_PRECOMPUTED_PREFIX = 2
+_KIND_ORDER = {"city": 0, "region": 1, "country": 2}
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase ASCII form used for matching: "São Paulo" -> "sao paulo"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", stripped).strip()
+
+
+def listing_counts_statement() -> Select:
+    """Active listings per city (every shard; run in the background only)."""
+    return multi_shard(
+        select(Property.city_id, func.count())
+        .where(Property.is_active == True)
+        .group_by(Property.city_id)
+    )
+
+
+class Suggestion(NamedTuple):
+    type: str
+    id: int
+    name: str
+    label: str
+    listings: int
+
+
+class _State(NamedTuple):
+    keys: List[str]
+    entry_ids: List[int]
+    entries: List[Suggestion]
+    rank: List[int]
+    top: Dict[str, List[int]]
+
+
+def _entries(snapshot: ReferenceSnapshot, city_counts: Dict[int, int]) -> List[Suggestion]:
+    region_counts: Dict[int, int] = {}
+    country_counts: Dict[int, int] = {}
+    entries = []
+    for city in snapshot.cities.values():
+        listings = city_counts.get(city.id, 0)
+        region_counts[city.region_id] = region_counts.get(city.region_id, 0) + listings
+        country_counts[city.country_id] = country_counts.get(city.country_id, 0) + listings
+        city_name, country_name = snapshot.city_names(city.id)
+        label = f"{city_name}, {country_name}" if country_name else city_name
+        entries.append(Suggestion("city", city.id, city.name, label, listings))
+    for region in snapshot.regions.values():
+        entries.append(Suggestion("region", region.id, region.name, region.name, region_counts.get(region.id, 0)))
+    for country in snapshot.countries.values():
+        entries.append(Suggestion("country", country.id, country.name, country.name, country_counts.get(country.id, 0)))
+    return entries
+
+
+def _word_keys(name: str) -> List[str]:
+    folded = fold(name)
+    if not folded:
+        return []
+    return [folded[match.start():] for match in re.finditer(r"\S+", folded)]
+
+
+def _prefix_range(keys: List[str], prefix: str) -> Tuple[int, int]:
+    # Folded keys are ASCII, so "~" sorts after every continuation of the prefix
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + "~")
+
+
+def _best(entry_ids: List[int], rank: List[int], lo: int, hi: int, limit: int) -> List[int]:
+    matched = {entry_ids[position] for position in range(lo, hi)}
+    return heapq.nsmallest(limit, matched, key=rank.__getitem__)
+
+
+class LocationSuggestIndex:
+    def __init__(self):
+        self._state: Optional[_State] = None
+        self.city_counts: Dict[int, int] = {}
+        self.version: Optional[int] = None
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def build(self, snapshot: ReferenceSnapshot, city_counts: Optional[Dict[int, int]] = None) -> None:
+        """Rebuild from a reference snapshot; keeps the last listing counts if none are given."""
+        if city_counts is not None:
+            self.city_counts = dict(city_counts)
+        entries = _entries(snapshot, self.city_counts)
+
+        order = sorted(
+            range(len(entries)),
+            key=lambda i: (-entries[i].listings, _KIND_ORDER[entries[i].type], fold(entries[i].name))
+        )
+        rank = [0] * len(entries)
+        for position, entry_id in enumerate(order):
+            rank[entry_id] = position
+
+        pairs = sorted(
+            (key, entry_id)
+            for entry_id, entry in enumerate(entries)
+            for key in set(_word_keys(entry.name))
+        )
+        keys = [key for key, _ in pairs]
+        entry_ids = [entry_id for _, entry_id in pairs]
+
+        top = {}
+        for key in keys:
+            for length in range(1, min(_PRECOMPUTED_PREFIX, len(key)) + 1):
+                prefix = key[:length]
+                if prefix not in top:
+                    top[prefix] = _best(entry_ids, rank, *_prefix_range(keys, prefix), MAX_SUGGESTIONS)
+
+        self._state = _State(keys, entry_ids, entries, rank, top)
+        self.version = snapshot.version
+        self.built_at = time.monotonic()
+
+    def suggest(self, query: str, limit: int = 10) -> List[Suggestion]:
+        state = self._state
+        prefix = fold(query)
+        if state is None or not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        best = state.top.get(prefix)
+        if best is None:
+            best = _best(state.entry_ids, state.rank, *_prefix_range(state.keys, prefix), limit)
+        return [state.entries[entry_id] for entry_id in best[:limit]]
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "ready": state is not None,
+            "reference_version": self.version,
+            "entries": len(state.entries) if state else 0,
+            "keys": len(state.keys) if state else 0,
+            "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at else None,
+        }
+
+
+location_suggest = LocationSuggestIndex()
+
+# New reference data (a city added or renamed) rebuilds with the last counts
+reference_data.on_refresh(location_suggest.build)
@@ -1,25 +1,27 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from models.payment import Payment, PaymentStatus
 from models.booking import Booking, BookingStatus
+from repositories.booking_repository import BookingConflictError, BookingRepository, PaymentRepository
 
 class PaymentService:
     def __init__(self, db: Session):
         self.db = db
+        self.bookings = BookingRepository(db)
+        self.payments = PaymentRepository(db)
 
-    def process_payment(self, booking_id: int, user_id: int) -> Payment:
+    def process_payment(self, booking_id: int, user_id: int, region_id: Optional[int] = None) -> Payment:
         
-        booking = self.db.query(Booking).filter(
-            Booking.id == booking_id,
-            Booking.user_id == user_id
-        ).first()
+        booking = self.bookings.get(booking_id, region_id, user_id)
         
         if not booking:
             raise ValueError("Booking not found or access denied")
         
-        existing_payment = self.db.query(Payment).filter(
-            Payment.booking_id == booking_id,
-            Payment.status == PaymentStatus.SUCCESSFUL
-        ).first()
+        existing_payment = self.payments.get_for_booking(
+            booking.id,
+            booking.region_id,
+            PaymentStatus.SUCCESSFUL
+        )
         
         if existing_payment:
             raise ValueError("Booking already has a successful payment")
@@ -36,9 +38,13 @@ class PaymentService:
         
         self.db.add(payment)
         
-        booking.status = BookingStatus.CONFIRMED
-        
-        self.db.commit()
+        # Confirmar una reserva cancelada puede solaparse con otra activa
+        try:
+            self.bookings.set_status(booking, BookingStatus.CONFIRMED)
+            self.db.commit()
+        except BookingConflictError:
+            self.db.rollback()
+            raise
         self.db.refresh(payment)
         
-        return payment
\ No newline at end of file
+        return payment
@@ -0,0 +1,266 @@
+"""
+Per-night pricing with NumPy.
+
+A night costs the property's `price_night` unless a `nightly` price rule
+covers it (date window and/or weekday mask); among the rules covering a
+night the highest `priority` wins and either sets the price (`amount`) or
+adjusts `price_night` by `percent`. On top of the nightly subtotal:
+
+- `length_of_stay`: `percent` off the subtotal from `min_nights` nights
+  (the largest qualifying discount applies);
+- `extra_guest`: `amount` per night for each adult or child above
+  `guests_included`;
+- `pet`: `amount` per night per pet.
+
+Amounts are integer cents and a whole batch is priced at once: a
+(properties x nights) array starts at the base prices, every nightly rule
+of the batch is tested against every night in one broadcast, and the
+winning rule per (property, night) comes out of a single reduceat. Quoting
+a results page costs the same few array operations as quoting one listing.
+
+Base prices and rules are cached per process and loaded for a whole page
+in one query; writes to a property or its rules invalidate its entry.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Select, and_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import settings
+from models.price_rule import PriceRule
+from models.property import Property
+from repositories.shard_routing import multi_shard
+
+# Longest stay a quote prices: bounds the per-night arrays of nightly_cents
+MAX_QUOTE_NIGHTS = 365
+_NO_START = 0
+_NO_END = date.max.toordinal()
+_ALL_WEEKDAYS = 0b1111111
+
+# property_id -> Pricing
+pricing_cache: LRUCache["Pricing"] = LRUCache(settings.pricing_cache_size, settings.pricing_cache_ttl_seconds)
+
+
+class Rule(NamedTuple):
+    kind: str
+    start: int  # Date ordinals, inclusive
+    end: int
+    weekdays: int
+    min_nights: int
+    guests_included: int
+    amount_cents: int  # -1 when the rule has no amount
+    percent: float
+
+
+class Pricing(NamedTuple):
+    property_id: int
+    region_id: int
+    base_cents: int
+    rules: Tuple[Rule, ...]  # Lowest priority first
+
+
+def cents(value) -> int:
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def money(value) -> Decimal:
+    return Decimal(int(value)).scaleb(-2)
+
+
+def invalidate_pricing(property_id: int) -> None:
+    pricing_cache.delete(str(property_id))
+
+
+# ---------------------------------------------------------------------- loading
+
+_RULE_COLUMNS = (
+    PriceRule.kind, PriceRule.start_date, PriceRule.end_date, PriceRule.weekdays, PriceRule.min_nights,
+    PriceRule.guests_included, PriceRule.amount, PriceRule.percent
+)
+
+
+def pricing_statement(pairs: Sequence[Tuple[int, int]]) -> Select:
+    """Base price and rules of the given active (id, region_id) pairs, in one query."""
+    regions = {region_id for _, region_id in pairs}
+    statement = (
+        select(Property.id, Property.region_id, Property.price_night, *_RULE_COLUMNS)
+        .outerjoin(PriceRule, and_(
+            PriceRule.property_id == Property.id,
+            PriceRule.region_id == Property.region_id
+        ))
+        .where(
+            Property.region_id.in_(regions),
+            tuple_(Property.id, Property.region_id).in_(pairs),
+            Property.is_active.is_(True)
+        )
+        .order_by(Property.id, PriceRule.priority, PriceRule.id)
+    )
+    return statement if len(regions) == 1 else multi_shard(statement)
+
+
+def _rule(row) -> Rule:
+    return Rule(
+        kind=row.kind,
+        start=row.start_date.toordinal() if row.start_date else _NO_START,
+        end=row.end_date.toordinal() if row.end_date else _NO_END,
+        weekdays=row.weekdays or _ALL_WEEKDAYS,
+        min_nights=row.min_nights or 0,
+        guests_included=row.guests_included or 0,
+        amount_cents=cents(row.amount) if row.amount is not None else -1,
+        percent=float(row.percent or 0)
+    )
+
+
+def _store(found: Dict[int, Pricing], rows) -> None:
+    rules: Dict[int, List[Rule]] = {}
+    bases = {}
+    for row in rows:
+        bases[row.id] = (row.region_id, cents(row.price_night))
+        rules.setdefault(row.id, [])
+        if row.kind is not None:
+            rules[row.id].append(_rule(row))
+    for property_id, (region_id, base_cents) in bases.items():
+        found[property_id] = pricing = Pricing(property_id, region_id, base_cents, tuple(rules[property_id]))
+        pricing_cache.set(str(property_id), pricing)
+
+
+def _cached(pairs: Sequence[Tuple[int, int]]) -> Tuple[Dict[int, Pricing], List[Tuple[int, int]]]:
+    found, missing = {}, []
+    for property_id, region_id in pairs:
+        pricing = pricing_cache.get(str(property_id))
+        if pricing is None:
+            missing.append((property_id, region_id))
+        else:
+            found[property_id] = pricing
+    return found, missing
+
+
+def load_pricing(db: Session, pairs: Sequence[Tuple[int, int]]) -> Dict[int, Pricing]:
+    """Pricing per property id (unknown or inactive properties are left out); at most one query."""
+    found, missing = _cached(pairs)
+    if missing:
+        _store(found, db.execute(pricing_statement(missing)))
+    return found
+
+
+async def load_pricing_async(db: AsyncSession, pairs: Sequence[Tuple[int, int]]) -> Dict[int, Pricing]:
+    found, missing = _cached(pairs)
+    if missing:
+        _store(found, await db.execute(pricing_statement(missing)))
+    return found
+
+
+def with_base(prop: Property, pricing: Optional[Pricing]) -> Pricing:
+    """Pricing of an already loaded property: its own price_night wins over the cached one."""
+    rules = pricing.rules if pricing is not None else ()
+    return Pricing(prop.id, prop.region_id, cents(prop.price_night), rules)
+
+
+# ---------------------------------------------------------------------- engine
+
+def _rules_of(pricings: Sequence[Pricing], kind: str) -> Tuple[np.ndarray, List[Rule]]:
+    """Rules of one kind across the batch, grouped by position in `pricings`."""
+    rows, rules = [], []
+    for row, pricing in enumerate(pricings):
+        for rule in pricing.rules:
+            if rule.kind == kind:
+                rows.append(row)
+                rules.append(rule)
+    return np.array(rows, dtype=np.int64), rules
+
+
+def nightly_cents(pricings: Sequence[Pricing], start: date, nights: int) -> np.ndarray:
+    """(len(pricings), nights) array with the price of each night from `start`."""
+    base = np.array([pricing.base_cents for pricing in pricings], dtype=np.int64)
+    prices = np.repeat(base[:, None], nights, axis=1)
+    rows, rules = _rules_of(pricings, "nightly")
+    if not rules or not nights:
+        return prices
+
+    days = start.toordinal() + np.arange(nights)
+    weekdays = (days - 1) % 7  # Ordinal 1 (0001-01-01) is a Monday
+    starts = np.array([rule.start for rule in rules])
+    ends = np.array([rule.end for rule in rules])
+    masks = np.array([rule.weekdays for rule in rules])
+    amounts = np.array([rule.amount_cents for rule in rules], dtype=np.int64)
+    percents = np.array([rule.percent for rule in rules])
+
+    applies = (days >= starts[:, None]) & (days <= ends[:, None]) & ((masks[:, None] >> weekdays) & 1 == 1)
+    # Each property's rules are contiguous and in priority order, so the
+    # winner of a night is the largest applicable rule index in its group
+    score = np.where(applies, np.arange(len(rules))[:, None], -1)
+    firsts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    winner = np.maximum.reduceat(score, firsts, axis=0)
+    owners = rows[firsts]
+    chosen = np.maximum(winner, 0)
+    adjusted = np.where(
+        amounts[chosen] >= 0,
+        amounts[chosen],
+        np.rint(base[owners][:, None] * (1 + percents[chosen] / 100)).astype(np.int64)
+    )
+    prices[owners] = np.where(winner >= 0, adjusted, prices[owners])
+    return prices
+
+
+def quote(
+    pricings: Sequence[Pricing],
+    check_in: date,
+    check_out: date,
+    adults: int = 1,
+    children: int = 0,
+    pets: int = 0
+) -> List[dict]:
+    """One quote per pricing, in the same order."""
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        raise ValueError("Check-out date must be after check-in date")
+    if nights > MAX_QUOTE_NIGHTS:
+        raise ValueError(f"Stays are limited to {MAX_QUOTE_NIGHTS} nights")
+    if not pricings:
+        return []
+
+    prices = nightly_cents(pricings, check_in, nights)
+    subtotal = prices.sum(axis=1)
+
+    discount_percent = np.zeros(len(pricings))
+    rows, rules = _rules_of(pricings, "length_of_stay")
+    if rules:
+        min_nights = np.array([rule.min_nights for rule in rules])
+        percents = np.array([rule.percent for rule in rules])
+        np.maximum.at(discount_percent, rows, np.where(min_nights <= nights, percents, 0))
+    discount = np.rint(subtotal * discount_percent / 100).astype(np.int64)
+
+    fees = np.zeros(len(pricings), dtype=np.int64)
+    rows, rules = _rules_of(pricings, "extra_guest")
+    if rules:
+        extra = np.maximum(adults + children - np.array([rule.guests_included for rule in rules]), 0)
+        np.add.at(fees, rows, np.array([rule.amount_cents for rule in rules]) * extra * nights)
+    rows, rules = _rules_of(pricings, "pet")
+    if rules and pets:
+        np.add.at(fees, rows, np.array([rule.amount_cents for rule in rules]) * pets * nights)
+
+    total = subtotal - discount + fees
+    return [
+        {
+            "property_id": pricing.property_id,
+            "region_id": pricing.region_id,
+            "nights": nights,
+            "nightly": [money(price) for price in prices[row]],
+            "subtotal": money(subtotal[row]),
+            "discount": money(discount[row]),
+            "fees": money(fees[row]),
+            "total": money(total[row])
+        }
+        for row, pricing in enumerate(pricings)
+    ]
+
+
+def calendar_prices(pricing: Pricing, start: date, free: np.ndarray) -> List[Optional[Decimal]]:
+    """Nightly price of each day of a calendar; None on days that are not free."""
+    prices = nightly_cents([pricing], start, len(free))[0]
+    return [money(price) if available else None for price, available in zip(prices, free)]
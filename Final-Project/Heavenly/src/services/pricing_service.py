@@ -0,0 +1,109 @@
+from typing import List
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.price_rule import PriceRule
+from models.property import Property
+from schemas.pricing import PriceRuleCreate, QuoteRequest
+from services.pricing import invalidate_pricing, load_pricing, load_pricing_async, quote
+
+MAX_RULES_PER_PROPERTY = 50
+
+
+def _ordered_quotes(request: QuoteRequest, found: dict) -> List[dict]:
+    pricings = [found[item.property_id] for item in request.properties if item.property_id in found]
+    return quote(
+        pricings,
+        request.check_in,
+        request.check_out,
+        adults=request.guest_adults,
+        children=request.guest_children,
+        pets=request.guest_pets
+    )
+
+
+def _pairs(request: QuoteRequest) -> List[tuple]:
+    return list(dict.fromkeys((item.property_id, item.region_id) for item in request.properties))
+
+
+def _check_owner(db: Session, property_id: int, region_id: int, user_id: int) -> None:
+    owned = db.scalar(select(Property.id).where(
+        Property.id == property_id,
+        Property.region_id == region_id,
+        Property.user_id == user_id
+    ))
+    if owned is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found or you don't have permission"
+        )
+
+
+class PricingService:
+    """
+    Price rules of a property and batch quotes (see services/pricing.py).
+    """
+
+    @staticmethod
+    def get_rules(db: Session, property_id: int, region_id: int, user_id: int) -> List[PriceRule]:
+        """
+        Price rules of the property in evaluation order (owner only)
+        """
+        _check_owner(db, property_id, region_id, user_id)
+        return PricingService._rules(db, property_id, region_id)
+
+    @staticmethod
+    def _rules(db: Session, property_id: int, region_id: int) -> List[PriceRule]:
+        return list(db.scalars(
+            select(PriceRule)
+            .where(PriceRule.property_id == property_id, PriceRule.region_id == region_id)
+            .order_by(PriceRule.priority, PriceRule.id)
+        ))
+
+    @staticmethod
+    def replace_rules(
+        db: Session,
+        property_id: int,
+        region_id: int,
+        user_id: int,
+        rules: List[PriceRuleCreate]
+    ) -> List[PriceRule]:
+        """
+        Replace every price rule of the property with `rules` (owner only)
+        """
+        if len(rules) > MAX_RULES_PER_PROPERTY:
+            raise ValueError(f"A property can have at most {MAX_RULES_PER_PROPERTY} price rules")
+
+        _check_owner(db, property_id, region_id, user_id)
+
+        try:
+            db.execute(delete(PriceRule).where(
+                PriceRule.property_id == property_id,
+                PriceRule.region_id == region_id
+            ))
+            db.add_all([
+                PriceRule(property_id=property_id, region_id=region_id, **rule.model_dump())
+                for rule in rules
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        invalidate_pricing(property_id)
+        return PricingService._rules(db, property_id, region_id)
+
+    @staticmethod
+    def quote(db: Session, request: QuoteRequest) -> List[dict]:
+        """
+        Price one stay across many properties (e.g. every card of a results
+        page) with one query and one vectorized pass; unknown and inactive
+        properties are left out.
+        """
+        return _ordered_quotes(request, load_pricing(db, _pairs(request)))
+
+    @staticmethod
+    async def quote_async(db: AsyncSession, request: QuoteRequest) -> List[dict]:
+        return _ordered_quotes(request, await load_pricing_async(db, _pairs(request)))
@@ -0,0 +1,71 @@
+"""
+Caché del detalle de propiedad (PropertyRes serializado).
+
+GET /properties/{id} se resuelve desde L1/L2 sin tocar Citus; las escrituras
+en PropertyService invalidan la entrada en ambos niveles.
+"""
+from typing import Dict, Optional
+
+from core.cache import TwoTierCache
+from core.config import settings
+from schemas.property import PropertyRes
+
+
+property_detail_cache = TwoTierCache(
+    namespace="property",
+    l1_size=settings.property_cache_l1_size,
+    l1_ttl_seconds=settings.property_cache_l1_ttl_seconds,
+    l2_ttl_seconds=settings.property_cache_l2_ttl_seconds
+)
+
+
+def _decode(payload: Optional[bytes]) -> Optional[PropertyRes]:
+    if payload is None:
+        return None
+    return PropertyRes.model_validate_json(payload)
+
+
+def get_cached_property(property_id: int) -> Optional[PropertyRes]:
+    return _decode(property_detail_cache.get(property_id))
+
+
+async def get_cached_property_async(property_id: int) -> Optional[PropertyRes]:
+    return _decode(await property_detail_cache.aget(property_id))
+
+
+def get_cached_properties(property_ids) -> Dict[int, PropertyRes]:
+    return {
+        property_id: _decode(payload)
+        for property_id, payload in property_detail_cache.get_many(property_ids).items()
+    }
+
+
+async def get_cached_properties_async(property_ids) -> Dict[int, PropertyRes]:
+    return {
+        property_id: _decode(payload)
+        for property_id, payload in (await property_detail_cache.aget_many(property_ids)).items()
+    }
+
+
+def cache_property(property_res: PropertyRes) -> None:
+    property_detail_cache.set(property_res.id, property_res.model_dump_json().encode())
+
+
+async def cache_property_async(property_res: PropertyRes) -> None:
+    await property_detail_cache.aset(property_res.id, property_res.model_dump_json().encode())
+
+
+def cache_properties(properties) -> None:
+    property_detail_cache.set_many({
+        property_res.id: property_res.model_dump_json().encode() for property_res in properties
+    })
+
+
+async def cache_properties_async(properties) -> None:
+    await property_detail_cache.aset_many({
+        property_res.id: property_res.model_dump_json().encode() for property_res in properties
+    })
+
+
+def invalidate_property(property_id: int) -> None:
+    property_detail_cache.invalidate(property_id)
@@ -1,75 +1,132 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
-from http.client import HTTPException
-from typing import Optional, List
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.exc import IntegrityError
+from functools import partial
+from typing import Dict, Optional, List, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Select, and_, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from models.amenity import Amenity
 from models.available_date import AvailableDate
-from models.city import City
+from models.booking import Booking
 from models.property import Property
+from models.review import Review
 from schemas.property import PropertyRes
+from repositories.pagination import Keyset
+from core.config import settings
+from core.single_flight import SingleFlight, flight_key
+from repositories.database import SessionLocal
+from repositories.shard_routing import AsyncRegionResolver, RegionResolver, multi_shard
+from services.geo import BBox, cluster_degrees, search_area, sql_distance_km
+from services.listing_index import listing_index
+from services.listing_projection import (
+    fetch_listings, fetch_listings_async, listing_select, load_listings, load_listings_async
+)
+from services.property_cache import (
+    cache_properties, cache_properties_async, cache_property, cache_property_async,
+    get_cached_properties, get_cached_properties_async, get_cached_property, get_cached_property_async
+)
+from services.search_cache import (
+    cacheable, full_key, full_key_async, get_search, get_search_async, revalidate, search_key,
+    store_search, store_search_async
+)
+
+
+property_detail_flights = SingleFlight("property_detail")
 
 
 class PropertyDiscoveryService:
-    
+    """
+    Property search and detail. Every query is built once as a `select()`
+    so the sync (psycopg2) and async (asyncpg) paths share the same SQL;
+    listings are built from column rows (see services/listing_projection.py).
+    """
+
     @staticmethod
     def get_property(db: Session, property_id: int) -> Optional[PropertyRes]:
         """
         Get property by ID with related data and transform to PropertyRes
         """
-        prop = db.query(Property)\
-            .options(
-                joinedload(Property.city).joinedload(City.country),
-                joinedload(Property.region),
-                joinedload(Property.photos),
-                joinedload(Property.owner)
-            )\
-            .filter(Property.id == property_id)\
-            .first()
-        
-        if not prop:
+        cached = get_cached_property(property_id)
+        if cached is not None:
+            return cached
+
+        # Concurrent misses for the same id share one load
+        return property_detail_flights.do(
+            flight_key(property_id), PropertyDiscoveryService._load_property, db, property_id
+        )
+
+    @staticmethod
+    def _load_property(db: Session, property_id: int) -> Optional[PropertyRes]:
+        region_id = RegionResolver(db).for_property(property_id)
+        if region_id is None:
             return None
-        
-        # Extract photo URLs
-        photo_urls = [photo.url for photo in prop.photos] if prop.photos else []
-        
-        # Get country name
-        country_name = ""
-        if prop.city and prop.city.country:
-            country_name = prop.city.country.name
-        
-        # Get host name
-        host_name = ""
-        if prop.owner:
-            host_name = f"{prop.owner.first_name} {prop.owner.last_name}"
-        
-        # Create PropertyRes
-        return PropertyRes(
-            id=prop.id,
-            address=prop.address,
-            description=prop.description,
-            property_type_id=prop.property_type_id,
-            price_night=prop.price_night,
-            max_adults=prop.max_adults,
-            max_children=prop.max_children,
-            max_infant=prop.max_infant,
-            max_pets=prop.max_pets,
-            city=prop.city.name if prop.city else "",
-            country=country_name,
-            region=prop.region.name if prop.region else "",
-            photos=photo_urls,
-            host=host_name,
-            host_id=str(prop.user_id)  # or int depending on your schema
+
+        found = fetch_listings(db, [(property_id, region_id)])
+        if not found:
+            return None
+
+        property_res = found[0]
+        cache_property(property_res)
+        return property_res
+
+    @staticmethod
+    async def get_property_async(db: AsyncSession, property_id: int) -> Optional[PropertyRes]:
+        """
+        Async version of get_property
+        """
+        cached = await get_cached_property_async(property_id)
+        if cached is not None:
+            return cached
+
+        return await property_detail_flights.do_async(
+            flight_key(property_id), PropertyDiscoveryService._load_property_async, db, property_id
         )
 
     @staticmethod
-    def list_properties(
-        db: Session,
-        skip: int = 0,
-        limit: int = 100,
+    async def _load_property_async(db: AsyncSession, property_id: int) -> Optional[PropertyRes]:
+        region_id = await AsyncRegionResolver(db).for_property(property_id)
+        if region_id is None:
+            return None
+
+        found = await fetch_listings_async(db, [(property_id, region_id)])
+        if not found:
+            return None
+
+        property_res = found[0]
+        await cache_property_async(property_res)
+        return property_res
+
+    @staticmethod
+    def _sort_key(sort_by: str):
+        """
+        Column (or expression) behind each `sort_by` mode the router accepts
+        """
+        if sort_by == "price":
+            return Property.price_night
+        if sort_by == "rating":
+            # Average rating, computed on the property's own shard
+            return func.coalesce(
+                select(func.avg(Review.rating))
+                .where(Review.property_id == Property.id, Review.region_id == Property.region_id)
+                .correlate(Property)
+                .scalar_subquery(),
+                0
+            )
+        return Property.created_at
+
+    @staticmethod
+    def _keyset(sort_by: str, sort_order: str) -> Keyset:
+        return Keyset(
+            order=f"{sort_by}:{sort_order.lower()}",
+            key=PropertyDiscoveryService._sort_key(sort_by),
+            model=Property,
+            descending=sort_order.lower() == "desc"
+        )
+
+    @staticmethod
+    def _filtered(
+        query: Select,
         min_price: Optional[Decimal] = None,
         max_price: Optional[Decimal] = None,
         property_type_id: Optional[int] = None,
@@ -82,132 +139,341 @@ class PropertyDiscoveryService:
         amenities: Optional[List[int]] = None,
         check_in: Optional[date] = None,
         check_out: Optional[date] = None,
-        sort_by: str = "created_at",
-        sort_order: str = "desc"
-    ) -> List[PropertyRes]:
-        
-        query = db.query(Property)
-        
+        bbox: Optional[BBox] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius: Optional[float] = None
+    ) -> Select:
+        """
+        Apply the search filters to `query` (a select over property)
+        """
+        query = query.where(Property.is_active == True)
+        if region_id is None:
+            # Without a region the search has to visit every shard
+            query = multi_shard(query)
+
         # Price filter
         if min_price is not None or max_price is not None:
             if min_price is not None and max_price is not None:
-                query = query.filter(Property.price_night.between(min_price, max_price))
+                query = query.where(Property.price_night.between(min_price, max_price))
             elif min_price is not None:
-                query = query.filter(Property.price_night >= min_price)
+                query = query.where(Property.price_night >= min_price)
             elif max_price is not None:
-                query = query.filter(Property.price_night <= max_price)
-        
+                query = query.where(Property.price_night <= max_price)
+
         # Property type filter
         if property_type_id is not None:
-            query = query.filter(Property.property_type_id == property_type_id)
-        
+            query = query.where(Property.property_type_id == property_type_id)
+
         # Location filters
         if city_id is not None:
-            query = query.filter(Property.city_id == city_id)
-        elif region_id is not None:
-            query = query.filter(Property.region_id == region_id)
-        
+            query = query.where(Property.city_id == city_id)
+        if region_id is not None:
+            query = query.where(Property.region_id == region_id)
+
         # Capacity filters
         if min_adults is not None:
-            query = query.filter(Property.max_adults >= min_adults)
+            query = query.where(Property.max_adults >= min_adults)
         if min_children is not None:
-            query = query.filter(Property.max_children >= min_children)
+            query = query.where(Property.max_children >= min_children)
         if min_infants is not None:
-            query = query.filter(Property.max_infant >= min_infants)
+            query = query.where(Property.max_infant >= min_infants)
         if min_pets is not None:
-            query = query.filter(Property.max_pets >= min_pets)
-        
-        # Amenities filter
+            query = query.where(Property.max_pets >= min_pets)
+
+        # Amenities filter: has all of them, one GIN-indexed predicate
         if amenities:
-            for amenity_id in amenities:
-                subquery = db.query(Property).join(
-                    Property.amenities
-                ).filter(
-                    Amenity.id == amenity_id,
-                    Property.id == Property.id
-                ).exists()
-                query = query.filter(subquery)
-        
+            query = query.where(Property.amenity_ids.contains(sorted(set(amenities))))
+
         # Availability filter
         if check_in and check_out:
             if check_in >= check_out:
-                from fastapi import HTTPException
                 raise HTTPException(
                     status_code=400,
                     detail="Check-in date must be before check-out"
                 )
-            
-            availability_subquery = db.query(AvailableDate).filter(
+
+            # The stay occupies the nights [check_in, check_out), as in the
+            # night bitmaps (availability_index): ranges are inclusive, so the
+            # last night needed is check_out - 1, and a booking that checks
+            # out on check_in (or in on check_out) does not overlap
+            last_night = check_out - timedelta(days=1)
+            query = query.where(exists().where(
                 AvailableDate.property_id == Property.id,
+                AvailableDate.region_id == Property.region_id,
                 AvailableDate.is_available == True,
                 AvailableDate.start_date <= check_in,
-                AvailableDate.end_date >= check_out
-            ).exists()
-            query = query.filter(availability_subquery)
-            
-            from models.booking import Booking
-            booking_conflict_subquery = db.query(Booking).filter(
+                AvailableDate.end_date >= last_night
+            ))
+
+            query = query.where(~exists().where(
+                AvailableDate.property_id == Property.id,
+                AvailableDate.region_id == Property.region_id,
+                AvailableDate.is_available == False,
+                AvailableDate.start_date <= last_night,
+                AvailableDate.end_date >= check_in
+            ))
+
+            query = query.where(~exists().where(
                 Booking.property_id == Property.id,
+                Booking.region_id == Property.region_id,
                 Booking.status.in_(['CONFIRMED', 'PENDING']),
-                or_(
-                    and_(Booking.check_in <= check_out, Booking.check_out >= check_in)
-                )
-            ).exists()
-            query = query.filter(~booking_conflict_subquery)
-        
-        # Sorting
-        sort_column = getattr(Property, sort_by, Property.created_at)
-        if sort_order.lower() == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
-        
-        # Eager loading
-        query = query.options(
-            joinedload(Property.city).joinedload(City.country),
-            joinedload(Property.region),
-            joinedload(Property.photos),
-            joinedload(Property.owner)
+                and_(Booking.check_in < check_out, Booking.check_out > check_in)
+            ))
+
+        # Map area: lat/lon range (idx_property_lat_lon), then the exact radius
+        box = search_area(bbox, near, radius)
+        if box is not None:
+            query = query.where(
+                Property.latitude.between(box.min_lat, box.max_lat),
+                Property.longitude.between(box.min_lon, box.max_lon)
+            )
+        if near is not None:
+            query = query.where(sql_distance_km(Property.latitude, Property.longitude, *near) <= radius)
+
+        return query
+
+    @staticmethod
+    def _search_statement(
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        **filters
+    ) -> Select:
+        """
+        Build the search statement for the given filters (see `_filtered`)
+        """
+        query = PropertyDiscoveryService._filtered(listing_select(), **filters)
+        # Sorting + keyset pagination on (sort key, id, region_id)
+        return PropertyDiscoveryService._keyset(sort_by, sort_order).apply(query, cursor, limit)
+
+    @staticmethod
+    def _use_index(sort_by: str, filters: dict) -> bool:
+        """
+        Whether the in-memory index can answer this search. Flexible dates
+        (`flexible_nights` free nights anywhere in check_in..check_out) have
+        no SQL equivalent and are only served from the availability index.
+        """
+        if settings.listing_index_enabled and listing_index.can_serve(sort_by, **filters):
+            return True
+        if filters.pop("flexible_nights", None):
+            raise HTTPException(
+                status_code=503,
+                detail="Flexible date search is not available for this query"
+            )
+        return False
+
+    @staticmethod
+    def _cluster_statement(cell_degrees: float, **filters) -> Select:
+        """
+        Map clusters in SQL (without the index): matching listings grouped
+        by the same lat/lon cells as ListingIndex.clusters
+        """
+        query = select(
+            func.count().label("count"),
+            func.avg(Property.latitude).label("latitude"),
+            func.avg(Property.longitude).label("longitude"),
+            func.min(Property.price_night).label("min_price"),
+            func.min(Property.id).label("property_id"),
+            func.min(Property.region_id).label("region_id")
+        )
+        return PropertyDiscoveryService._filtered(query, **filters).group_by(
+            func.floor((Property.latitude + 90) / cell_degrees),
+            func.floor((Property.longitude + 180) / cell_degrees)
+        )
+
+    @staticmethod
+    def _cluster_rows(rows) -> Tuple[int, List[dict]]:
+        clusters = [
+            {
+                "latitude": row.latitude,
+                "longitude": row.longitude,
+                "count": row.count,
+                "min_price": row.min_price,
+                "property_id": row.property_id if row.count == 1 else None,
+                "region_id": row.region_id if row.count == 1 else None
+            }
+            for row in rows
+        ]
+        return sum(cluster["count"] for cluster in clusters), clusters
+
+    @staticmethod
+    def map_clusters(db: Session, bbox: BBox, grid: int = 32, **filters) -> Tuple[float, int, List[dict]]:
+        """
+        Server-side clustering for zoomed-out map views: (cell size in
+        degrees, total listings, clusters) for the listings inside `bbox`.
+        """
+        cell = cluster_degrees(bbox, grid)
+        if PropertyDiscoveryService._use_index("created_at", filters):
+            return (cell, *listing_index.clusters(cell, bbox=bbox, **filters))
+        rows = db.execute(PropertyDiscoveryService._cluster_statement(cell, bbox=bbox, **filters)).all()
+        return (cell, *PropertyDiscoveryService._cluster_rows(rows))
+
+    @staticmethod
+    async def map_clusters_async(
+        db: AsyncSession,
+        bbox: BBox,
+        grid: int = 32,
+        **filters
+    ) -> Tuple[float, int, List[dict]]:
+        cell = cluster_degrees(bbox, grid)
+        if PropertyDiscoveryService._use_index("created_at", filters):
+            return (cell, *listing_index.clusters(cell, bbox=bbox, **filters))
+        result = await db.execute(PropertyDiscoveryService._cluster_statement(cell, bbox=bbox, **filters))
+        return (cell, *PropertyDiscoveryService._cluster_rows(result.all()))
+
+    @staticmethod
+    def _pairs(rows) -> List[Tuple[int, int]]:
+        return [(row.id, row.region_id) for row in rows]
+
+    @staticmethod
+    def _in_order(found: Dict[int, PropertyRes], pairs: List[Tuple[int, int]]) -> List[PropertyRes]:
+        # Keep the page order; a listing deleted meanwhile is simply skipped
+        return [found[property_id] for property_id, _ in pairs if property_id in found]
+
+    @staticmethod
+    def _hydrate(db: Session, pairs: List[Tuple[int, int]]) -> List[PropertyRes]:
+        """
+        Page of listings from the detail cache; misses are loaded in one
+        batched query and cached for the next hit.
+        """
+        found = get_cached_properties([property_id for property_id, _ in pairs])
+        missing = [pair for pair in pairs if pair[0] not in found]
+        if missing:
+            loaded = fetch_listings(db, missing)
+            cache_properties(loaded)
+            found.update((property_res.id, property_res) for property_res in loaded)
+        return PropertyDiscoveryService._in_order(found, pairs)
+
+    @staticmethod
+    async def _hydrate_async(db: AsyncSession, pairs: List[Tuple[int, int]]) -> List[PropertyRes]:
+        found = await get_cached_properties_async([property_id for property_id, _ in pairs])
+        missing = [pair for pair in pairs if pair[0] not in found]
+        if missing:
+            loaded = await fetch_listings_async(db, missing)
+            await cache_properties_async(loaded)
+            found.update((property_res.id, property_res) for property_res in loaded)
+        return PropertyDiscoveryService._in_order(found, pairs)
+
+    @staticmethod
+    def _search(
+        db: Session,
+        limit: int,
+        sort_by: str,
+        sort_order: str,
+        **filters
+    ) -> Tuple[List[Tuple[int, int]], List[PropertyRes], Optional[str]]:
+        """
+        Run a search: (id, region_id) pairs, listings and next cursor
+        """
+        if PropertyDiscoveryService._use_index(sort_by, filters):
+            pairs, next_cursor = listing_index.search(
+                limit=limit, sort_by=sort_by, sort_order=sort_order, **filters
+            )
+            return pairs, PropertyDiscoveryService._hydrate(db, pairs) if pairs else [], next_cursor
+
+        rows = db.execute(PropertyDiscoveryService._search_statement(
+            limit=limit, sort_by=sort_by, sort_order=sort_order, **filters
+        )).all()
+        rows, next_cursor = PropertyDiscoveryService._keyset(sort_by, sort_order).page_rows(rows, limit)
+        return PropertyDiscoveryService._pairs(rows), load_listings(db, rows), next_cursor
+
+    @staticmethod
+    async def _search_async(
+        db: AsyncSession,
+        limit: int,
+        sort_by: str,
+        sort_order: str,
+        **filters
+    ) -> Tuple[List[Tuple[int, int]], List[PropertyRes], Optional[str]]:
+        if PropertyDiscoveryService._use_index(sort_by, filters):
+            pairs, next_cursor = listing_index.search(
+                limit=limit, sort_by=sort_by, sort_order=sort_order, **filters
+            )
+            return pairs, await PropertyDiscoveryService._hydrate_async(db, pairs) if pairs else [], next_cursor
+
+        result = await db.execute(PropertyDiscoveryService._search_statement(
+            limit=limit, sort_by=sort_by, sort_order=sort_order, **filters
+        ))
+        rows, next_cursor = PropertyDiscoveryService._keyset(sort_by, sort_order).page_rows(
+            result.all(), limit
         )
-        
-        # Get properties
-        properties = query.offset(skip).limit(limit).all()
-        
-        # Transform to PropertyRes
-        result: List[PropertyRes] = []
-        for prop in properties:
-            # Extract photo URLs
-            photo_urls = [photo.url for photo in prop.photos] if prop.photos else []
-            
-            # Get country name
-            country_name = ""
-            if prop.city and prop.city.country:
-                country_name = prop.city.country.name
-            
-            # Get host name
-            host_name = ""
-            if prop.owner:
-                host_name = f"{prop.owner.first_name} {prop.owner.last_name}"
-            
-            # Create PropertyRes
-            property_res = PropertyRes(
-                id=prop.id,
-                address=prop.address,
-                description=prop.description,
-                property_type_id=prop.property_type_id,
-                price_night=prop.price_night,
-                max_adults=prop.max_adults,
-                max_children=prop.max_children,
-                max_infant=prop.max_infant,
-                max_pets=prop.max_pets,
-                city=prop.city.name if prop.city else "",
-                country=country_name,
-                region=prop.region.name if prop.region else "",
-                photos=photo_urls,
-                host=host_name,
-                host_id=str(prop.user_id)  # Convert to string as defined in schema
+        return PropertyDiscoveryService._pairs(rows), await load_listings_async(db, rows), next_cursor
+
+    @staticmethod
+    def _refresh_search(limit: int, sort_by: str, sort_order: str, filters: dict):
+        """Background recomputation of a stale cached search, on its own session."""
+        with SessionLocal() as db:
+            pairs, items, next_cursor = PropertyDiscoveryService._search(
+                db, limit, sort_by, sort_order, **filters
             )
-            result.append(property_res)
-        
-        return result
-       
\ No newline at end of file
+        cache_properties(items)
+        return pairs, next_cursor
+
+    @staticmethod
+    def list_properties(
+        db: Session,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        **filters
+    ) -> Tuple[List[PropertyRes], Optional[str]]:
+        """
+        Search properties; see `_filtered` for the accepted filters.
+        Returns the page and the cursor for the next one (None on the last page).
+        With the search cache enabled, the page's ids come from the cache
+        (stale entries are served while refreshed in the background);
+        searches by dates always run against the database.
+        """
+        if not settings.search_cache_enabled or not cacheable(filters):
+            _, items, next_cursor = PropertyDiscoveryService._search(db, limit, sort_by, sort_order, **filters)
+            return items, next_cursor
+
+        key = full_key(*search_key(limit, sort_by, sort_order, filters))
+        cached = get_search(key)
+        if cached is not None:
+            pairs, next_cursor, stale = cached
+            if stale:
+                revalidate(key, partial(
+                    PropertyDiscoveryService._refresh_search, limit, sort_by, sort_order, dict(filters)
+                ))
+            return PropertyDiscoveryService._hydrate(db, pairs), next_cursor
+
+        pairs, items, next_cursor = PropertyDiscoveryService._search(db, limit, sort_by, sort_order, **filters)
+        store_search(key, pairs, next_cursor)
+        cache_properties(items)
+        return items, next_cursor
+
+    @staticmethod
+    async def list_properties_async(
+        db: AsyncSession,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        **filters
+    ) -> Tuple[List[PropertyRes], Optional[str]]:
+        """
+        Async version of list_properties
+        """
+        if not settings.search_cache_enabled or not cacheable(filters):
+            _, items, next_cursor = await PropertyDiscoveryService._search_async(
+                db, limit, sort_by, sort_order, **filters
+            )
+            return items, next_cursor
+
+        key = await full_key_async(*search_key(limit, sort_by, sort_order, filters))
+        cached = await get_search_async(key)
+        if cached is not None:
+            pairs, next_cursor, stale = cached
+            if stale:
+                revalidate(key, partial(
+                    PropertyDiscoveryService._refresh_search, limit, sort_by, sort_order, dict(filters)
+                ))
+            return await PropertyDiscoveryService._hydrate_async(db, pairs), next_cursor
+
+        pairs, items, next_cursor = await PropertyDiscoveryService._search_async(
+            db, limit, sort_by, sort_order, **filters
+        )
+        await store_search_async(key, pairs, next_cursor)
+        await cache_properties_async(items)
+        return items, next_cursor
@@ -1,18 +1,40 @@
-from datetime import date, datetime
+from datetime import date
 from decimal import Decimal
 from http.client import HTTPException
-from typing import Optional, List
-from sqlalchemy import and_, or_
+from typing import Optional, List, Tuple
+from sqlalchemy import and_, delete, func, insert, or_, select
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from starlette import status
 
-from models.amenity import Amenity
 from models.available_date import AvailableDate
 from models.city import City
 from models.property import Property
+from models.property_amenity import PropertyAmenity
 from models.property_photo import PropertyPhoto
 from schemas.property import PropertyCreate, PropertyRes, PropertyUpdate
+from repositories.pagination import Keyset
+from repositories.shard_routing import multi_shard, property_regions
+from services.listing_index import index_property_write
+from services.pricing import invalidate_pricing
+from services.property_cache import invalidate_property
+from services.reference_data import reference_data
+from services.search_cache import invalidate_search_region
+
+
+def known_amenity_ids(db: Session, amenity_ids: Optional[List[int]]) -> List[int]:
+    """Requested amenity ids that exist, sorted and without repeats (checked in memory)."""
+    requested = set(amenity_ids or ())
+    amenities = reference_data.ensure(db, amenities=requested).amenities
+    return sorted(amenity_id for amenity_id in requested if amenity_id in amenities)
+
+
+def link_amenities(db: Session, property_id: int, region_id: int, amenity_ids: List[int]) -> None:
+    if amenity_ids:
+        db.execute(insert(PropertyAmenity), [
+            {"property_id": property_id, "amenity_id": amenity_id, "region_id": region_id}
+            for amenity_id in amenity_ids
+        ])
 
 
 class PropertyService:
@@ -35,6 +57,8 @@ class PropertyService:
                 max_pets=property_data.max_pets,
                 region_id=property_data.region_id,
                 city_id=property_data.city_id,
+                latitude=property_data.latitude,
+                longitude=property_data.longitude,
                 user_id=user_id,
                 is_active=True
             )
@@ -42,11 +66,10 @@ class PropertyService:
             db.add(db_property)
             db.flush()  # Get property ID
             
-            if property_data.amenities:
-                amenities = db.query(Amenity).filter(
-                    Amenity.id.in_(property_data.amenities)
-                ).all()
-                db_property.amenities.extend(amenities)
+            amenity_ids = known_amenity_ids(db, property_data.amenities)
+            if amenity_ids:
+                link_amenities(db, db_property.id, db_property.region_id, amenity_ids)
+                db_property.amenity_ids = amenity_ids
             
             if property_data.photo_urls:
                 for idx, url in enumerate(property_data.photo_urls):
@@ -60,6 +83,9 @@ class PropertyService:
             
             db.commit()
             db.refresh(db_property)
+            property_regions.set(db_property.id, db_property.region_id)
+            index_property_write(db_property, amenity_ids)
+            invalidate_search_region(db_property.region_id)
             return db_property
             
         except IntegrityError as e:
@@ -99,12 +125,15 @@ class PropertyService:
             for field, value in update_dict.items():
                 setattr(property, field, value)
             
+            amenity_ids = None
             if update_data.amenities is not None:
-                property.amenities.clear()
-                amenities = db.query(Amenity).filter(
-                    Amenity.id.in_(update_data.amenities)
-                ).all()
-                property.amenities.extend(amenities)
+                amenity_ids = known_amenity_ids(db, update_data.amenities)
+                db.execute(delete(PropertyAmenity).where(
+                    PropertyAmenity.c.property_id == property_id,
+                    PropertyAmenity.c.region_id == region_id
+                ))
+                link_amenities(db, property_id, region_id, amenity_ids)
+                property.amenity_ids = amenity_ids
             
             if update_data.photo_urls is not None:
                 db.query(PropertyPhoto).filter(
@@ -121,9 +150,14 @@ class PropertyService:
                     )
                     db.add(photo)
             
-            property.updated_at = datetime.utcnow()
+            property.updated_at = func.now()
             db.commit()
+            # Write-through: details, price and photos of the cached PropertyRes changed
+            invalidate_property(property_id)
+            invalidate_pricing(property_id)
+            invalidate_search_region(region_id)
             db.refresh(property)
+            index_property_write(property, amenity_ids)
             return property
             
         except Exception as e:
@@ -151,21 +185,24 @@ class PropertyService:
             return False
         
         property.is_active = False
-        property.updated_at = datetime.utcnow()
+        property.updated_at = func.now()
         db.commit()
+        invalidate_property(property_id)
+        invalidate_pricing(property_id)
+        invalidate_search_region(region_id)
+        index_property_write(property)
         return True
     
     @staticmethod
     def get_user_properties(
         db: Session,
         user_id: int,
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 100
-    ) -> List[Property]:
+    ) -> Tuple[List[Property], Optional[str]]:
       
-        return db.query(Property)\
-            .filter(Property.user_id == user_id)\
-            .order_by(Property.created_at.desc())\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
\ No newline at end of file
+        # Un host puede tener propiedades en varias regiones
+        keyset = Keyset("created_at:desc", Property.created_at, Property)
+        query = multi_shard(select(Property).where(Property.user_id == user_id))
+        rows = db.execute(keyset.apply(query, cursor, limit)).all()
+        return keyset.page(rows, limit)
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Registro en memoria de las tablas de referencia de Citus.
+
+country, region, city, role, property_type, amenity, payment_method y
+currency son tablas de referencia (db_citus.sql), pequeñas y casi
+inmutables: se cargan enteras al arrancar en un snapshot inmutable
+(NamedTuple por fila, mapas id -> fila de solo lectura) y las peticiones
+las resuelven por id sin joins ni consultas.
+
+Cada carga sustituye el snapshot de una vez (las lecturas nunca ven una
+carga a medias) e incrementa `version`. Recarga:
+- periódica, cada `reference_data_refresh_seconds` (main.py);
+- por LISTEN/NOTIFY si `reference_data_listen` está activo: los triggers de
+  scripts/reference_data_notify.sql hacen NOTIFY reference_data;
+- bajo demanda cuando se pide un id desconocido (una ciudad o amenity
+  nueva), como mucho una vez por `_MISS_RELOAD_SECONDS`.
+Los suscriptores de `on_refresh` se llaman tras cada carga con el snapshot nuevo.
+"""
+import logging
+import select as selectors
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.currency import Currency
+from models.payment_method import PaymentMethod
+from models.property_type import PropertyType
+from models.region import Region
+from models.role import Role
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "reference_data"
+_MISS_RELOAD_SECONDS = 5.0
+
+
+class CountryRef(NamedTuple):
+    id: int
+    name: str
+
+
+class RegionRef(NamedTuple):
+    id: int
+    name: str
+    code: str
+
+
+class CityRef(NamedTuple):
+    id: int
+    name: str
+    country_id: int
+    region_id: int
+
+
+class RoleRef(NamedTuple):
+    id: int
+    name: str
+
+
+class PropertyTypeRef(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+
+
+class AmenityRef(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+
+
+class PaymentMethodRef(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+
+
+class CurrencyRef(NamedTuple):
+    id: int
+    name: str
+    symbol: str
+
+
+# Tabla -> (tipo de fila, consulta); el orden de las columnas es el del NamedTuple
+_TABLES = {
+    "countries": (CountryRef, select(Country.id, Country.name)),
+    "regions": (RegionRef, select(Region.id, Region.name, Region.code)),
+    "cities": (CityRef, select(City.id, City.name, City.country_id, City.region_id)),
+    "roles": (RoleRef, select(Role.id, Role.name)),
+    "property_types": (PropertyTypeRef, select(PropertyType.id, PropertyType.name, PropertyType.description)),
+    "amenities": (AmenityRef, select(Amenity.id, Amenity.name, Amenity.description)),
+    "payment_methods": (PaymentMethodRef, select(PaymentMethod.id, PaymentMethod.name, PaymentMethod.description)),
+    "currencies": (CurrencyRef, select(Currency.id, Currency.name, Currency.symbol)),
+}
+
+
+def _frozen(rows: Dict[int, tuple]) -> Mapping[int, tuple]:
+    return MappingProxyType(dict(sorted(rows.items())))
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    version: int = 0
+    loaded_at: Optional[float] = None
+    countries: Mapping[int, CountryRef] = field(default_factory=lambda: MappingProxyType({}))
+    regions: Mapping[int, RegionRef] = field(default_factory=lambda: MappingProxyType({}))
+    cities: Mapping[int, CityRef] = field(default_factory=lambda: MappingProxyType({}))
+    roles: Mapping[int, RoleRef] = field(default_factory=lambda: MappingProxyType({}))
+    property_types: Mapping[int, PropertyTypeRef] = field(default_factory=lambda: MappingProxyType({}))
+    amenities: Mapping[int, AmenityRef] = field(default_factory=lambda: MappingProxyType({}))
+    payment_methods: Mapping[int, PaymentMethodRef] = field(default_factory=lambda: MappingProxyType({}))
+    currencies: Mapping[int, CurrencyRef] = field(default_factory=lambda: MappingProxyType({}))
+
+    def city_names(self, city_id: int) -> Tuple[str, str]:
+        """(ciudad, país); cadenas vacías si el id no existe."""
+        city = self.cities.get(city_id)
+        if city is None:
+            return "", ""
+        country = self.countries.get(city.country_id)
+        return city.name, country.name if country else ""
+
+    def region_name(self, region_id: int) -> str:
+        region = self.regions.get(region_id)
+        return region.name if region else ""
+
+
+class ReferenceDataRegistry:
+    def __init__(self):
+        self.snapshot = ReferenceSnapshot()
+        self._listeners: List[Callable[[ReferenceSnapshot], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.snapshot.loaded_at is not None
+
+    def on_refresh(self, listener: Callable[[ReferenceSnapshot], None]) -> None:
+        """Registra una función a llamar con cada snapshot nuevo."""
+        self._listeners.append(listener)
+
+    def _replace(self, tables: Dict[str, list]) -> ReferenceSnapshot:
+        with self._lock:
+            snapshot = ReferenceSnapshot(
+                version=self.snapshot.version + 1,
+                loaded_at=time.monotonic(),
+                **{
+                    name: _frozen({row[0]: row_type(*row) for row in tables[name]})
+                    for name, (row_type, _) in _TABLES.items()
+                }
+            )
+            self.snapshot = snapshot
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.warning(f"Reference data listener failed: {e}")
+        return snapshot
+
+    def load(self, db: Session) -> ReferenceSnapshot:
+        return self._replace({name: db.execute(query).all() for name, (_, query) in _TABLES.items()})
+
+    async def load_async(self, db: AsyncSession) -> ReferenceSnapshot:
+        tables = {}
+        for name, (_, query) in _TABLES.items():
+            tables[name] = (await db.execute(query)).all()
+        return self._replace(tables)
+
+    def _needs_load(self, ids: Dict[str, Iterable[int]]) -> bool:
+        snapshot = self.snapshot
+        if snapshot.loaded_at is None:
+            return True
+        unknown = any(
+            any(entity_id not in getattr(snapshot, table) for entity_id in entity_ids)
+            for table, entity_ids in ids.items()
+        )
+        return unknown and time.monotonic() - snapshot.loaded_at >= _MISS_RELOAD_SECONDS
+
+    def ensure(self, db: Session, **ids: Iterable[int]) -> ReferenceSnapshot:
+        """
+        Snapshot vigente; carga si no hay ninguno o si falta alguno de los
+        ids pedidos por tabla (p. ej. `cities={3, 7}`).
+        """
+        if self._needs_load(ids):
+            return self.load(db)
+        return self.snapshot
+
+    async def ensure_async(self, db: AsyncSession, **ids: Iterable[int]) -> ReferenceSnapshot:
+        if self._needs_load(ids):
+            return await self.load_async(db)
+        return self.snapshot
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "version": snapshot.version,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot.loaded_at else None,
+            **{name: len(getattr(snapshot, name)) for name in _TABLES},
+        }
+
+
+reference_data = ReferenceDataRegistry()
+
+
+def listen_for_changes(engine, session_factory, stop: threading.Event) -> None:
+    """
+    LISTEN reference_data en una conexión dedicada (psycopg2) y recarga el
+    registro con cada NOTIFY; varias notificaciones seguidas cuentan como
+    una. Pensado para un hilo daemon; reconecta si se pierde la conexión.
+    """
+    while not stop.is_set():
+        raw = None
+        try:
+            raw = engine.raw_connection()
+            connection = raw.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            while not stop.is_set():
+                if selectors.select([connection], [], [], 1.0) == ([], [], []):
+                    continue
+                connection.poll()
+                if connection.notifies:
+                    connection.notifies.clear()
+                    with session_factory() as db:
+                        snapshot = reference_data.load(db)
+                    logger.info(f"Reference data reloaded (version {snapshot.version})")
+        except Exception as e:
+            logger.warning(f"Reference data listener failed, retrying: {e}")
+            stop.wait(5.0)
+        finally:
+            if raw is not None:
+                raw.invalidate()
@@ -0,0 +1,201 @@
+"""
+Caché de resultados de búsqueda (GET /properties/).
+
+La clave es el conjunto de filtros canonicalizado (sin los None, amenities
+ordenadas y sin repetir, decimales normalizados) más el cursor, el límite y
+el orden. El valor es la página como pares (id, region_id) ordenados y el
+next_cursor; los listings se hidratan desde la caché de detalle.
+
+Cada entrada es fresca `search_cache_fresh_seconds` y después se sirve
+como obsoleta hasta `search_cache_stale_seconds` más mientras un hilo la
+recalcula en segundo plano (stale-while-revalidate).
+
+Invalidación por región: la clave incluye la generación de la región
+filtrada (o la global si la búsqueda no filtra por región); escribir una
+propiedad incrementa la de su región y la global, y las entradas viejas
+dejan de encontrarse y expiran solas en Redis. Con Redis la generación es
+la compartida, así que todos los workers construyen las mismas claves; sin
+Redis (o si no responde) se usa el contador local del proceso.
+
+Las búsquedas por fechas (check_in/check_out) no se cachean: dependen de
+reservas y calendarios, que cambian mucho más que las propiedades y no
+invalidan la caché.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from core.cache import TwoTierCache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "all"
+
+search_result_cache = TwoTierCache(
+    namespace="search",
+    l1_size=settings.search_cache_l1_size,
+    l1_ttl_seconds=settings.search_cache_fresh_seconds,
+    l2_ttl_seconds=int(settings.search_cache_fresh_seconds + settings.search_cache_stale_seconds)
+)
+
+# Generaciones por ámbito: valor en Redis (compartido), releído como mucho
+# cada `_GENERATION_TTL` segundos, y contador local para cuando no hay Redis
+_GENERATION_TTL = 1.0
+_generations: Dict[str, Tuple[float, Optional[int]]] = {}
+_local_generations: Dict[str, int] = {}
+_lock = threading.Lock()
+
+_refreshing: set = set()
+_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+stale_served = 0
+refreshes = 0
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def search_key(limit: int, sort_by: str, sort_order: str, filters: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    (ámbito, hash) de una búsqueda. El ámbito es la región filtrada o la global.
+    """
+    canonical = {name: _canonical(value) for name, value in filters.items() if value is not None and value != []}
+    if "amenities" in canonical:
+        canonical["amenities"] = sorted(set(canonical["amenities"]))
+    canonical.update(limit=limit, sort_by=sort_by, sort_order=sort_order.lower())
+    digest = hashlib.sha1(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+    region_id = filters.get("region_id")
+    return (str(region_id) if region_id is not None else GLOBAL_SCOPE), digest
+
+
+_DATE_FILTERS = ("check_in", "check_out")
+
+
+def cacheable(filters: Dict[str, Any]) -> bool:
+    """Las búsquedas por fechas no se cachean (ver docstring del módulo)."""
+    return all(filters.get(name) is None for name in _DATE_FILTERS)
+
+
+def _read_generation(scope: str) -> Optional[int]:
+    """Generación compartida del ámbito; None sin Redis o si no responde."""
+    now = time.monotonic()
+    cached = _generations.get(scope)
+    if cached and now - cached[0] < _GENERATION_TTL:
+        return cached[1]
+    shared = None
+    if settings.cache_redis_enabled:
+        try:
+            shared = int(search_result_cache.redis.get(f"search-gen:{scope}") or 0)
+        except redis.RedisError as e:
+            logger.warning(f"Search cache generation unavailable: {e}")
+    _generations[scope] = (now, shared)
+    return shared
+
+
+def full_key(scope: str, digest: str) -> str:
+    """Clave de la entrada con la generación vigente del ámbito."""
+    shared = _read_generation(scope)
+    if shared is None:
+        return f"{scope}:local.{_local_generations.get(scope, 0)}:{digest}"
+    return f"{scope}:{shared}:{digest}"
+
+
+def invalidate_search_region(region_id: int) -> None:
+    """Descarta las búsquedas de la región y las que no filtran por región."""
+    for scope in (str(region_id), GLOBAL_SCOPE):
+        with _lock:
+            _local_generations[scope] = _local_generations.get(scope, 0) + 1
+            _generations.pop(scope, None)
+        if settings.cache_redis_enabled:
+            try:
+                search_result_cache.redis.incr(f"search-gen:{scope}")
+            except redis.RedisError as e:
+                logger.warning(f"Search cache invalidation failed: {e}")
+
+
+def _decode(payload: Optional[bytes]) -> Optional[Tuple[List[Tuple[int, int]], Optional[str], bool]]:
+    if payload is None:
+        return None
+    entry = json.loads(payload)
+    return [tuple(pair) for pair in entry["pairs"]], entry["next_cursor"], time.time() >= entry["fresh_until"]
+
+
+def _encode(pairs: List[Tuple[int, int]], next_cursor: Optional[str]) -> bytes:
+    return json.dumps({
+        "pairs": pairs,
+        "next_cursor": next_cursor,
+        "fresh_until": time.time() + settings.search_cache_fresh_seconds
+    }).encode()
+
+
+def get_search(key: str):
+    """(pairs, next_cursor, obsoleta) o None."""
+    return _decode(search_result_cache.get(key))
+
+
+async def get_search_async(key: str):
+    return _decode(await search_result_cache.aget(key))
+
+
+def store_search(key: str, pairs: List[Tuple[int, int]], next_cursor: Optional[str]) -> None:
+    search_result_cache.set(key, _encode(pairs, next_cursor))
+
+
+async def store_search_async(key: str, pairs: List[Tuple[int, int]], next_cursor: Optional[str]) -> None:
+    await search_result_cache.aset(key, _encode(pairs, next_cursor))
+
+
+async def full_key_async(scope: str, digest: str) -> str:
+    cached = _generations.get(scope)
+    if cached and time.monotonic() - cached[0] < _GENERATION_TTL:
+        return full_key(scope, digest)
+    return await asyncio.to_thread(full_key, scope, digest)
+
+
+def revalidate(key: str, compute: Callable[[], Tuple[List[Tuple[int, int]], Optional[str]]]) -> None:
+    """
+    Recalcula una entrada obsoleta en segundo plano (una sola vez por clave
+    y proceso); `compute` abre su propia sesión.
+    """
+    global stale_served
+    stale_served += 1
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        global refreshes
+        try:
+            store_search(key, *compute())
+            refreshes += 1
+        except Exception as e:
+            logger.warning(f"Search cache refresh failed: {e}")
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    _refresher.submit(run)
+
+
+def search_cache_stats() -> dict:
+    return {
+        **search_result_cache.stats(),
+        "stale_served": stale_served,
+        "refreshes": refreshes,
+        "refreshing": len(_refreshing),
+    }
@@ -1,32 +1,45 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from passlib.context import CryptContext
 from models.enums import UserStatus
+from core.passwords import password_hasher
 
 from models.user import User 
 from schemas.user import UserCreate
-
-bycrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+from repositories.pagination import Keyset
+from repositories.shard_routing import RegionResolver, multi_shard
+from services.listing_projection import invalidate_host_name
+from utils.get_current_user import invalidate_principal
 
 class UserService:
     @staticmethod
     def hash_password(password: str) -> str:
-        return bycrypt_context.hash(password)
+        # En el executor de bcrypt: no ocupa la CPU del hilo de la petición
+        return password_hasher.hash(password)
 
 
     @staticmethod
-    def get_by_id(db: Session, user_id: int) -> Optional[User]:
-        return db.query(User).filter(User.id == user_id).first()
+    def get_by_id(db: Session, user_id: int, region_id: Optional[int] = None) -> Optional[User]:
+        region_id = RegionResolver(db).for_user(user_id, region_id)
+        if region_id is None:
+            return None
+        return db.query(User).filter(User.id == user_id, User.region_id == region_id).first()
 
     @staticmethod
     def get_by_email(db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+        return multi_shard(db.query(User).filter(User.email == email)).first()
 
     @staticmethod
-    def list_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-        return db.query(User).offset(skip).limit(limit).all()
+    def list_users(
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[User], Optional[str]]:
+        # Orden por la PK distribuida (id, region_id): cada shard recorre su índice
+        keyset = Keyset("id:asc", User.id, User, descending=False)
+        rows = db.execute(keyset.apply(multi_shard(select(User)), cursor, limit)).all()
+        return keyset.page(rows, limit)
 
     @staticmethod
     def create_user(db: Session, user_data: UserCreate) -> User:
@@ -73,6 +86,8 @@ class UserService:
             db.add(user)
             db.commit()
             db.refresh(user)
+            invalidate_principal(user.id)
+            invalidate_host_name(user.id)
             return user
         except Exception:
             db.rollback()
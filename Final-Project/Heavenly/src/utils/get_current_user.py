@@ -1,43 +1,105 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
-from datetime import datetime
-from dotenv import load_dotenv
-import os
+
+from core.cache import LRUCache
+from core.config import settings
 from repositories.database import get_db
 from models.user import User
+from models.enums import UserStatus
+from repositories.shard_routing import RegionResolver
+from services.auth_service import ALGORITHM, SECRET_KEY
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class Principal:
+    """
+    Usuario autenticado: copia inmutable de las columnas que usan los
+    routers, compartible entre peticiones (a diferencia de la entidad ORM).
+    Admite current_user.id y current_user["id"].
+    """
+    id: int
+    region_id: int
+    email: str
+    first_name: str
+    last_name: str
+    status: UserStatus
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.region_id, user.email, user.first_name, user.last_name, user.status)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+
+# user_id -> Principal; el TTL de cada entrada nunca pasa del exp del token
+principal_cache: LRUCache[Principal] = LRUCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Descarta el usuario cacheado tras modificarlo (los demás workers expiran por TTL)."""
+    principal_cache.delete(str(user_id))
+
+
+def _load_principal(db: Session, user_id: int, payload: dict) -> Optional[Principal]:
+    # El token lleva region_id; si no, se usa el mapa id -> región
+    region_id = RegionResolver(db).for_user(user_id, claims=payload)
+    if region_id is None:
+        return None
+    user = db.query(User).filter(
+        User.id == user_id,
+        User.region_id == region_id
+    ).first()
+    return Principal.from_user(user) if user else None
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
    
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, os.getenv('SECRET_KEY'), algorithms=[os.getenv('ALGORITHM')])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         
-        user_id: int = payload.get("sub")
+        # "sub" es el email (AuthService.create_access_token); el id va en "id"
+        user_id: Optional[int] = payload.get("id")
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials"
             )
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
+        principal = principal_cache.get(str(user_id))
+        if principal is None:
+            principal = _load_principal(db, user_id, payload)
+            if principal is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found"
+                )
+            ttl = settings.principal_cache_ttl_seconds
+            if "exp" in payload:
+                ttl = min(ttl, payload["exp"] - datetime.now(timezone.utc).timestamp())
+            if ttl > 0:
+                principal_cache.set(str(user_id), principal, ttl)
         
-        return user
+        return principal
         
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
-        )
\ No newline at end of file
+        )
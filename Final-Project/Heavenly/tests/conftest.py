@@ -0,0 +1,33 @@
+"""
+Tests unitarios: sin base de datos ni Redis (APP_ENV=test usa FakeRedis).
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+os.environ.setdefault("APP_ENV", "test")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+
+class Clock:
+    """Reloj monótono controlado por el test."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    return clock
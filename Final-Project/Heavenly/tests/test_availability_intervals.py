@@ -0,0 +1,71 @@
+from datetime import date
+
+from services.availability_intervals import IntervalPlan, normalize, plan_changes
+
+
+def d(day: int) -> date:
+    return date(2026, 1, day)
+
+
+def test_merges_adjacent_ranges_with_same_value():
+    assert normalize([(d(1), d(5), True), (d(6), d(10), True)]) == [(d(1), d(10), True)]
+
+
+def test_keeps_adjacent_ranges_with_different_value():
+    ranges = [(d(1), d(5), True), (d(6), d(10), False)]
+    assert normalize(ranges) == ranges
+
+
+def test_merges_overlapping_ranges():
+    assert normalize([(d(1), d(5), True), (d(3), d(8), True), (d(4), d(4), True)]) == [(d(1), d(8), True)]
+
+
+def test_blocked_wins_over_available():
+    assert normalize([(d(1), d(10), True), (d(4), d(6), False)]) == [
+        (d(1), d(3), True), (d(4), d(6), False), (d(7), d(10), True)
+    ]
+
+
+def test_gaps_stay_uncovered():
+    assert normalize([(d(1), d(2), True), (d(5), d(6), True)]) == [(d(1), d(2), True), (d(5), d(6), True)]
+
+
+def test_paint_splits_a_range():
+    assert normalize([(d(1), d(10), True)], paint=(d(4), d(6), False)) == [
+        (d(1), d(3), True), (d(4), d(6), False), (d(7), d(10), True)
+    ]
+
+
+def test_paint_merges_with_neighbours_and_fills_gaps():
+    ranges = [(d(1), d(3), True), (d(4), d(6), False), (d(9), d(10), True)]
+    assert normalize(ranges, paint=(d(4), d(8), True)) == [(d(1), d(10), True)]
+
+
+def test_plan_keeps_identical_rows():
+    stored = [(1, d(1), d(5), True), (2, d(6), d(10), False)]
+    assert not plan_changes(stored, [row[1:] for row in stored])
+
+
+def test_plan_reuses_overlapping_row_and_deletes_the_rest():
+    stored = [(1, d(1), d(5), True), (2, d(6), d(10), True), (3, d(20), d(25), False)]
+    plan = plan_changes(stored, normalize(row[1:] for row in stored))
+
+    assert plan == IntervalPlan(updates=[(1, (d(1), d(10), True))], deletes=[2])
+    assert plan.operations == 2
+
+
+def test_plan_split_updates_one_row_and_inserts_the_others():
+    stored = [(1, d(1), d(10), True)]
+    segments = normalize([row[1:] for row in stored], paint=(d(4), d(6), False))
+    plan = plan_changes(stored, segments)
+
+    assert plan.updates == [(1, (d(1), d(3), True))]
+    assert plan.inserts == [(d(4), d(6), False), (d(7), d(10), True)]
+    assert plan.deletes == []
+
+
+def test_plan_reuses_unrelated_rows_before_inserting():
+    stored = [(1, d(20), d(25), True)]
+    plan = plan_changes(stored, [(d(1), d(5), False)])
+
+    assert plan == IntervalPlan(updates=[(1, (d(1), d(5), False))])
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+import redis
+
+from core.cache import CACHES, FakeRedis, LRUCache, TwoTierCache
+
+
+class BrokenRedis(FakeRedis):
+    """Redis caído: toda operación falla como lo haría el cliente real."""
+
+    def get(self, key):
+        raise redis.ConnectionError("down")
+
+    def set(self, key, value, ex=None):
+        raise redis.ConnectionError("down")
+
+    def mget(self, keys):
+        raise redis.ConnectionError("down")
+
+    def delete(self, *keys):
+        raise redis.ConnectionError("down")
+
+
+@pytest.fixture
+def l2():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(l2, clock):
+    cache = TwoTierCache("test", l1_size=2, l1_ttl_seconds=10, l2_ttl_seconds=60, redis_client=l2)
+    yield cache
+    CACHES.pop("test", None)
+
+
+def test_lru_evicts_least_recently_used(clock):
+    lru = LRUCache(max_size=2, ttl_seconds=10)
+    lru.set("a", b"1")
+    lru.set("b", b"2")
+    assert lru.get("a") == b"1"
+    lru.set("c", b"3")
+
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1"
+    assert lru.get("c") == b"3"
+    assert (lru.hits, lru.misses, lru.evictions) == (3, 1, 1)
+
+
+def test_lru_expires_entries(clock):
+    lru = LRUCache(max_size=10, ttl_seconds=10)
+    lru.set("a", b"1")
+    lru.set("b", b"2", ttl_seconds=30)
+    clock.advance(10)
+
+    assert lru.get("a") is None
+    assert lru.get("b") == b"2"
+    assert len(lru) == 1
+    assert (lru.expirations, lru.misses) == (1, 1)
+
+
+def test_lru_holds_shared_objects(clock):
+    lru: LRUCache[tuple] = LRUCache(max_size=2, ttl_seconds=10)
+    value = (1, "Ana")
+    lru.set("1", value)
+
+    assert lru.get("1") is value
+
+
+def test_set_writes_both_levels(cache, l2):
+    cache.set("k", b"v")
+
+    assert cache.get("k") == b"v"
+    assert l2.get("test:k") == b"v"
+    assert cache.stats()["l1_hits"] == 1
+    assert cache.stats()["l2_hits"] == 0
+
+
+def test_l1_miss_falls_back_to_l2_and_refills_l1(cache, l2, clock):
+    cache.set("k", b"v")
+    clock.advance(10)  # Expira en L1, sigue en L2
+
+    assert cache.get("k") == b"v"
+    assert cache.get("k") == b"v"
+    stats = cache.stats()
+    assert (stats["l1_expirations"], stats["l2_hits"], stats["l1_hits"]) == (1, 1, 1)
+
+
+def test_l2_expires(cache, clock):
+    cache.set("k", b"v")
+    clock.advance(60)
+
+    assert cache.get("k") is None
+    assert cache.stats()["l2_misses"] == 1
+
+
+def test_l1_eviction_keeps_value_in_l2(cache):
+    for key in ("a", "b", "c"):
+        cache.set(key, key.encode())
+
+    assert cache.stats()["l1_evictions"] == 1
+    assert cache.get("a") == b"a"
+    assert cache.stats()["l2_hits"] == 1
+
+
+def test_invalidate_clears_both_levels(cache, l2):
+    cache.set("k", b"v")
+    cache.invalidate("k")
+
+    assert l2.get("test:k") is None
+    assert cache.get("k") is None
+    assert cache.stats()["l2_misses"] == 1
+
+
+def test_other_worker_reads_shared_l2(cache, l2, clock):
+    other = TwoTierCache("test", l1_size=2, l1_ttl_seconds=10, l2_ttl_seconds=60, redis_client=l2)
+    cache.set("k", b"v")
+
+    assert other.get("k") == b"v"
+    assert other.stats()["l2_hits"] == 1
+
+
+def test_get_many_uses_one_mget_for_l1_misses(cache, l2, clock, monkeypatch):
+    cache.set_many({"a": b"1", "b": b"2"})
+    clock.advance(10)
+    cache.set("c", b"3")
+    calls = []
+    mget = l2.mget
+    monkeypatch.setattr(l2, "mget", lambda keys: calls.append(keys) or mget(keys))
+
+    assert cache.get_many(["a", "b", "c", "d"]) == {"a": b"1", "b": b"2", "c": b"3"}
+    assert calls == [["test:a", "test:b", "test:d"]]
+    assert (cache.stats()["l2_hits"], cache.stats()["l2_misses"]) == (2, 1)
+
+
+def test_l2_failure_degrades_to_l1_and_retries_later(clock):
+    cache = TwoTierCache(
+        "test_broken", l1_size=2, l1_ttl_seconds=10, l2_ttl_seconds=60,
+        redis_client=BrokenRedis(), l2_retry_seconds=5
+    )
+    try:
+        cache.set("k", b"v")
+        assert cache.get("k") == b"v"
+        assert cache.get("missing") is None
+        assert cache.stats()["l2_errors"] == 1  # No se reintenta antes de l2_retry_seconds
+
+        clock.advance(5)
+        assert cache.get("missing") is None
+        assert cache.stats()["l2_errors"] == 2
+    finally:
+        CACHES.pop("test_broken", None)
+
+
+def test_async_reads(cache):
+    async def run():
+        await cache.aset("k", b"v")
+        cache.l1.clear()
+        return await cache.aget("k"), await cache.aget_many(["k", "x"])
+
+    assert asyncio.run(run()) == (b"v", {"k": b"v"})
+    assert cache.stats()["l2_hits"] == 1
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from repositories.shard_routing import (
+    ShardKeyMissingError, install_shard_key_guard, multi_shard, unrouted_tables
+)
+
+# Mismos nombres que las tablas de db_citus.sql: el guard las reconoce por nombre
+metadata = MetaData()
+prop = Table(
+    "property", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("region_id", Integer, primary_key=True),
+    Column("title", String)
+)
+price_rule = Table(
+    "price_rule", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("property_id", Integer),
+    Column("region_id", Integer)
+)
+city = Table("city", metadata, Column("id", Integer, primary_key=True), Column("name", String))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    install_shard_key_guard(factory)
+    with factory() as session:
+        session.execute(insert(prop).values(id=1, region_id=1, title="Casa"))
+        session.execute(insert(price_rule).values(id=1, property_id=1, region_id=1))
+        yield session
+
+
+def test_filter_on_region_pins_table():
+    assert unrouted_tables(select(prop).where(prop.c.id == 1, prop.c.region_id == 1)) == set()
+    assert unrouted_tables(select(prop).where(prop.c.region_id.in_([1, 2]))) == set()
+
+
+def test_missing_or_non_equality_region_filter_is_unrouted():
+    assert unrouted_tables(select(prop).where(prop.c.id == 1)) == {"property"}
+    assert unrouted_tables(select(prop).where(prop.c.region_id > 1)) == {"property"}
+
+
+def test_join_through_region_pins_both_tables():
+    statement = (
+        select(prop.c.id, price_rule.c.id)
+        .join(price_rule, (price_rule.c.property_id == prop.c.id) & (price_rule.c.region_id == prop.c.region_id))
+        .where(prop.c.region_id == 1)
+    )
+    assert unrouted_tables(statement) == set()
+
+
+def test_join_without_region_leaves_other_table_unrouted():
+    statement = (
+        select(prop.c.id, price_rule.c.id)
+        .join(price_rule, price_rule.c.property_id == prop.c.id)
+        .where(prop.c.region_id == 1)
+    )
+    assert unrouted_tables(statement) == {"price_rule"}
+
+
+def test_reference_tables_are_ignored():
+    assert unrouted_tables(select(city)) == set()
+
+
+def test_guard_rejects_query_without_region(session):
+    with pytest.raises(ShardKeyMissingError, match="property"):
+        session.execute(select(prop).where(prop.c.id == 1))
+
+
+def test_guard_allows_routed_queries(session):
+    assert session.execute(select(prop.c.title).where(prop.c.id == 1, prop.c.region_id == 1)).scalar() == "Casa"
+    assert session.execute(
+        select(price_rule.c.id)
+        .join(prop, (prop.c.id == price_rule.c.property_id) & (prop.c.region_id == price_rule.c.region_id))
+        .where(prop.c.region_id == 1)
+    ).scalar() == 1
+
+
+def test_guard_allows_explicit_multi_shard(session):
+    assert session.execute(multi_shard(select(prop.c.title))).scalar() == "Casa"
+
+
+def test_guard_allows_inserts(session):
+    session.execute(insert(prop).values(id=2, region_id=3, title="Piso"))